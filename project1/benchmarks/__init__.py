@@ -0,0 +1,7 @@
+"""Benchmarks for the hot views (stats, my_stats, group detail and exports).
+
+Run with ``python -m benchmarks``; see ``python -m benchmarks --help``.
+Each scale gets its own SQLite database under ``benchmarks/data/``, seeded
+deterministically with the bulk sample-data generator and reused by later
+runs, so everything works offline.
+"""
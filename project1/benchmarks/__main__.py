@@ -0,0 +1,118 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+
+from .datasets import DATA_DIR, PROJECT_ROOT, SCALES, database_path
+
+SCENARIO_NAMES = ['stats', 'stats_group', 'my_stats', 'group_detail', 'stats_export',
+                  'group_stats_export', 'group_top_members_export']
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Benchmark the hot views on SQLite.')
+    parser.add_argument('--scale', choices=list(SCALES), action='append',
+                        help='Dataset scale (repeatable; default 10k)')
+    parser.add_argument('--repeat', type=int, default=5, help='Warm runs per view')
+    parser.add_argument('--only', choices=SCENARIO_NAMES, action='append', help='Run only these views')
+    parser.add_argument('--output', help='JSON results file (default benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--compare', help='Previous results JSON to compare against')
+    parser.add_argument('--reseed', action='store_true', help='Rebuild the dataset even if it exists')
+    parser.add_argument('--_worker', help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_scale(scale, args):
+    """Benchmark one scale in this process (DATABASE_PATH must already point at its database)."""
+    import django
+    django.setup()
+    from django.test.utils import setup_test_environment
+    from .datasets import benchmark_subjects, prepare
+    from .runner import run
+
+    setup_test_environment()
+    prepare(scale, reseed=args.reseed)
+    user, group = benchmark_subjects()
+    return run(user, group, repeat=args.repeat, only=args.only)
+
+
+def compare(previous, current):
+    before = {(r['scale'], r['name']): r for r in previous['results']}
+    print(f'{"scale":6} {"view":26} {"cold ms":>18} {"warm ms":>18} {"queries":>10} {"peak KiB":>18}')
+    for r in current['results']:
+        old = before.get((r['scale'], r['name']))
+        if not old:
+            continue
+
+        def cell(key):
+            a, b = old[key], r[key]
+            if a is None or b is None:
+                return 'n/a'
+            ratio = f' ({b / a:.2f}x)' if a else ''
+            return f'{b}{ratio}'
+        print(f'{r["scale"]:6} {r["name"]:26} {cell("cold_ms"):>18} {cell("warm_ms_median"):>18} '
+              f'{cell("queries_cold"):>10} {cell("peak_memory_kib"):>18}')
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project1.settings')
+    if args._worker:
+        # Child process: one scale per process so each gets its own database connection and settings
+        print(json.dumps(run_scale(args._worker, args)))
+        return
+
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    results = []
+    for scale in args.scale or ['10k']:
+        env = dict(os.environ, DATABASE_PATH=str(database_path(scale)))
+        cmd = [sys.executable, '-m', 'benchmarks', '--_worker', scale, '--repeat', str(args.repeat)]
+        if args.reseed:
+            cmd.append('--reseed')
+        for name in args.only or []:
+            cmd += ['--only', name]
+        proc = subprocess.run(cmd, cwd=PROJECT_ROOT, env=env, stdout=subprocess.PIPE, text=True, check=True)
+        for result in json.loads(proc.stdout.strip().splitlines()[-1]):
+            result['scale'] = scale
+            results.append(result)
+            print(f'[{scale}] {result["name"]:26} {result["status"]} cold {result["cold_ms"]:9.1f} ms  '
+                  f'warm {result["warm_ms_median"]:9.1f} ms  {result["queries_cold"]:4d} queries  '
+                  f'{result["peak_memory_kib"]:8d} KiB')
+
+    import django
+    report = {
+        'meta': {
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    output = args.output or str(PROJECT_ROOT / 'benchmarks' / 'results'
+                                / f'{datetime.datetime.now():%Y%m%dT%H%M%S}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Results written to {output}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,303 @@
+"""Query-count budgets for every URL in core/urls.py.
+
+Each URL is requested as the benchmark user, inside a rolled-back
+transaction: with GET, or with the method and data from ``request_for()`` for
+views that only do their work on a POST or with parameters. It must answer
+with a 2xx or 3xx status and not exceed the query budget for its URL name.
+Budgets must not depend on the dataset size: a count that grows with the data
+is an N+1.
+
+core/tests/test_budgets.py enforces the budgets in the test suite on a small
+dataset. ``python -m benchmarks.budgets [--scale 10k]`` runs the same check on a
+seeded benchmark dataset; failures print the SQL grouped by call site, and the
+process exits with status 1.
+"""
+import argparse
+import os
+import re
+import sys
+import traceback
+from collections import Counter, defaultdict
+
+from .datasets import PROJECT_ROOT, SCALES, database_path
+
+# Maximum queries per URL name (the counts when the budgets were last set).
+# Lower these when a view gets cheaper.
+BUDGETS = {
+    'home': 4,
+    'login': 2,
+    'get_started': 2,
+    'stats': 14,
+    'stats_export': 3,
+    'stats_export_top': 4,
+    'my_stats': 7,
+    'export_job_create': 5,
+    'export_job_status': 3,
+    'export_job_download': 3,
+    'register': 2,
+    'profile': 10,
+    'profile_edit': 3,
+    'group_list': 4,
+    'group_search': 4,
+    'group_autocomplete': 0,
+    'group_detail': 13,
+    'group_stats_export': 4,
+    'group_top_members_export': 4,
+    'group_create': 4,
+    'group_edit': 5,
+    'join_group': 4,
+    'leave_group': 5,
+    'add_comment': 5,
+    'add_reply': 6,
+    'edit_comment': 4,
+    'delete_comment': 7,
+    'session_create': 3,
+    'session_edit': 5,
+    'session_delete': 5,
+    'material_upload': 3,
+    'material_edit': 5,
+    'material_delete': 6,
+    'notification_list': 3,
+    'notification_read': 4,
+    'notification_mark_all_read': 3,
+    'notification_stream': 0,
+    'change_member_role': 6,
+    'remove_member': 14,
+}
+
+
+# Budgets measure steady-state requests, so cached entries must not expire
+# mid-run as they can with the short timeouts used for a process-local cache
+STEADY_STATE_SETTINGS = {
+    'ROLE_LOCAL_CACHE_TIMEOUT': 60 * 60,
+    'NOTIFICATION_COUNT_LOCAL_CACHE_TIMEOUT': 60 * 60,
+}
+
+
+class QueryLog:
+    """execute_wrapper recording each query with its call site."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((sql, call_site(traceback.extract_stack()[:-1], sys._getframe(1))))
+        return execute(sql, params, many, context)
+
+
+def call_site(stack, frame):
+    """Innermost template line or project source line that triggered a query."""
+    while frame is not None:
+        node = frame.f_locals.get('self') if frame.f_code.co_name == 'render_annotated' else None
+        origin = getattr(node, 'origin', None)
+        token = getattr(node, 'token', None)
+        if origin is not None and token is not None:
+            name = getattr(origin, 'template_name', None) or origin.name
+            return f'template {name}:{token.lineno}'
+        frame = frame.f_back
+    for entry in reversed(stack):
+        if entry.filename.startswith('<'):
+            continue
+        path = os.path.abspath(entry.filename)
+        if path.startswith(str(PROJECT_ROOT)) and '/benchmarks/' not in path:
+            return f'{os.path.relpath(path, PROJECT_ROOT)}:{entry.lineno} in {entry.name}'
+    return 'django internals'
+
+
+def normalize(sql):
+    """SQL with literals replaced by ?, so repeated N+1 queries group together."""
+    sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+    sql = re.sub(r'\b\d+\b', '?', sql)
+    return re.sub(r'IN \((?:\?, )*\?\)', 'IN (...)', sql)
+
+
+def url_kwargs(user, group):
+    """Keyword arguments for each URL name, using objects owned by ``user`` in ``group``."""
+    from django.utils import timezone
+    from core.exports import request_export, run_export_job
+    from core.models import Comment, ExportJob, GroupMembership, Notification, StudyMaterial, StudySession
+
+    session = StudySession.objects.filter(group=group).order_by('pk').first()
+    material = (StudyMaterial.objects.filter(group=group).order_by('pk').first()
+                or StudyMaterial.objects.create(group=group, uploaded_by=user, title='budget', description='budget'))
+    comment = (Comment.objects.filter(group=group, author=user).order_by('pk').first()
+               or Comment.objects.create(group=group, author=user, content='budget'))
+    membership = GroupMembership.objects.filter(group=group).exclude(user=user).order_by('pk').first()
+    job, _ = request_export('top_members', {'group_id': group.pk, 'start': '2000-01-01', 'end': '2000-01-31'}, user)
+    export_file = None
+    if job.status != 'done':
+        # Run it here (as a claimed job) so export_job_download has a file to serve
+        ExportJob.objects.filter(pk=job.pk).update(status='running', started_at=timezone.now())
+        job.refresh_from_db()
+        run_export_job(job)
+        export_file = job.file.name
+    notification = Notification.objects.create(recipient=user, group=group, notification_type='group_update',
+                                               title='budget', message='budget')
+
+    group_kwargs = {'group_id': group.pk}
+    return {
+        'pk_group': {'pk': group.pk},
+        'group_id': group_kwargs,
+        'comment': {**group_kwargs, 'comment_id': comment.pk},
+        'membership': {**group_kwargs, 'membership_id': membership.pk if membership else 0},
+        'session': {'pk': session.pk},
+        'material': {'pk': material.pk},
+        'export_job': {'pk': job.pk},
+        'notification': {'pk': notification.pk},
+        # Written by the benchmark; the job row is rolled back but the file is not
+        'export_file': export_file,
+    }
+
+
+def request_for(name, objects):
+    """(method, data) that reaches the view's real code path instead of an error response."""
+    group_id = objects['group_id']['group_id']
+    requests = {
+        'export_job_create': ('post', {'kind': 'sessions', 'group': group_id}),
+        'stats_export_top': ('get', {'group': group_id}),
+        'add_comment': ('post', {'content': 'budget'}),
+        'add_reply': ('post', {'content': 'budget'}),
+        'edit_comment': ('post', {'content': 'budget'}),
+        'delete_comment': ('post', {}),
+        'change_member_role': ('post', {'role': 'moderator'}),
+        'remove_member': ('post', {}),
+        'notification_read': ('post', {}),
+        'notification_mark_all_read': ('post', {}),
+    }
+    return requests.get(name, ('get', {}))
+
+
+def resolve_kwargs(name, keys, objects):
+    if not keys:
+        return {}
+    if keys == {'pk'}:
+        if name.startswith('session_'):
+            return objects['session']
+        if name.startswith('material_'):
+            return objects['material']
+        if name.startswith('export_job_'):
+            return objects['export_job']
+        if name.startswith('notification_'):
+            return objects['notification']
+        return objects['pk_group']
+    if 'comment_id' in keys:
+        return objects['comment']
+    if 'membership_id' in keys:
+        return objects['membership']
+    return objects['group_id']
+
+
+def warm_up(user):
+    """Do the per-process lookups and cache the user's counts, so budgets measure steady-state requests."""
+    from core.autocomplete import get_index
+    from core.inbox import unread_count
+    from core.search import get_backend
+
+    get_backend()
+    get_index()
+    unread_count(user)
+
+
+def budget_requests(objects):
+    """(name, url, method, data, budget) for every core URL, using the objects from ``url_kwargs()``."""
+    from django.urls import reverse
+    from core.urls import urlpatterns
+
+    for pattern in urlpatterns:
+        name = pattern.name
+        keys = set(pattern.pattern.converters)
+        url = reverse(f'core:{name}', kwargs=resolve_kwargs(name, keys, objects))
+        method, data = request_for(name, objects)
+        yield name, url, method, data, BUDGETS.get(name)
+
+
+def fetch(client, method, url, data):
+    """Request ``url`` and read a streaming body to the end, so its queries are counted too."""
+    response = getattr(client, method)(url, data)
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def remove_export_file(objects):
+    """Delete the file of the export run by ``url_kwargs()``; its job row is rolled back but the file is not."""
+    from core.models import export_job_storage
+
+    if objects['export_file']:
+        export_job_storage().delete(objects['export_file'])
+
+
+def check(user, group, verbose=False):
+    """Request every core URL; returns a list of (name, url, status, count, budget, QueryLog) that failed."""
+    from django.db import connection, transaction
+    from django.test import Client, override_settings
+
+    failures = []
+    with override_settings(**STEADY_STATE_SETTINGS), transaction.atomic():
+        warm_up(user)
+        client = Client()
+        client.force_login(user)
+        objects = url_kwargs(user, group)
+        try:
+            for name, url, method, data, budget in budget_requests(objects):
+                log = QueryLog()
+                sid = transaction.savepoint()
+                try:
+                    with connection.execute_wrapper(log):
+                        response = fetch(client, method, url, data)
+                finally:
+                    transaction.savepoint_rollback(sid)
+                count = len(log.queries)
+                # An error response is not the code path the budget is meant for
+                ok = budget is not None and count <= budget and 200 <= response.status_code < 400
+                if verbose or not ok:
+                    print(f'{"ok  " if ok else "FAIL"} {method.upper():4} {name:26} {url:55} '
+                          f'{response.status_code} {count:4d} queries (budget {budget})')
+                if not ok:
+                    failures.append((name, url, response.status_code, count, budget, log))
+        finally:
+            remove_export_file(objects)
+        transaction.set_rollback(True)
+    return failures
+
+
+def report(failures):
+    for name, url, status, count, budget, log in failures:
+        print(f'\n{name} ({url}): status {status}, {count} queries, budget {budget}')
+        by_site = defaultdict(Counter)
+        for sql, site in log.queries:
+            by_site[site][normalize(sql)] += 1
+        for site, statements in sorted(by_site.items(), key=lambda item: -sum(item[1].values())):
+            print(f'  {sum(statements.values()):4d}x {site}')
+            for sql, n in statements.most_common():
+                print(f'        {n:4d}x {sql[:200]}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.budgets', description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=list(SCALES), default='10k')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Print every URL, not just failures')
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project1.settings')
+    os.environ.setdefault('DATABASE_PATH', str(database_path(args.scale)))
+    database_path(args.scale).parent.mkdir(parents=True, exist_ok=True)
+    import django
+    django.setup()
+    from django.test.utils import setup_test_environment
+    from .datasets import benchmark_subjects, prepare
+
+    setup_test_environment()
+    prepare(args.scale)
+    user, group = benchmark_subjects()
+    failures = check(user, group, verbose=args.verbose)
+    report(failures)
+    if failures:
+        print(f'\n{len(failures)} URL(s) over their query budget or answering with an error')
+        sys.exit(1)
+    print('All URLs within their query budgets')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Deterministic benchmark datasets built with tools/generate_sample_data.py --scale."""
+import importlib.util
+import random
+import sys
+from argparse import Namespace
+from pathlib import Path
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DATA_DIR = PROJECT_ROOT / 'benchmarks' / 'data'
+
+# Number of sessions per named scale; the other tables are sized from it.
+SCALES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+SEED = 20240101
+
+
+def database_path(scale):
+    return DATA_DIR / f'bench_{scale}.sqlite3'
+
+
+def scale_counts(sessions):
+    users = max(sessions // 50, 20)
+    return {
+        'users': users,
+        'groups': max(sessions // 500, 5),
+        'memberships': users * 3 // 2,
+        'sessions': sessions,
+        'materials': sessions // 50,
+        'comments': sessions // 20,
+    }
+
+
+def _generator():
+    spec = importlib.util.spec_from_file_location(
+        'generate_sample_data', PROJECT_ROOT / 'tools' / 'generate_sample_data.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def is_seeded():
+    from core.models import StudySession
+    return 'core_studysession' in connection.introspection.table_names() and StudySession.objects.exists()
+
+
+def prepare(scale, reseed=False):
+    """Bring the current database up to date, seeding it first if it is empty (or ``reseed``)."""
+    if reseed or not is_seeded():
+        print(f'[{scale}] seeding dataset...', file=sys.stderr)
+        seed(scale)
+    else:
+        # Datasets are reused across runs; apply migrations added since they were built
+        call_command('migrate', verbosity=0)
+
+
+def seed(scale, batch_size=5000):
+    """Migrate the current database and fill it with the dataset for ``scale``."""
+    call_command('migrate', verbosity=0)
+    fill(SCALES[scale], batch_size)
+
+
+def fill(sessions, batch_size=5000, text_pool=2000):
+    """Fill the (migrated, empty) current database with a dataset of ``sessions`` sessions."""
+    call_command('loaddata', 'initial_subjects', verbosity=0)
+    random.seed(SEED)
+    generator = _generator()
+    generator.generate_scaled(Namespace(text_pool=text_pool, workers=0, batch_size=batch_size,
+                                        **scale_counts(sessions)))
+
+
+def benchmark_subjects():
+    """(user, group) used by the scenarios: the busiest group and its creator, made superuser."""
+    from core.models import StudyGroup
+    group = (StudyGroup.objects.annotate(n=Count('studysession'))
+             .order_by('-n', 'pk').select_related('created_by').first())
+    user = group.created_by
+    if not user.is_superuser:
+        user.is_staff = user.is_superuser = True
+        user.save(update_fields=['is_staff', 'is_superuser'])
+    return user, group
@@ -0,0 +1,124 @@
+"""Query-plan checks for the hot querysets of the core views.
+
+Run with ``python -m benchmarks.plans [--scale 10k]``. Every queryset from
+``hot_queries()`` is EXPLAINed against a seeded benchmark dataset (EXPLAIN QUERY
+PLAN on SQLite, EXPLAIN on PostgreSQL) and must not read its table with a
+full scan: each one should be served by one of the Meta.indexes in
+core/models.py. Offending plans are printed and the process exits with
+status 1.
+
+core/tests/test_plans.py runs ``assert_indexed()`` on the same querysets in
+the test suite, against a small dataset built by the migrations, so dropping
+one of those indexes fails the tests.
+"""
+import argparse
+import datetime
+import os
+import re
+import sys
+
+from .datasets import SCALES, database_path
+
+# SQLite: "SCAN core_studysession" (a bare SCAN reads the whole table; "SCAN t USING INDEX" walks an index)
+SQLITE_FULL_SCAN = re.compile(r'\bSCAN (?P<table>\w+)(?! USING)(?:\s|$)')
+POSTGRES_FULL_SCAN = re.compile(r'Seq Scan on (?P<table>\w+)')
+
+
+def full_scans(queryset):
+    """Tables that the plan of ``queryset`` reads with a full table scan."""
+    from django.db import connection
+
+    plan = queryset.explain()
+    pattern = POSTGRES_FULL_SCAN if connection.vendor == 'postgresql' else SQLITE_FULL_SCAN
+    return sorted({match.group('table') for match in pattern.finditer(plan)})
+
+
+def assert_indexed(queryset):
+    tables = full_scans(queryset)
+    if tables:
+        raise AssertionError(f'Full scan of {", ".join(tables)}:\n{queryset.explain()}')
+
+
+def hot_queries(user, group):
+    """(name, queryset) pairs for the query shapes the views run on every request."""
+    from django.db.models import Sum
+    from django.utils import timezone
+    from core.exports import delta_querysets
+    from core.models import Comment, ExportWatermark, GroupMembership, Notification, StudyGroup, StudySession
+    from core.reminders import due_sessions
+
+    today = timezone.localdate()
+    start = today - datetime.timedelta(weeks=12)
+    now = timezone.now()
+    # A delta export run a day ago that had exported every session
+    last_id = StudySession.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    watermark = ExportWatermark(table='sessions', last_id=last_id, last_updated_at=now - datetime.timedelta(days=1))
+    updated_sessions, new_sessions = delta_querysets(StudySession, watermark, watermark.last_id + 1000, now)
+    return [
+        ('group sessions in window',
+         StudySession.objects.filter(group=group, date__gte=start, date__lte=today)),
+        ('user sessions in window',
+         StudySession.objects.filter(created_by=user, date__gte=start, date__lte=today)),
+        ('group rollups in window',
+         group.session_rollups.filter(day__gte=start, day__lte=today)
+         .values('creator__username').annotate(minutes=Sum('total_minutes')).order_by('-minutes')[:5]),
+        ('upcoming group sessions',
+         StudySession.objects.filter(group=group, status='scheduled').order_by('date', 'start_time')[:5]),
+        ('top-level group comments',
+         Comment.objects.filter(group=group, parent__isnull=True).order_by('created_at')),
+        ('group admins',
+         GroupMembership.objects.filter(group=group, role='admin')),
+        ('unread notifications',
+         Notification.objects.filter(recipient=user, is_read=False).order_by('-created_at')[:20]),
+        ('notification inbox page',
+         Notification.objects.filter(recipient=user).order_by('-created_at', '-id')[:21]),
+        ('sessions due a reminder', due_sessions(24)),
+        ('sessions updated since the last delta export', updated_sessions),
+        ('sessions inserted since the last delta export', new_sessions),
+        ('active groups, newest first',
+         StudyGroup.objects.filter(is_active=True).order_by('-created_at', '-id')[:13]),
+        ('active groups of a subject',
+         StudyGroup.objects.filter(is_active=True, subject_id=group.subject_id).order_by('-created_at', '-id')[:13]),
+    ]
+
+
+def check(user, group, verbose=False):
+    """EXPLAIN every hot query; returns a list of (name, tables, plan) that full-scan."""
+    failures = []
+    for name, queryset in hot_queries(user, group):
+        tables = full_scans(queryset)
+        if verbose or tables:
+            print(f'{"FAIL" if tables else "ok  "} {name}')
+        if verbose:
+            print('     ' + queryset.explain().replace('\n', '\n     '))
+        if tables:
+            failures.append((name, tables, queryset.explain()))
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.plans', description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=list(SCALES), default='10k')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Print every plan, not just failures')
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project1.settings')
+    os.environ.setdefault('DATABASE_PATH', str(database_path(args.scale)))
+    database_path(args.scale).parent.mkdir(parents=True, exist_ok=True)
+    import django
+    django.setup()
+    from .datasets import benchmark_subjects, prepare
+
+    prepare(args.scale)
+    user, group = benchmark_subjects()
+    failures = check(user, group, verbose=args.verbose)
+    for name, tables, plan in failures:
+        print(f'\n{name}: full scan of {", ".join(tables)}\n{plan}')
+    if failures:
+        print(f'\n{len(failures)} hot queries fall back to a full scan')
+        sys.exit(1)
+    print('All hot queries use an index')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Scenario definitions and measurement (wall time, SQL queries, peak memory)."""
+import gc
+import statistics
+import time
+import tracemalloc
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+
+WINDOW = 'preset=26w'
+
+
+def scenarios(group):
+    """(name, url) pairs for the views under test."""
+    g = group.pk
+    return [
+        ('stats', f'/stats/?{WINDOW}'),
+        ('stats_group', f'/stats/?group={g}&{WINDOW}'),
+        ('my_stats', f'/my-stats/?{WINDOW}'),
+        ('group_detail', f'/groups/{g}/?{WINDOW}'),
+        ('stats_export', f'/stats/export/?{WINDOW}'),
+        ('group_stats_export', f'/groups/{g}/stats/export/?{WINDOW}'),
+        ('group_top_members_export', f'/groups/{g}/stats/export_top/?{WINDOW}'),
+    ]
+
+
+class QueryCounter:
+    """execute_wrapper counting queries (unaffected by DEBUG and the 9000-entry queries_log cap)."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _fetch(client, url):
+    """GET ``url`` and read the whole body (streamed responses included). Returns (status, bytes)."""
+    response = client.get(url)
+    if response.streaming:
+        size = sum(len(chunk) for chunk in response.streaming_content)
+    else:
+        size = len(response.content)
+    return response.status_code, size
+
+
+def measure(client, url, repeat=5):
+    """Cold and warm timings, query counts and peak traced memory for one URL.
+
+    Timed runs are done without tracemalloc (it slows Python down a lot);
+    memory is measured in one extra cold run.
+    """
+    cache.clear()
+    gc.collect()
+    cold_queries = QueryCounter()
+    with connection.execute_wrapper(cold_queries):
+        start = time.perf_counter()
+        status, size = _fetch(client, url)
+        cold = time.perf_counter() - start
+
+    warm = []
+    warm_queries = QueryCounter()
+    with connection.execute_wrapper(warm_queries):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            _fetch(client, url)
+            warm.append(time.perf_counter() - start)
+
+    cache.clear()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        _fetch(client, url)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'url': url,
+        'status': status,
+        'bytes': size,
+        'cold_ms': round(cold * 1000, 2),
+        'warm_ms_median': round(statistics.median(warm) * 1000, 2) if warm else None,
+        'warm_ms_min': round(min(warm) * 1000, 2) if warm else None,
+        'queries_cold': cold_queries.count,
+        'queries_warm': warm_queries.count // repeat if repeat else None,
+        'peak_memory_kib': peak // 1024,
+    }
+
+
+def run(user, group, repeat=5, only=None):
+    client = Client()
+    client.force_login(user)
+    results = []
+    for name, url in scenarios(group):
+        if only and name not in only:
+            continue
+        result = measure(client, url, repeat)
+        result['name'] = name
+        results.append(result)
+    return results
@@ -2,15 +2,17 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
 from django.db import models
-from django.http import FileResponse, Http404
+from django.http import Http404
 from django.urls import path
 from django.conf import settings
-import shutil
 from pathlib import Path
+from .downloads import database_snapshot, directory_zip_response, ranged_file_response
 from .models import (
     Profile, Subject, StudyGroup, GroupMembership,
-    StudySession, StudyMaterial, Comment, Notification
+    StudySession, StudyMaterial, Comment, Notification, ExportJob,
+    ExportWatermark, GroupWaitlistEntry, OutboundEmail,
 )
+from .outbox import requeue
 
 class ProfileInline(admin.StackedInline):
     model = Profile
@@ -48,7 +50,7 @@ class ProfileAdmin(admin.ModelAdmin):
         return custom_urls + urls
 
     def download_db_view(self, request, profile_id, *args, **kwargs):
-        """Return the project's SQLite database file as a downloadable attachment.
+        """Return a gzip-compressed snapshot of the project's SQLite database as attachment.
 
         Only staff users can access this view (enforced by admin_view).
         """
@@ -62,19 +64,22 @@ class ProfileAdmin(admin.ModelAdmin):
         if not request.user.is_staff:
             raise Http404('Not allowed')
 
-        db_path = settings.BASE_DIR / 'db.sqlite3'
+        database = settings.DATABASES['default']
+        if database['ENGINE'] != 'django.db.backends.sqlite3':
+            raise Http404('Database snapshots are only available for SQLite')
+        db_path = Path(database['NAME'])
         if not db_path.exists():
             raise Http404('Database file not found')
 
-        # Serve the file
+        # Consistent copy via the backup API, cached for DB_SNAPSHOT_CACHE_MINUTES
         try:
-            response = FileResponse(open(db_path, 'rb'), as_attachment=True, filename='project_db.sqlite3')
-            return response
+            snapshot = database_snapshot(db_path)
         except Exception:
-            raise Http404('Could not read database file')
+            raise Http404('Could not create database snapshot')
+        return ranged_file_response(request, snapshot, 'project_db.sqlite3.gz', 'application/gzip')
 
     def download_exports_zip_view(self, request, profile_id, *args, **kwargs):
-        """Create (or refresh) a zip of the exports/ folder and return it as attachment.
+        """Return a zip of the exports/ folder as attachment.
 
         Only staff users can access this view (enforced by admin_view).
         """
@@ -91,16 +96,8 @@ class ProfileAdmin(admin.ModelAdmin):
         if not exports_dir.exists():
             raise Http404('Exports directory not found')
 
-        # Create zip at project root: exports.zip (overwrite if exists)
-        base_name = str(Path(settings.BASE_DIR) / 'exports')
-        try:
-            # shutil.make_archive will create base_name + .zip
-            shutil.make_archive(base_name, 'zip', root_dir=str(exports_dir))
-            zip_path = Path(base_name + '.zip')
-            response = FileResponse(open(zip_path, 'rb'), as_attachment=True, filename='exports.zip')
-            return response
-        except Exception:
-            raise Http404('Could not create exports zip')
+        # Streamed on the fly, or served from the cached archive if nothing changed
+        return directory_zip_response(request, exports_dir, 'exports.zip')
 
 @admin.register(Subject)
 class SubjectAdmin(admin.ModelAdmin):
@@ -155,4 +152,33 @@ class NotificationAdmin(admin.ModelAdmin):
     list_display = ('recipient', 'notification_type', 'title', 'created_at', 'is_read')
     list_filter = ('notification_type', 'is_read', 'created_at')
     search_fields = ('title', 'message', 'recipient__username')
-    date_hierarchy = 'created_at'
\ No newline at end of file
+    date_hierarchy = 'created_at'
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'status', 'requested_by', 'row_count', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status', 'created_at')
+    readonly_fields = ('params_hash', 'started_at', 'lease_expires_at', 'finished_at', 'row_count', 'error')
+
+@admin.register(ExportWatermark)
+class ExportWatermarkAdmin(admin.ModelAdmin):
+    list_display = ('table', 'last_id', 'last_updated_at', 'last_tombstone_id', 'exported_at')
+
+@admin.register(GroupWaitlistEntry)
+class GroupWaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ('group', 'user', 'created_at')
+    list_filter = ('group',)
+    search_fields = ('user__username', 'group__name')
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'to', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('subject',)
+    readonly_fields = ('attempts', 'claim_token', 'locked_until', 'last_error', 'sent_at')
+    actions = ['requeue_emails']
+
+    @admin.action(description='Requeue selected emails (resets attempts)')
+    def requeue_emails(self, request, queryset):
+        count = requeue(queryset)
+        self.message_user(request, f'{count} emails requeued.')
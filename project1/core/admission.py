@@ -0,0 +1,99 @@
+"""Capacity-controlled group admission with a FIFO waitlist.
+
+A seat is claimed with one conditional UPDATE on StudyGroup.member_count
+(``member_count < max_members``), so concurrent joins can never overbook a
+group. Memberships created here carry ``_counted`` so the counter signal in
+core.signals doesn't add them a second time.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import StudyGroup, GroupMembership, GroupWaitlistEntry, Notification
+
+JOINED = 'joined'
+ALREADY_MEMBER = 'already_member'
+WAITLISTED = 'waitlisted'
+ALREADY_WAITLISTED = 'already_waitlisted'
+
+
+def claim_seat(group_id):
+    """Take one free seat in the group. Returns False when it is full."""
+    return StudyGroup.objects.filter(
+        pk=group_id, member_count__lt=F('max_members'),
+    ).update(member_count=F('member_count') + 1) == 1
+
+
+def release_seat(group_id):
+    StudyGroup.objects.filter(pk=group_id).update(member_count=F('member_count') - 1)
+
+
+def _add_member(group_id, user_id, role='member'):
+    membership = GroupMembership(group_id=group_id, user_id=user_id, role=role)
+    membership._counted = True  # the seat was already claimed
+    membership.save()
+    return membership
+
+
+def join(group, user):
+    """Admit ``user`` to ``group`` or put them on its waitlist. Returns one of the status constants."""
+    if GroupMembership.objects.filter(group=group, user=user).exists():
+        return ALREADY_MEMBER
+    try:
+        with transaction.atomic():
+            if claim_seat(group.pk):
+                _add_member(group.pk, user.pk)
+                GroupWaitlistEntry.objects.filter(group=group, user=user).delete()
+                return JOINED
+    except IntegrityError:
+        # A concurrent request by the same user won; the seat claim was rolled back with it
+        return ALREADY_MEMBER
+    _, created = GroupWaitlistEntry.objects.get_or_create(group=group, user=user)
+    return WAITLISTED if created else ALREADY_WAITLISTED
+
+
+def waitlist_position(group, user):
+    """1-based position of ``user`` on the waitlist, or None."""
+    entry = GroupWaitlistEntry.objects.filter(group=group, user=user).values_list('id', flat=True).first()
+    if entry is None:
+        return None
+    return GroupWaitlistEntry.objects.filter(group=group, id__lte=entry).count()
+
+
+def leave_waitlist(group, user):
+    return GroupWaitlistEntry.objects.filter(group=group, user=user).delete()[0] > 0
+
+
+def promote_waitlist(group):
+    """Fill free seats from the head of the waitlist. Returns the promoted user ids.
+
+    Each promotion claims a seat first and then the waitlist entry (by
+    deleting it), so two concurrent promoters never admit the same user or
+    overbook the group.
+    """
+    promoted = []
+    while True:
+        with transaction.atomic():
+            if not claim_seat(group.pk):
+                break
+            admitted = None
+            for entry in GroupWaitlistEntry.objects.filter(group=group).order_by('created_at', 'id')[:20]:
+                if GroupWaitlistEntry.objects.filter(pk=entry.pk).delete()[0] == 0:
+                    continue  # taken by a concurrent promoter
+                if GroupMembership.objects.filter(group=group, user_id=entry.user_id).exists():
+                    continue
+                _add_member(group.pk, entry.user_id)
+                admitted = entry.user_id
+                break
+            if admitted is None:
+                release_seat(group.pk)
+                if not GroupWaitlistEntry.objects.filter(group=group).exists():
+                    break
+                continue
+        promoted.append(admitted)
+        Notification.objects.create(
+            recipient_id=admitted, notification_type='group_update', group=group,
+            title=f'You joined {group.name}',
+            message=f'A seat opened up in {group.name} and you have been moved off the waitlist.',
+            related_link=group.get_absolute_url(),
+        )
+    return promoted
@@ -0,0 +1,177 @@
+"""In-process prefix index for the search box typeahead.
+
+Every word of an active group's name and of a subject's name is a key in a
+sorted list, so a prefix lookup is a bisect plus a short scan and runs no
+queries. project1/wsgi.py and project1/asgi.py build it when the server
+starts (``warm_up()``), so no request pays for the build. It is kept current
+by the StudyGroup and Subject signal handlers in core.signals (applied after
+the transaction commits). Writes made by other processes are picked up when
+the index is rebuilt, in a background thread, once it is older than
+AUTOCOMPLETE_INDEX_MAX_AGE seconds; lookups use the old index meanwhile.
+"""
+import bisect
+import logging
+import threading
+import time
+import unicodedata
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+
+from .models import StudyGroup, Subject
+
+logger = logging.getLogger(__name__)
+
+GROUP = 'group'
+SUBJECT = 'subject'
+
+# Matches looked at before ranking; enough for any realistic prefix of 2+ chars
+MAX_SCAN = 500
+
+
+def normalize(text):
+    """Casefolded text without accents, so 'fisica' matches 'Física'."""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+class PrefixIndex:
+    """Sorted (token, position, kind, pk) keys over group and subject names."""
+
+    def __init__(self):
+        self.keys = []
+        self.items = {}
+        self.lock = threading.Lock()
+        self.built_at = time.monotonic()
+
+    def _keys_for(self, kind, pk, label):
+        words = normalize(label).split()
+        return [(word, position, kind, pk) for position, word in enumerate(words)]
+
+    def _remove(self, kind, pk):
+        item = self.items.pop((kind, pk), None)
+        if item is None:
+            return
+        for key in self._keys_for(kind, pk, item['label']):
+            i = bisect.bisect_left(self.keys, key)
+            if i < len(self.keys) and self.keys[i] == key:
+                del self.keys[i]
+
+    def _add(self, kind, pk, label, **extra):
+        self._remove(kind, pk)
+        self.items[(kind, pk)] = {'label': label, **extra}
+        for key in self._keys_for(kind, pk, label):
+            bisect.insort(self.keys, key)
+
+    def load(self, subjects, groups):
+        """Fill an empty index from (pk, name) subjects and (pk, name, subject_id) groups, sorting once."""
+        with self.lock:
+            for pk, name in subjects:
+                self.items[(SUBJECT, pk)] = {'label': name}
+                self.keys.extend(self._keys_for(SUBJECT, pk, name))
+            for pk, name, subject_id in groups:
+                subject = self.items.get((SUBJECT, subject_id), {}).get('label', '')
+                self.items[(GROUP, pk)] = {'label': name, 'subject_id': subject_id, 'subject': subject}
+                self.keys.extend(self._keys_for(GROUP, pk, name))
+            self.keys.sort()
+
+    def put_group(self, pk, name, subject_id, is_active=True):
+        with self.lock:
+            if not is_active:
+                self._remove(GROUP, pk)
+                return
+            subject = self.items.get((SUBJECT, subject_id), {}).get('label', '')
+            self._add(GROUP, pk, name, subject_id=subject_id, subject=subject)
+
+    def put_subject(self, pk, name):
+        with self.lock:
+            self._add(SUBJECT, pk, name)
+            for (kind, _), item in self.items.items():
+                if kind == GROUP and item['subject_id'] == pk:
+                    item['subject'] = name
+
+    def remove(self, kind, pk):
+        with self.lock:
+            self._remove(kind, pk)
+
+    def search(self, prefix, limit=10):
+        """Top ``limit`` (kind, pk, item) matches: name starts first, then shorter names."""
+        prefix = normalize(prefix).strip()
+        if not prefix:
+            return []
+        terms = prefix.split()
+        first, rest = terms[-1], terms[:-1]
+        with self.lock:
+            i = bisect.bisect_left(self.keys, (first,))
+            matches = {}
+            for token, position, kind, pk in self.keys[i:i + MAX_SCAN]:
+                if not token.startswith(first):
+                    break
+                if (kind, pk) not in matches or position < matches[(kind, pk)]:
+                    matches[(kind, pk)] = position
+            results = []
+            for (kind, pk), position in matches.items():
+                item = self.items[(kind, pk)]
+                label = normalize(item['label'])
+                # Earlier words of a multi-word query must also appear in the name
+                if all(term in label for term in rest):
+                    results.append(((position > 0, kind != SUBJECT, len(label), label), kind, pk, dict(item)))
+        results.sort(key=lambda result: result[0])
+        return [(kind, pk, item) for _, kind, pk, item in results[:limit]]
+
+
+_index = None
+_build_lock = threading.Lock()
+_refreshing = threading.Lock()
+
+
+def build_index():
+    index = PrefixIndex()
+    groups = StudyGroup.objects.filter(is_active=True).values_list('pk', 'name', 'subject_id')
+    index.load(Subject.objects.values_list('pk', 'name').iterator(), groups.iterator(chunk_size=2000))
+    return index
+
+
+def _refresh(stale):
+    global _index
+    try:
+        index = build_index()
+        with _build_lock:
+            if _index is stale:
+                _index = index
+    except Exception:
+        logger.exception('Could not rebuild the autocomplete index')
+    finally:
+        connection.close()
+        _refreshing.release()
+
+
+def get_index():
+    """The process-wide index; built when missing, rebuilt in the background once older than the max age."""
+    global _index
+    index = _index
+    if index is None:
+        with _build_lock:
+            if _index is None:
+                _index = build_index()
+            return _index
+    if time.monotonic() - index.built_at > settings.AUTOCOMPLETE_INDEX_MAX_AGE and _refreshing.acquire(blocking=False):
+        threading.Thread(target=_refresh, args=(index,), name='autocomplete-refresh', daemon=True).start()
+    return index
+
+
+def warm_up():
+    """Build the index at server start-up; if the database is not ready, the first lookup builds it."""
+    try:
+        get_index()
+    except DatabaseError:
+        logger.warning('Could not build the autocomplete index at start-up', exc_info=True)
+
+
+def current_index():
+    """The index if it was already built in this process, else None (nothing to update)."""
+    return _index
+
+
+def suggest(prefix, limit=10):
+    return get_index().search(prefix, limit)
@@ -0,0 +1,7 @@
+from . import inbox
+
+
+def notifications(request):
+    """Unread badge count for the navbar, read from the cache only when a template uses it."""
+    user = getattr(request, 'user', None)
+    return {'unread_notification_count': lambda: inbox.unread_count(user) if user is not None else 0}
@@ -0,0 +1,57 @@
+"""Denormalized per-group counters (StudyGroup.member_count and friends).
+
+The signal handlers in core.signals adjust them with F() updates as rows are
+created and deleted; ``reconcile_counters`` recomputes them from the source
+tables to repair drift (bulk inserts, queryset.delete(), raw SQL, ...).
+"""
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import StudyGroup, GroupMembership, StudySession, StudyMaterial, Comment
+
+# StudyGroup counter field -> model whose rows it counts (via its ``group`` FK)
+COUNTER_SOURCES = {
+    'member_count': GroupMembership,
+    'session_count': StudySession,
+    'material_count': StudyMaterial,
+    'comment_count': Comment,
+}
+
+
+def counter_field(model):
+    for field, source in COUNTER_SOURCES.items():
+        if source is model:
+            return field
+    return None
+
+
+def adjust_counter(group_id, field, delta):
+    """Atomically add ``delta`` to one counter of a group."""
+    StudyGroup.objects.filter(pk=group_id).update(**{field: F(field) + delta})
+
+
+def counter_subqueries():
+    """{field: Subquery counting the field's source rows for OuterRef('pk')}."""
+    subqueries = {}
+    for field, model in COUNTER_SOURCES.items():
+        counts = (model.objects.filter(group=OuterRef('pk')).order_by()
+                  .values('group').annotate(n=Count('pk')).values('n'))
+        subqueries[field] = Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+    return subqueries
+
+
+def reconcile_counters(queryset=None, batch_size=500):
+    """Recompute the counters of ``queryset`` (default: every group). Returns the number of groups fixed.
+
+    Each fix is a single UPDATE ... SET field = (SELECT COUNT(*) ...), so
+    concurrent F() adjustments are never lost.
+    """
+    queryset = StudyGroup.objects.all() if queryset is None else queryset
+    mismatched = Q()
+    for field in COUNTER_SOURCES:
+        mismatched |= ~Q(**{field: F(f'actual_{field}')})
+    annotated = queryset.annotate(**{f'actual_{field}': expr for field, expr in counter_subqueries().items()})
+    pks = list(annotated.filter(mismatched).values_list('pk', flat=True))
+    for i in range(0, len(pks), batch_size):
+        StudyGroup.objects.filter(pk__in=pks[i:i + batch_size]).update(**counter_subqueries())
+    return len(pks)
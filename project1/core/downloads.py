@@ -0,0 +1,291 @@
+"""File download helpers: HTTP Range support, streamed zip archives and database snapshots."""
+import gzip
+import hashlib
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import time
+import uuid
+import zipfile
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import http_date, parse_http_date_safe
+
+logger = logging.getLogger(__name__)
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+class _FileRange:
+    """``length`` bytes of an open file from ``start``; the response closes the file."""
+
+    def __init__(self, f, start, length):
+        self.f = f
+        self.start = start
+        self.length = length
+
+    def __iter__(self):
+        self.f.seek(self.start)
+        remaining = self.length
+        while remaining > 0:
+            chunk = self.f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+    def close(self):
+        self.f.close()
+
+
+def file_validators(stat):
+    """(ETag, Last-Modified) of a file, from its modification time and size."""
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"', http_date(stat.st_mtime)
+
+
+def _if_range_matches(if_range, etag, stat):
+    if if_range.startswith(('"', 'W/')):
+        # If-Range requires a strong comparison
+        return if_range == etag
+    return parse_http_date_safe(if_range) == int(stat.st_mtime)
+
+
+def ranged_file_response(request, path, filename, content_type='application/octet-stream'):
+    """Serve ``path`` as an attachment, honouring a single ``Range: bytes=`` request.
+
+    Multi-range and malformed headers fall back to the full file, as allowed
+    by RFC 9110, and so does a range whose If-Range validator no longer
+    matches: the file was replaced, so the client must not join the parts.
+    Unsatisfiable ranges get a 416. The file is opened once, so a file
+    renamed into place mid-request does not mix with the validators sent.
+    """
+    f = open(path, 'rb')
+    stat = os.fstat(f.fileno())
+    size = stat.st_size
+    etag, last_modified = file_validators(stat)
+    match = RANGE_RE.match(request.headers.get('Range', '').strip())
+    if_range = request.headers.get('If-Range', '').strip()
+    if match and if_range and not _if_range_matches(if_range, etag, stat):
+        match = None
+    if not match or match.groups() == ('', ''):
+        response = FileResponse(f, as_attachment=True, filename=filename, content_type=content_type)
+        response['Accept-Ranges'] = 'bytes'
+        response['ETag'] = etag
+        response['Last-Modified'] = last_modified
+        return response
+
+    first, last = match.groups()
+    if first == '':
+        # Suffix range: the last N bytes
+        start = max(size - int(last), 0)
+        end = size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        f.close()
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    length = end - start + 1
+    response = StreamingHttpResponse(_FileRange(f, start, length), status=206, content_type=content_type)
+    response['Content-Length'] = str(length)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = last_modified
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+class _ZipBuffer:
+    """Write-only, non-seekable sink for ZipFile; drained after every write."""
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def directory_files(directory):
+    """Sorted (relative path, absolute path, stat) of every file below ``directory``."""
+    files = []
+    for root, dirs, names in os.walk(directory):
+        dirs.sort()
+        for name in sorted(names):
+            path = os.path.join(root, name)
+            files.append((os.path.relpath(path, directory).replace(os.sep, '/'), path, os.stat(path)))
+    return files
+
+
+def directory_signature(files):
+    """Hash of the names, sizes and mtimes of ``files``; changes whenever any file does."""
+    digest = hashlib.sha256()
+    for relpath, path, stat in files:
+        digest.update(f'{relpath}\0{stat.st_size}\0{stat.st_mtime_ns}\n'.encode())
+    return digest.hexdigest()
+
+
+def iter_zip(files, compression=zipfile.ZIP_DEFLATED):
+    """Yield a zip archive of ``files`` chunk by chunk.
+
+    Entries are written with data descriptors, so no seeking is needed and
+    at most one CHUNK_SIZE read (plus its compressed output) is in memory.
+    """
+    buffer = _ZipBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=compression) as archive:
+        for relpath, path, stat in files:
+            info = zipfile.ZipInfo.from_file(path, relpath)
+            info.compress_type = compression
+            with open(path, 'rb') as src, archive.open(info, 'w') as dest:
+                while True:
+                    chunk = src.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    dest.write(chunk)
+                    data = buffer.drain()
+                    if data:
+                        yield data
+            data = buffer.drain()
+            if data:
+                yield data
+    yield buffer.drain()
+
+
+def _cache_dir():
+    path = settings.DOWNLOAD_CACHE_DIR
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _tee_to_cache(chunks, final_path):
+    """Pass ``chunks`` through while saving them; the file only appears once complete."""
+    partial = f'{final_path}.{uuid.uuid4().hex}.part'
+    try:
+        with open(partial, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+                yield chunk
+        os.replace(partial, final_path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+
+
+def directory_zip_response(request, directory, filename):
+    """Serve ``directory`` as a zip attachment.
+
+    A prebuilt archive is reused (with Range support) while no file in
+    ``directory`` has changed. Otherwise the zip is streamed as it is built
+    and saved for the next request; concurrent requests each stream their own
+    copy and the last one to finish replaces the cache atomically.
+    """
+    files = directory_files(directory)
+    prefix = f'{os.path.basename(os.path.normpath(directory))}-'
+    cached = os.path.join(_cache_dir(), f'{prefix}{directory_signature(files)[:16]}.zip')
+    if os.path.exists(cached):
+        return ranged_file_response(request, cached, filename, 'application/zip')
+
+    # Drop archives of previous versions of the directory
+    for name in os.listdir(_cache_dir()):
+        if name.startswith(prefix) and name.endswith('.zip'):
+            try:
+                os.remove(os.path.join(_cache_dir(), name))
+            except FileNotFoundError:
+                pass
+
+    response = StreamingHttpResponse(_tee_to_cache(iter_zip(files), cached), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+SNAPSHOT_PAGES_PER_STEP = 256
+
+
+class SnapshotBusy(Exception):
+    """The database was written to during every attempt to copy it."""
+
+
+def sqlite_backup(source_path, dest_path, pages=SNAPSHOT_PAGES_PER_STEP, sleep=0.005, max_restarts=10):
+    """Copy a live SQLite database with the online backup API.
+
+    The copy advances ``pages`` pages at a time and releases the read lock in
+    between, so writers are never blocked for more than one step. SQLite
+    restarts the copy whenever another connection writes mid-backup, which
+    keeps the result consistent; after ``max_restarts`` restarts SnapshotBusy
+    is raised rather than holding the lock for a copy in a single step.
+    """
+    source = sqlite3.connect(f'file:{source_path}?mode=ro', uri=True)
+    dest = sqlite3.connect(dest_path)
+    state = {'remaining': None, 'restarts': 0}
+
+    def progress(status, remaining, total):
+        if state['remaining'] is not None and remaining > state['remaining']:
+            state['restarts'] += 1
+            if state['restarts'] > max_restarts:
+                raise SnapshotBusy(f'{source_path} changed during {state["restarts"]} backup attempts')
+        state['remaining'] = remaining
+
+    try:
+        source.backup(dest, pages=pages, progress=progress, sleep=sleep)
+    finally:
+        dest.close()
+        source.close()
+
+
+def database_snapshot(source_path, max_age_minutes=None):
+    """Path of a gzip-compressed, consistent snapshot of ``source_path``.
+
+    A snapshot younger than ``max_age_minutes`` (settings.DB_SNAPSHOT_CACHE_MINUTES
+    by default) is reused; otherwise a new one is built next to it and
+    renamed into place once complete. If the database is too busy to copy
+    (SnapshotBusy), the previous snapshot is returned when there is one.
+    """
+    if max_age_minutes is None:
+        max_age_minutes = settings.DB_SNAPSHOT_CACHE_MINUTES
+    snapshot = os.path.join(_cache_dir(), 'db-snapshot.sqlite3.gz')
+    try:
+        if time.time() - os.path.getmtime(snapshot) < max_age_minutes * 60:
+            return snapshot
+    except FileNotFoundError:
+        pass
+
+    token = uuid.uuid4().hex
+    raw = f'{snapshot}.{token}.db'
+    partial = f'{snapshot}.{token}.part'
+    try:
+        try:
+            sqlite_backup(source_path, raw)
+        except SnapshotBusy:
+            if not os.path.exists(snapshot):
+                raise
+            logger.warning('Database busy; serving the snapshot from %s', time.ctime(os.path.getmtime(snapshot)))
+            return snapshot
+        with open(raw, 'rb') as src, gzip.open(partial, 'wb', compresslevel=6) as dest:
+            shutil.copyfileobj(src, dest, CHUNK_SIZE)
+        os.replace(partial, snapshot)
+    finally:
+        for path in (raw, partial):
+            if os.path.exists(path):
+                os.remove(path)
+    return snapshot
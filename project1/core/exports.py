@@ -0,0 +1,458 @@
+"""Row generators, streaming helpers and background jobs for the data exports.
+
+Rows are read with ``values_list(...).iterator()`` so related names are
+joined in SQL and memory stays constant regardless of the export size.
+Exports are CSV by default; typed Parquet files are written when pyarrow is
+installed.
+"""
+import csv
+import datetime
+import gzip
+import hashlib
+import itertools
+import json
+import os
+import tempfile
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+
+from .models import (
+    Profile, StudyGroup, GroupMembership, StudySession, StudyMaterial, Comment, ExportJob,
+    ExportWatermark, ExportTombstone,
+)
+from .stats import cache as stats_cache
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; only needed for Parquet exports
+    pa = pq = None
+
+EXPORT_CHUNK_SIZE = 2000
+PARQUET_ROW_GROUP_SIZE = 50000
+PARQUET_CONTENT_TYPE = 'application/vnd.apache.parquet'
+
+SESSION_COLUMNS = ['date', 'start_time', 'end_time', 'duration_hours', 'title', 'created_by', 'group',
+                   'is_online', 'location', 'meeting_link', 'status']
+SESSION_TYPES = {
+    'date': 'date', 'start_time': 'time', 'end_time': 'time', 'duration_hours': 'float',
+    'title': 'str', 'created_by': 'str', 'group': 'str', 'is_online': 'bool',
+    'location': 'str', 'meeting_link': 'str', 'status': 'str',
+}
+TOP_MEMBER_COLUMNS = ['user', 'sessions', 'hours']
+TOP_MEMBER_TYPES = ['str', 'int', 'float']
+
+# Django internal field type -> export column type
+FIELD_TYPES = {
+    'AutoField': 'int', 'BigAutoField': 'int', 'IntegerField': 'int', 'BigIntegerField': 'int',
+    'PositiveIntegerField': 'int', 'PositiveSmallIntegerField': 'int', 'SmallIntegerField': 'int',
+    'ForeignKey': 'int', 'OneToOneField': 'int', 'FloatField': 'float', 'BooleanField': 'bool',
+    'DateField': 'date', 'TimeField': 'time', 'DateTimeField': 'datetime',
+}
+
+
+class Echo:
+    """File-like object whose write() just returns the value, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def session_records(sessions_qs, include_group=True):
+    """Yield one typed record per session (see SESSION_COLUMNS), ordered by date and start time."""
+    fields = ['date', 'start_time', 'end_time', 'duration_minutes', 'title', 'created_by__username',
+              'group__name', 'is_online', 'location', 'meeting_link', 'status']
+    values = sessions_qs.order_by('date', 'start_time').values_list(*fields)
+    for (date, start_time, end_time, minutes, title, creator, group_name,
+         is_online, location, meeting_link, status) in values.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        record = [date, start_time, end_time, round(minutes / 60.0, 2), title, creator or '']
+        if include_group:
+            record.append(group_name or '')
+        record += [is_online, location, meeting_link or '', status]
+        yield record
+
+
+def format_session_row(record):
+    """CSV representation of a session record."""
+    row = list(record)
+    row[0] = row[0].isoformat()
+    row[1] = row[1].isoformat() if row[1] else ''
+    row[2] = row[2].isoformat() if row[2] else ''
+    row[-4] = 'yes' if row[-4] else 'no'
+    return row
+
+
+def session_rows(sessions_qs, include_group=True):
+    """Yield one CSV row per session, ordered by date and start time."""
+    for record in session_records(sessions_qs, include_group):
+        yield format_session_row(record)
+
+
+def session_columns(include_group=True):
+    return [c for c in SESSION_COLUMNS if include_group or c != 'group']
+
+
+def session_types(include_group=True):
+    return [SESSION_TYPES[c] for c in session_columns(include_group)]
+
+
+def top_member_rows(sessions_qs):
+    """All session creators ranked by hours, then sessions, aggregated in SQL."""
+    rows = [
+        {
+            'user': row['created_by__username'] or 'Unknown',
+            'sessions': row['sessions'],
+            'hours': round((row['minutes'] or 0) / 60.0, 2),
+        }
+        for row in (sessions_qs
+                    .values('created_by__username')
+                    .annotate(sessions=Count('id'), minutes=Sum('duration_minutes'))
+                    .order_by())
+    ]
+    rows.sort(key=lambda x: (-x['hours'], -x['sessions'], x['user']))
+    return rows
+
+
+def top_member_records(sessions_qs):
+    return [[r['user'], r['sessions'], r['hours']] for r in top_member_rows(sessions_qs)]
+
+
+def csv_stream(header, rows):
+    """Yield the CSV-encoded header followed by each row."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def streaming_csv_response(header, rows, filename):
+    response = StreamingHttpResponse(csv_stream(header, rows), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def model_column_types(model, fields):
+    """Export column types for ``fields`` of ``model`` (``*_id`` names resolve to the FK)."""
+    types = []
+    for name in fields:
+        field = model._meta.get_field(name[:-3] if name.endswith('_id') else name)
+        types.append(FIELD_TYPES.get(field.get_internal_type(), 'str'))
+    return types
+
+
+def arrow_schema(columns, types):
+    arrow_types = {
+        'int': pa.int64(), 'float': pa.float64(), 'bool': pa.bool_(), 'str': pa.string(),
+        'date': pa.date32(), 'time': pa.time64('us'), 'datetime': pa.timestamp('us', tz='UTC'),
+    }
+    return pa.schema([pa.field(name, arrow_types[t]) for name, t in zip(columns, types)])
+
+
+def write_parquet(dest, columns, types, rows, row_group_size=PARQUET_ROW_GROUP_SIZE, compression='snappy'):
+    """Write ``rows`` to ``dest`` (path or binary file) as Parquet, one row group per batch.
+
+    Only one batch is held in memory at a time. Returns the number of rows written.
+    """
+    if pa is None:
+        raise RuntimeError('Parquet export requires pyarrow (pip install pyarrow)')
+    schema = arrow_schema(columns, types)
+    count = 0
+    with pq.ParquetWriter(dest, schema, compression=compression) as writer:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= row_group_size:
+                writer.write_table(_arrow_table(schema, batch), row_group_size=row_group_size)
+                count += len(batch)
+                batch = []
+        if batch or count == 0:
+            writer.write_table(_arrow_table(schema, batch), row_group_size=row_group_size)
+            count += len(batch)
+    return count
+
+
+def _arrow_table(schema, batch):
+    columns = list(zip(*batch)) if batch else [[] for _ in schema]
+    return pa.Table.from_arrays(
+        [pa.array(col, type=field.type) for col, field in zip(columns, schema)], schema=schema,
+    )
+
+
+def tabular_response(request, columns, types, records, base_filename, csv_format=None):
+    """CSV download of ``records`` (streamed), or Parquet with ``?format=parquet``."""
+    if request.GET.get('format') == 'parquet':
+        if pa is None:
+            return HttpResponse('Parquet export requires pyarrow', status=400)
+        # Parquet writes its footer last, so spool to memory/disk before sending
+        spool = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+        write_parquet(spool, columns, types, records)
+        spool.seek(0)
+        return FileResponse(spool, as_attachment=True, filename=f'{base_filename}.parquet',
+                            content_type=PARQUET_CONTENT_TYPE)
+    rows = map(csv_format, records) if csv_format else records
+    return streaming_csv_response(columns, rows, f'{base_filename}.csv')
+
+
+# Full table dumps: name -> (model, exported fields)
+TABLE_EXPORTS = {
+    'users': (User, ['id', 'username', 'email', 'first_name', 'last_name', 'is_staff', 'is_superuser',
+                     'is_active', 'date_joined']),
+    'profiles': (Profile, ['id', 'user_id', 'major', 'bio', 'interests', 'created_at']),
+    'groups': (StudyGroup, ['id', 'name', 'description', 'subject_id', 'created_by_id', 'max_members',
+                            'is_active', 'created_at']),
+    'memberships': (GroupMembership, ['id', 'user_id', 'group_id', 'role', 'joined_at']),
+    'sessions': (StudySession, ['id', 'group_id', 'title', 'description', 'date', 'start_time', 'end_time',
+                                'location', 'is_online', 'meeting_link', 'status', 'created_by_id',
+                                'created_at']),
+    'materials': (StudyMaterial, ['id', 'group_id', 'title', 'description', 'file', 'link',
+                                  'uploaded_by_id', 'created_at']),
+    'comments': (Comment, ['id', 'group_id', 'author_id', 'content', 'parent_id', 'created_at']),
+}
+
+
+def table_rows(table):
+    """Yield every row of one TABLE_EXPORTS table, in primary key order."""
+    model, fields = TABLE_EXPORTS[table]
+    yield from model.objects.order_by('pk').values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def table_for_model(model):
+    """TABLE_EXPORTS name of a model, or None if it is not exported."""
+    for table, (table_model, fields) in TABLE_EXPORTS.items():
+        if table_model is model:
+            return table
+    return None
+
+
+def write_rows(path, columns, types, rows, fmt='csv'):
+    """Write rows to ``path`` as CSV or Parquet. Returns the row count."""
+    if fmt == 'parquet':
+        return write_parquet(path, columns, types, rows)
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def delta_querysets(model, watermark, max_id, cutoff=None):
+    """Ordered querysets of the rows changed since ``watermark``, each served by an index, without overlap.
+
+    With a ``cutoff`` (models with ``updated_at``), rows exported before and
+    updated since come first, in updated_at order from its index (ordering them
+    by pk would make the planner walk the primary key instead). Rows inserted
+    since the last run follow from the primary key range.
+    """
+    querysets = []
+    if cutoff is not None:
+        updated = model.objects.filter(updated_at__lte=cutoff, pk__lte=watermark.last_id)
+        if watermark.last_updated_at:
+            updated = updated.filter(updated_at__gt=watermark.last_updated_at)
+        querysets.append(updated.order_by('updated_at', 'pk'))
+    querysets.append(model.objects.filter(pk__gt=watermark.last_id, pk__lte=max_id).order_by('pk'))
+    return querysets
+
+
+def write_delta(path, columns, types, rows, fmt='csv'):
+    """Like write_rows(), but no file is created when there are no rows."""
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return 0
+    return write_rows(path, columns, types, itertools.chain([first], rows), fmt)
+
+
+def export_deltas(export_dir, fmt='csv', tables=None):
+    """Export only the rows inserted, changed or deleted since the previous delta run.
+
+    For each table a watermark records the highest exported id, the
+    ``updated_at`` cut-off (for models that have one) and the last tombstone
+    id. Changed rows go to ``<table>_delta_<stamp>.<ext>`` and deleted ids to
+    ``<table>_deleted_<stamp>.<ext>``; tables without changes get no file. The watermark only advances once both
+    files are written. Returns {table: (changed, deleted)}.
+    """
+    os.makedirs(export_dir, exist_ok=True)
+    ext = 'parquet' if fmt == 'parquet' else 'csv'
+    stamp = timezone.now().strftime('%Y%m%dT%H%M%S')
+    results = {}
+    for table in tables or TABLE_EXPORTS:
+        model, fields = TABLE_EXPORTS[table]
+        has_updated_at = any(f.name == 'updated_at' for f in model._meta.concrete_fields)
+        watermark, _ = ExportWatermark.objects.get_or_create(table=table)
+
+        # Fix the upper bounds first; rows changed while exporting go to the next run
+        cutoff = timezone.now()
+        max_id = model.objects.aggregate(m=Max('pk'))['m'] or 0
+        max_tombstone = ExportTombstone.objects.filter(table=table).aggregate(m=Max('id'))['m'] or 0
+
+        rows = itertools.chain.from_iterable(
+            queryset.values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+            for queryset in delta_querysets(model, watermark, max_id, cutoff if has_updated_at else None)
+        )
+        n_changed = write_delta(os.path.join(export_dir, f'{table}_delta_{stamp}.{ext}'), fields,
+                                model_column_types(model, fields), rows, fmt)
+
+        deleted = (ExportTombstone.objects
+                   .filter(table=table, id__gt=watermark.last_tombstone_id, id__lte=max_tombstone)
+                   .order_by('id')
+                   .values_list('object_id', 'deleted_at')
+                   .iterator(chunk_size=EXPORT_CHUNK_SIZE))
+        n_deleted = write_delta(os.path.join(export_dir, f'{table}_deleted_{stamp}.{ext}'), ['id', 'deleted_at'],
+                                ['int', 'datetime'], deleted, fmt)
+
+        with transaction.atomic():
+            watermark.last_id = max(watermark.last_id, max_id)
+            if has_updated_at:
+                watermark.last_updated_at = cutoff
+            watermark.last_tombstone_id = max(watermark.last_tombstone_id, max_tombstone)
+            watermark.save()
+        results[table] = (n_changed, n_deleted)
+    return results
+
+
+def job_export(kind, params):
+    """Return (header, rows, base filename) for an ExportJob's kind and params."""
+    if kind == 'table':
+        table = params['table']
+        return TABLE_EXPORTS[table][1], table_rows(table), table
+
+    group_id = params.get('group_id')
+    start_date = datetime.date.fromisoformat(params['start'])
+    end_date = datetime.date.fromisoformat(params['end'])
+    sessions_qs = StudySession.objects.filter(date__gte=start_date, date__lte=end_date)
+    if group_id:
+        sessions_qs = sessions_qs.filter(group_id=group_id)
+    base = f"group_{group_id}" if group_id else 'global'
+    window = f"{start_date.isoformat()}_to_{end_date.isoformat()}"
+    if kind == 'sessions':
+        include_group = not group_id
+        return (session_columns(include_group), session_rows(sessions_qs, include_group),
+                f"{base}_sessions_{window}")
+    if kind == 'top_members':
+        return TOP_MEMBER_COLUMNS, top_member_records(sessions_qs), f"{base}_top_members_{window}"
+    raise ValueError(f'Unknown export kind: {kind}')
+
+
+def export_params_hash(kind, params):
+    """Hash of the job parameters and the current stats data version.
+
+    The version changes whenever the underlying sessions, materials, comments
+    or memberships change, so an identical request against unchanged data
+    reuses the existing artifact.
+    """
+    version = stats_cache.get_version(params.get('group_id'))
+    payload = json.dumps({'kind': kind, 'params': params, 'version': version}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def request_export(kind, params, user=None):
+    """Return an existing equivalent job or queue a new one. Returns (job, created)."""
+    params_hash = export_params_hash(kind, params)
+    existing = (ExportJob.objects
+                .filter(params_hash=params_hash, status__in=['pending', 'running', 'done'])
+                .order_by('-created_at')
+                .first())
+    if existing and (existing.status != 'done' or (existing.file and existing.file.storage.exists(existing.file.name))):
+        return existing, False
+    job = ExportJob.objects.create(kind=kind, params=params, params_hash=params_hash, requested_by=user)
+    return job, True
+
+
+class LeaseLost(Exception):
+    """Another worker reclaimed the job after this worker's lease expired."""
+
+
+def _lease_expiry():
+    return timezone.now() + datetime.timedelta(seconds=settings.EXPORT_JOB_LEASE_SECONDS)
+
+
+def _held(job):
+    # started_at is set by each claim, so it identifies the worker holding the job
+    return ExportJob.objects.filter(pk=job.pk, status='running', started_at=job.started_at)
+
+
+def claim_next_job():
+    """Atomically claim the oldest pending job, or a running one whose lease expired (its worker died).
+
+    Returns the job, now running, or None.
+    """
+    now = timezone.now()
+    claimable = (Q(status='pending') |
+                 Q(status='running', lease_expires_at__lt=now) |
+                 Q(status='running', lease_expires_at__isnull=True))
+    for job in ExportJob.objects.filter(claimable).order_by('created_at')[:10]:
+        claimed = ExportJob.objects.filter(claimable, pk=job.pk).update(
+            status='running', started_at=now, lease_expires_at=_lease_expiry(),
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
+
+
+def renew_lease(job):
+    """Extend the worker's claim on ``job``; raises LeaseLost if another worker reclaimed it."""
+    expires = _lease_expiry()
+    if not _held(job).update(lease_expires_at=expires):
+        raise LeaseLost(f'Export job {job.pk} was reclaimed by another worker')
+    job.lease_expires_at = expires
+
+
+def run_export_job(job):
+    """Write a job's CSV gzip-compressed under EXPORT_JOB_DIR and mark it done.
+
+    The lease is renewed while rows are written. If another worker reclaimed
+    the job in the meantime, this run is abandoned and leaves the job alone.
+    """
+    tmp_path = None
+    storage = job.file.storage
+    renew_at = timezone.now() + datetime.timedelta(seconds=settings.EXPORT_JOB_LEASE_SECONDS / 2)
+    try:
+        header, rows, base = job_export(job.kind, job.params)
+        name = f"{base}_{job.params_hash[:12]}.csv.gz"
+        path = storage.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        count = 0
+        with gzip.open(tmp_path, 'wt', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+                if count % EXPORT_CHUNK_SIZE == 0 and timezone.now() >= renew_at:
+                    renew_lease(job)
+                    renew_at = timezone.now() + datetime.timedelta(seconds=settings.EXPORT_JOB_LEASE_SECONDS / 2)
+        os.replace(tmp_path, path)
+    except LeaseLost:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        job.refresh_from_db()
+        return job
+    except Exception as exc:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        job.status = 'failed'
+        job.error = f'{type(exc).__name__}: {exc}'
+        job.finished_at = timezone.now()
+        _held(job).update(status=job.status, error=job.error, finished_at=job.finished_at, lease_expires_at=None)
+        return job
+
+    job.file.name = name
+    job.row_count = count
+    job.status = 'done'
+    job.finished_at = timezone.now()
+    if not _held(job).update(file=name, row_count=count, status='done', finished_at=job.finished_at,
+                             lease_expires_at=None):
+        # Reclaimed after the last renewal; the other worker writes the same artifact
+        job.refresh_from_db()
+    return job
@@ -0,0 +1,84 @@
+"""Notification inbox: per-user unread counts kept in the cache.
+
+The unread badge is rendered on every page, so its count must not cost a
+query. Each user's count lives in the cache. It is computed once on a miss,
+incremented when notifications are created (``core.push.announce()``, run
+after commit by the Notification post_save handler in core.signals or by code
+that uses bulk_create), and decremented when they are marked read. Deletions are not
+tracked; the count expires after NOTIFICATION_COUNT_CACHE_TIMEOUT seconds
+and is recounted. With a process-local cache the other workers never see
+those updates, so counts expire after NOTIFICATION_COUNT_LOCAL_CACHE_TIMEOUT
+instead.
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import versions
+from .models import Notification
+
+
+def _key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def cache_timeout():
+    if versions.is_shared_cache():
+        return settings.NOTIFICATION_COUNT_CACHE_TIMEOUT
+    return settings.NOTIFICATION_COUNT_LOCAL_CACHE_TIMEOUT
+
+
+def unread_count(user):
+    """Unread notifications of ``user`` (0 for anonymous users); a cache hit runs no queries."""
+    if not user.is_authenticated:
+        return 0
+    count = cache.get(_key(user.pk))
+    if count is None:
+        count = Notification.objects.filter(recipient=user, is_read=False).count()
+        # add(), not set(): an increment that raced with the count wins
+        cache.add(_key(user.pk), count, cache_timeout())
+        count = cache.get(_key(user.pk), count)
+    return max(count, 0)
+
+
+def cached_unread_counts(user_ids):
+    """{user_id: unread count} for the users whose count is cached; runs no queries."""
+    cached = cache.get_many([_key(user_id) for user_id in user_ids])
+    return {user_id: max(cached[_key(user_id)], 0) for user_id in user_ids if _key(user_id) in cached}
+
+
+def _adjust(user_id, delta):
+    try:
+        if delta > 0:
+            cache.incr(_key(user_id), delta)
+        elif delta < 0:
+            cache.decr(_key(user_id), -delta)
+    except ValueError:
+        # Not cached: the next unread_count() recounts
+        pass
+
+
+def notifications_created(recipient_ids):
+    """Count new unread notifications; one entry in ``recipient_ids`` per notification."""
+    for user_id, count in Counter(recipient_ids).items():
+        _adjust(user_id, count)
+
+
+def mark_read(user, notification_id):
+    """Mark one of the user's notifications read. Returns the notification, or None if it is not theirs."""
+    notification = Notification.objects.filter(pk=notification_id, recipient=user).first()
+    if notification is None:
+        return None
+    if not notification.is_read:
+        updated = Notification.objects.filter(pk=notification.pk, is_read=False).update(is_read=True)
+        _adjust(user.pk, -updated)
+        notification.is_read = True
+    return notification
+
+
+def mark_all_read(user):
+    """Mark every unread notification of the user read with a single UPDATE. Returns how many."""
+    updated = Notification.objects.filter(recipient=user, is_read=False).update(is_read=True)
+    _adjust(user.pk, -updated)
+    return updated
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.reminders import dispatch_reminders
+
+
+class Command(BaseCommand):
+    help = 'Send reminders for the study sessions starting within the next hours (each session once).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=24, help='Remind sessions starting within this many hours')
+        parser.add_argument('--workers', type=int, default=4, help='Groups processed in parallel')
+        parser.add_argument('--loop', action='store_true', help='Keep running instead of exiting after one pass')
+        parser.add_argument('--interval', type=float, default=300, help='Seconds between passes with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            sessions, notifications = dispatch_reminders(options['hours'], options['workers'])
+            self.stdout.write(self.style.SUCCESS(
+                f'Reminded {sessions} session(s), {notifications} notification(s) queued'
+            ))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
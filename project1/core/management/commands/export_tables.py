@@ -0,0 +1,36 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.exports import TABLE_EXPORTS, export_deltas, model_column_types, table_rows, write_rows
+
+
+class Command(BaseCommand):
+    help = 'Export the data tables to CSV or Parquet files, either in full or as deltas since the last --delta run.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--export-dir', default=str(settings.BASE_DIR / 'exports'))
+        parser.add_argument('--format', choices=['csv', 'parquet'], default='csv')
+        parser.add_argument('--delta', action='store_true',
+                            help='Only export rows inserted, updated or deleted since the previous delta run')
+        parser.add_argument('--table', action='append', choices=sorted(TABLE_EXPORTS),
+                            help='Limit the export to this table (repeatable)')
+
+    def handle(self, *args, **options):
+        export_dir, fmt = options['export_dir'], options['format']
+        tables = options['table'] or list(TABLE_EXPORTS)
+        try:
+            if options['delta']:
+                for table, (changed, deleted) in export_deltas(export_dir, fmt, tables).items():
+                    self.stdout.write(f'{table}: {changed} changed, {deleted} deleted')
+            else:
+                os.makedirs(export_dir, exist_ok=True)
+                for table in tables:
+                    model, fields = TABLE_EXPORTS[table]
+                    path = os.path.join(export_dir, f'{table}.{fmt}')
+                    count = write_rows(path, fields, model_column_types(model, fields), table_rows(table), fmt)
+                    self.stdout.write(f'{table}: {count} rows')
+        except RuntimeError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(f'Exports saved in {export_dir}'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from core.search import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index of study groups (FTS5 on SQLite, tsvector on Postgres).'
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        count = backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} groups ({backend.name})'))
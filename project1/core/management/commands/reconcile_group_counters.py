@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Recompute the member/session/material/comment counters of every study group from the source tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Groups fixed per UPDATE')
+
+    def handle(self, *args, **options):
+        fixed = reconcile_counters(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Fixed counters on {fixed} group(s)'))
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.exports import claim_next_job, run_export_job
+
+
+class Command(BaseCommand):
+    help = 'Process queued background export jobs (ExportJob) and store their gzip-compressed CSVs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds between queue checks')
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+            self.stdout.write(f'Running {job}...')
+            run_export_job(job)
+            if job.status == 'done':
+                self.stdout.write(self.style.SUCCESS(f'{job}: {job.row_count} rows -> {job.file.name}'))
+            elif job.status == 'failed':
+                self.stdout.write(self.style.ERROR(f'{job}: {job.error}'))
+            else:
+                self.stdout.write(self.style.WARNING(f'{job}: reclaimed by another worker after its lease expired'))
@@ -0,0 +1,40 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.outbox import worker_loop
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued outbound email (OutboundEmail) with a pool of worker threads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=settings.OUTBOX_WORKER_THREADS,
+                            help='Worker threads, each with its own mail connection')
+        parser.add_argument('--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE,
+                            help='Emails claimed and sent per connection')
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds between queue checks')
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        lock = threading.Lock()
+
+        def report(thread, sent, failed):
+            with lock:
+                message = f'{thread}: sent {sent}, failed {failed}'
+                self.stdout.write(self.style.SUCCESS(message) if not failed else self.style.WARNING(message))
+
+        with ThreadPoolExecutor(max_workers=options['threads'], thread_name_prefix='mail') as pool:
+            futures = [
+                pool.submit(worker_loop, stop, options['batch_size'], options['poll_interval'], options['once'], report)
+                for _ in range(options['threads'])
+            ]
+            try:
+                for future in futures:
+                    future.result()
+            except KeyboardInterrupt:
+                self.stdout.write('Stopping after the current batches...')
+                stop.set()
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_comment_notification'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SessionDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('session_count', models.IntegerField(default=0)),
+                ('total_minutes', models.IntegerField(default=0)),
+                ('hist_0', models.IntegerField(default=0)),
+                ('hist_1', models.IntegerField(default=0)),
+                ('hist_2', models.IntegerField(default=0)),
+                ('hist_3', models.IntegerField(default=0)),
+                ('hist_4', models.IntegerField(default=0)),
+                ('hist_5', models.IntegerField(default=0)),
+                ('hist_6', models.IntegerField(default=0)),
+                ('hist_7', models.IntegerField(default=0)),
+                ('creator', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='session_rollups', to=settings.AUTH_USER_MODEL)),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='session_rollups', to='core.studygroup')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['group', 'day'], name='core_sessio_group_i_b5e739_idx'), models.Index(fields=['creator', 'day'], name='core_sessio_creator_09bef3_idx')],
+                'unique_together': {('day', 'group', 'creator')},
+            },
+        ),
+    ]
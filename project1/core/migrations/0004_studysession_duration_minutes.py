@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:10
+
+from django.db import migrations, models
+
+
+def backfill_duration_minutes(apps, schema_editor):
+    StudySession = apps.get_model('core', 'StudySession')
+    batch = []
+    for session in StudySession.objects.only('id', 'start_time', 'end_time').iterator(chunk_size=2000):
+        minutes = 0
+        if session.start_time and session.end_time:
+            start_secs = session.start_time.hour * 3600 + session.start_time.minute * 60 + session.start_time.second
+            end_secs = session.end_time.hour * 3600 + session.end_time.minute * 60 + session.end_time.second
+            if end_secs > start_secs:
+                minutes = int(round((end_secs - start_secs) / 60.0))
+        session.duration_minutes = minutes
+        batch.append(session)
+        if len(batch) >= 2000:
+            StudySession.objects.bulk_update(batch, ['duration_minutes'])
+            batch = []
+    if batch:
+        StudySession.objects.bulk_update(batch, ['duration_minutes'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_session_daily_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studysession',
+            name='duration_minutes',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_duration_minutes, migrations.RunPython.noop),
+    ]
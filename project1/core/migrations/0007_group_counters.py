@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:33
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_group_counters(apps, schema_editor):
+    StudyGroup = apps.get_model('core', 'StudyGroup')
+    sources = {
+        'member_count': apps.get_model('core', 'GroupMembership'),
+        'session_count': apps.get_model('core', 'StudySession'),
+        'material_count': apps.get_model('core', 'StudyMaterial'),
+        'comment_count': apps.get_model('core', 'Comment'),
+    }
+    updates = {}
+    for field, model in sources.items():
+        counts = (model.objects.filter(group=OuterRef('pk')).order_by()
+                  .values('group').annotate(n=Count('pk')).values('n'))
+        updates[field] = Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+    StudyGroup.objects.update(**updates)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_export_watermarks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studygroup',
+            name='comment_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='studygroup',
+            name='material_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='studygroup',
+            name='member_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='studygroup',
+            name='session_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_group_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+
+def create_search_index(apps, schema_editor):
+    """FTS5 table on SQLite, tsvector + GIN side table on Postgres; nothing elsewhere.
+
+    Search falls back to icontains when the table doesn't exist, so a SQLite
+    build without FTS5 simply skips it.
+    """
+    vendor = schema_editor.connection.vendor
+    with schema_editor.connection.cursor() as cursor:
+        if vendor == 'sqlite':
+            try:
+                cursor.execute(
+                    "CREATE VIRTUAL TABLE core_studygroup_fts USING fts5("
+                    "name, subject, description, tokenize = 'unicode61 remove_diacritics 2')"
+                )
+            except OperationalError:
+                return
+            cursor.execute(
+                'INSERT INTO core_studygroup_fts (rowid, name, subject, description) '
+                'SELECT g.id, g.name, s.name, g.description FROM core_studygroup g '
+                'JOIN core_subject s ON s.id = g.subject_id'
+            )
+        elif vendor == 'postgresql':
+            cursor.execute(
+                'CREATE TABLE core_studygroup_search ('
+                'group_id bigint PRIMARY KEY REFERENCES core_studygroup(id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, '
+                'document tsvector NOT NULL)'
+            )
+            cursor.execute('CREATE INDEX core_studygroup_search_document ON core_studygroup_search USING GIN (document)')
+            cursor.execute(
+                "INSERT INTO core_studygroup_search (group_id, document) "
+                "SELECT g.id, setweight(to_tsvector('simple', coalesce(g.name, '')), 'A') || "
+                "setweight(to_tsvector('simple', coalesce(s.name, '')), 'B') || "
+                "setweight(to_tsvector('simple', coalesce(g.description, '')), 'C') "
+                "FROM core_studygroup g JOIN core_subject s ON s.id = g.subject_id"
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('DROP TABLE IF EXISTS core_studygroup_fts')
+        cursor.execute('DROP TABLE IF EXISTS core_studygroup_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_group_waitlist'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_group_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='studygroup',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['created_at', 'id'], name='core_group_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studygroup',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['subject', 'created_at', 'id'], name='core_group_subject_created_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_outbound_email'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studysession',
+            name='reminded_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='studysession',
+            index=models.Index(condition=models.Q(('reminded_at__isnull', True), ('status', 'scheduled')), fields=['date', 'start_time'], name='core_session_unreminded_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:20
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_updated_at_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='sessiondailyrollup',
+            name='hist_0',
+        ),
+        migrations.RemoveField(
+            model_name='sessiondailyrollup',
+            name='hist_1',
+        ),
+        migrations.RemoveField(
+            model_name='sessiondailyrollup',
+            name='hist_2',
+        ),
+        migrations.RemoveField(
+            model_name='sessiondailyrollup',
+            name='hist_3',
+        ),
+        migrations.RemoveField(
+            model_name='sessiondailyrollup',
+            name='hist_4',
+        ),
+        migrations.RemoveField(
+            model_name='sessiondailyrollup',
+            name='hist_5',
+        ),
+        migrations.RemoveField(
+            model_name='sessiondailyrollup',
+            name='hist_6',
+        ),
+        migrations.RemoveField(
+            model_name='sessiondailyrollup',
+            name='hist_7',
+        ),
+    ]
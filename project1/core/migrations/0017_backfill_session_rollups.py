@@ -0,0 +1,37 @@
+from django.db import migrations
+from django.db.models import Count, Sum
+
+
+def rebuild_session_rollups(apps, schema_editor):
+    # Same as core.rollups.rebuild_rollups, on the historical models; databases that
+    # had sessions before 0003 would otherwise show empty dashboards until someone
+    # ran rebuild_session_rollups
+    StudySession = apps.get_model('core', 'StudySession')
+    SessionDailyRollup = apps.get_model('core', 'SessionDailyRollup')
+    per_day = (StudySession.objects
+               .values('date', 'group_id', 'created_by_id')
+               .annotate(session_count=Count('id'), total_minutes=Sum('duration_minutes'))
+               .order_by())
+    SessionDailyRollup.objects.all().delete()
+    batch = []
+    for row in per_day.iterator(chunk_size=2000):
+        batch.append(SessionDailyRollup(
+            day=row['date'], group_id=row['group_id'], creator_id=row['created_by_id'],
+            session_count=row['session_count'], total_minutes=row['total_minutes'] or 0,
+        ))
+        if len(batch) >= 2000:
+            SessionDailyRollup.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        SessionDailyRollup.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_remove_rollup_histogram'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_session_rollups, migrations.RunPython.noop),
+    ]
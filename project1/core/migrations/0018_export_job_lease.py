@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:22
+
+import os
+import shutil
+
+import core.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+def move_artifacts_out_of_media(apps, schema_editor):
+    # Artifacts used to be written to MEDIA_ROOT/exports/, which is served publicly
+    ExportJob = apps.get_model('core', 'ExportJob')
+    for job in ExportJob.objects.exclude(file=''):
+        old_path = os.path.join(settings.MEDIA_ROOT, job.file.name)
+        name = os.path.basename(job.file.name)
+        if os.path.exists(old_path):
+            os.makedirs(settings.EXPORT_JOB_DIR, exist_ok=True)
+            shutil.move(old_path, os.path.join(settings.EXPORT_JOB_DIR, name))
+        ExportJob.objects.filter(pk=job.pk).update(file=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_backfill_session_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportjob',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='exportjob',
+            name='file',
+            field=models.FileField(blank=True, storage=core.models.export_job_storage, upload_to=''),
+        ),
+        migrations.RunPython(move_artifacts_out_of_media, migrations.RunPython.noop),
+    ]
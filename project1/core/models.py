@@ -1,10 +1,9 @@
+from django.core.files.storage import FileSystemStorage
 from django.db import models
 from django.contrib.auth.models import User
 from django.urls import reverse
-from django.core.mail import send_mail
 from django.conf import settings
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
+from django.utils import timezone
 
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -14,6 +13,12 @@ class Profile(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Rows changed since the last delta export (core.exports.export_deltas)
+            models.Index(fields=['updated_at']),
+        ]
+
     def __str__(self):
         return f"{self.user.username}'s profile"
 
@@ -34,10 +39,37 @@ class StudyGroup(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
+    # Denormalized counters kept in sync by core.signals; repair with reconcile_group_counters
+    member_count = models.IntegerField(default=0, editable=False)
+    session_count = models.IntegerField(default=0, editable=False)
+    material_count = models.IntegerField(default=0, editable=False)
+    comment_count = models.IntegerField(default=0, editable=False)
+
+    COUNTER_FIELDS = ('member_count', 'session_count', 'material_count', 'comment_count')
+
+    class Meta:
+        # Keyset pagination of the group list (core.pagination), with and without a subject filter
+        indexes = [
+            models.Index(fields=['created_at', 'id'], condition=models.Q(is_active=True),
+                         name='core_group_active_created_idx'),
+            models.Index(fields=['subject', 'created_at', 'id'], condition=models.Q(is_active=True),
+                         name='core_group_subject_created_idx'),
+            # Rows changed since the last delta export (core.exports.export_deltas)
+            models.Index(fields=['updated_at']),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # Counters only change through F() updates; a stale instance must not overwrite them
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     def get_absolute_url(self):
         return reverse('core:group_detail', args=[str(self.id)])
 
@@ -55,10 +87,24 @@ class GroupMembership(models.Model):
 
     class Meta:
         unique_together = ['user', 'group']
+        indexes = [models.Index(fields=['group', 'role'])]
 
     def __str__(self):
         return f"{self.user.username} in {self.group.name}"
 
+class GroupWaitlistEntry(models.Model):
+    """A user waiting for a seat in a full group; promoted first come, first served."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='group_waitlists')
+    group = models.ForeignKey(StudyGroup, on_delete=models.CASCADE, related_name='waitlist')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['user', 'group']
+        ordering = ['created_at', 'id']
+
+    def __str__(self):
+        return f'{self.user.username} waiting for {self.group.name}'
+
 class StudySession(models.Model):
     STATUS_CHOICES = [
         ('scheduled', 'Scheduled'),
@@ -78,12 +124,69 @@ class StudySession(models.Model):
     meeting_link = models.URLField(blank=True, null=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='scheduled')
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    duration_minutes = models.PositiveIntegerField(default=0, editable=False)
+    # Claimed by dispatch_reminders (core.reminders); cleared when the session is rescheduled
+    reminded_at = models.DateTimeField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['group', 'date']),
+            models.Index(fields=['created_by', 'date']),
+            # Upcoming sessions of a group: status filter plus the (date, start_time) ordering
+            models.Index(fields=['group', 'status', 'date', 'start_time']),
+            # Only sessions still waiting for their reminder, in start order
+            models.Index(fields=['date', 'start_time'],
+                         condition=models.Q(status='scheduled', reminded_at__isnull=True),
+                         name='core_session_unreminded_idx'),
+            # Rows changed since the last delta export (core.exports.export_deltas)
+            models.Index(fields=['updated_at']),
+        ]
+
     def __str__(self):
         return f"{self.title} - {self.date}"
 
+    @staticmethod
+    def compute_duration_minutes(start_time, end_time):
+        """Length in whole minutes between two times (0 if missing or inverted)."""
+        if not start_time or not end_time:
+            return 0
+        start_secs = start_time.hour * 3600 + start_time.minute * 60 + start_time.second
+        end_secs = end_time.hour * 3600 + end_time.minute * 60 + end_time.second
+        if end_secs <= start_secs:
+            return 0
+        return int(round((end_secs - start_secs) / 60.0))
+
+    def save(self, *args, **kwargs):
+        self.duration_minutes = self.compute_duration_minutes(self.start_time, self.end_time)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'start_time', 'end_time'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'duration_minutes'}
+        super().save(*args, **kwargs)
+
+class SessionDailyRollup(models.Model):
+    """Per-day session totals for one group and creator.
+
+    Kept in sync with StudySession by the signal handlers in core.signals and
+    rebuilt from scratch with ``manage.py rebuild_session_rollups``.
+    """
+    day = models.DateField()
+    group = models.ForeignKey(StudyGroup, on_delete=models.CASCADE, related_name='session_rollups')
+    creator = models.ForeignKey(User, on_delete=models.CASCADE, related_name='session_rollups')
+    session_count = models.IntegerField(default=0)
+    total_minutes = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ['day', 'group', 'creator']
+        indexes = [
+            models.Index(fields=['group', 'day']),
+            models.Index(fields=['creator', 'day']),
+        ]
+
+    def __str__(self):
+        return f"{self.day} - {self.group_id}/{self.creator_id}: {self.session_count} sessions"
+
 class StudyMaterial(models.Model):
     group = models.ForeignKey(StudyGroup, on_delete=models.CASCADE)
     title = models.CharField(max_length=200)
@@ -94,6 +197,12 @@ class StudyMaterial(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Rows changed since the last delta export (core.exports.export_deltas)
+            models.Index(fields=['updated_at']),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -108,6 +217,11 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['group', 'parent', 'created_at']),
+            # Rows changed since the last delta export (core.exports.export_deltas)
+            models.Index(fields=['updated_at']),
+        ]
 
     def __str__(self):
         return f'Comment by {self.author.username} on {self.group.name}'
@@ -136,39 +250,118 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Unread inbox and badge; a partial index because SQLite compiles is_read=False to
+            # NOT is_read, which a (recipient, is_read, created_at) index cannot seek on
+            models.Index(fields=['recipient', 'created_at'], condition=models.Q(is_read=False),
+                         name='core_notification_unread_idx'),
+            # Inbox pages (keyset pagination over created_at, id)
+            models.Index(fields=['recipient', 'created_at', 'id'], name='core_notification_inbox_idx'),
+        ]
 
     def __str__(self):
         return f'{self.notification_type} for {self.recipient.username}'
 
     @classmethod
     def send_session_reminder(cls, session):
-        """Send email notification for upcoming study session"""
-        for member in session.group.members.all():
-            # Create notification
-            notification = cls.objects.create(
-                recipient=member,
-                notification_type='session_reminder',
-                group=session.group,
-                title=f'Upcoming Session: {session.title}',
-                message=f'Your study session "{session.title}" is scheduled for {session.date} at {session.start_time}',
-                related_link=reverse('core:session_detail', args=[session.group.id, session.id])
-            )
-            
-            # Send email
-            context = {
-                'user': member,
-                'session': session,
-                'group': session.group,
-            }
-            
-            html_message = render_to_string('core/email/session_reminder.html', context)
-            plain_message = strip_tags(html_message)
-            
-            send_mail(
-                subject=f'Study Session Reminder: {session.title}',
-                message=plain_message,
-                html_message=html_message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[member.email],
-                fail_silently=True
-            )
\ No newline at end of file
+        """Notify every member of the session's group and queue their emails (see core.reminders)."""
+        from .reminders import send_session_reminders
+        return send_session_reminders(session)
+
+def export_job_storage():
+    """Private storage of export artifacts, outside the publicly served MEDIA_ROOT."""
+    return FileSystemStorage(location=settings.EXPORT_JOB_DIR, base_url=None)
+
+
+class ExportJob(models.Model):
+    KIND_CHOICES = [
+        ('sessions', 'Sessions CSV'),
+        ('top_members', 'Top members CSV'),
+        ('table', 'Table dump CSV'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    params = models.JSONField(default=dict, blank=True)
+    params_hash = models.CharField(max_length=64, db_index=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='export_jobs')
+    # Served only through export_job_download, which checks the owner
+    file = models.FileField(storage=export_job_storage, blank=True)
+    row_count = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Renewed by the worker while it runs the job; other workers reclaim the job once it expires
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f'{self.kind} export #{self.pk} ({self.status})'
+
+    def get_absolute_url(self):
+        return reverse('core:export_job_status', args=[self.pk])
+
+
+class ExportWatermark(models.Model):
+    """High-water marks of the last delta export of one table."""
+    table = models.CharField(max_length=50, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    last_updated_at = models.DateTimeField(null=True, blank=True)
+    last_tombstone_id = models.BigIntegerField(default=0)
+    exported_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.table} @ id {self.last_id}'
+
+
+class ExportTombstone(models.Model):
+    """A deleted row, so delta exports can propagate deletions."""
+    table = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['table', 'id'])]
+
+    def __str__(self):
+        return f'{self.table} #{self.object_id} deleted'
+
+
+class OutboundEmail(models.Model):
+    """An email waiting in the outbox; delivered by the run_mail_worker command (core.outbox)."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('dead', 'Dead letter'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=254)
+    to = models.JSONField(default=list)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    # Set when a worker claims the row; a claim whose lease expired is picked up again
+    claim_token = models.CharField(max_length=32, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+
+    def __str__(self):
+        return f'{self.subject} -> {", ".join(self.to)} ({self.status})'
@@ -0,0 +1,163 @@
+"""Durable email outbox.
+
+Code that sends email calls ``enqueue()`` inside the same transaction as the
+rows the emails are about, so an email exists if and only if its transaction
+committed. The ``run_mail_worker`` command drains the OutboundEmail table with
+a pool of threads. Each thread claims a batch of due rows with a conditional
+UPDATE and sends them over one mail connection. Failed messages are retried
+with exponential backoff; after OUTBOX_MAX_ATTEMPTS they are dead-lettered
+(status 'dead') and can be requeued from the admin.
+"""
+import logging
+import random
+import smtplib
+import threading
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import close_old_connections, connection as db_connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+# Errors after which the mail connection is assumed broken and reopened
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, OSError)
+
+
+def enqueue(messages):
+    """Store EmailMessage objects in the outbox. Returns the OutboundEmail rows."""
+    rows = []
+    for message in messages:
+        html_body = ''
+        for content, mimetype in getattr(message, 'alternatives', []):
+            if mimetype == 'text/html':
+                html_body = content
+        rows.append(OutboundEmail(
+            subject=message.subject, body=message.body, html_body=html_body,
+            from_email=message.from_email or settings.DEFAULT_FROM_EMAIL, to=list(message.to),
+        ))
+    return OutboundEmail.objects.bulk_create(rows, batch_size=500)
+
+
+def as_message(email):
+    message = EmailMultiAlternatives(email.subject, email.body, email.from_email, email.to)
+    if email.html_body:
+        message.attach_alternative(email.html_body, 'text/html')
+    return message
+
+
+def retry_delay(attempts):
+    """Backoff before attempt ``attempts + 1``: base * 2**(attempts - 1), capped, with +-10% jitter."""
+    delay = min(settings.OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.OUTBOX_RETRY_MAX_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.9, 1.1))
+
+
+def claim_batch(limit):
+    """Claim up to ``limit`` due emails for this worker; returns them oldest first ([] if none are due)."""
+    while True:
+        now = timezone.now()
+        due = (Q(status='pending', next_attempt_at__lte=now) |
+               Q(status='sending', locked_until__lt=now))
+        ids = list(OutboundEmail.objects.filter(due).order_by('next_attempt_at', 'id')
+                   .values_list('id', flat=True)[:limit])
+        if not ids:
+            return []
+        token = uuid.uuid4().hex
+        # Rows another worker claimed in the meantime no longer match `due` and are skipped
+        claimed = OutboundEmail.objects.filter(due, pk__in=ids).update(
+            status='sending', claim_token=token, locked_until=now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS),
+        )
+        if claimed:
+            return list(OutboundEmail.objects.filter(claim_token=token, status='sending').order_by('next_attempt_at', 'id'))
+
+
+def _record_failure(email, error):
+    email.attempts += 1
+    email.last_error = f'{type(error).__name__}: {error}'[:2000]
+    email.locked_until = None
+    if email.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        email.status = 'dead'
+        logger.error('Dead-lettered outbound email %s after %d attempts: %s', email.pk, email.attempts, error)
+    else:
+        email.status = 'pending'
+        email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+    OutboundEmail.objects.filter(pk=email.pk, claim_token=email.claim_token).update(
+        status=email.status, attempts=email.attempts, last_error=email.last_error,
+        next_attempt_at=email.next_attempt_at, locked_until=None,
+    )
+
+
+def deliver(emails, connection=None):
+    """Send claimed emails over one connection. Returns (sent, failed)."""
+    connection = connection or get_connection()
+    try:
+        connection.open()
+    except CONNECTION_ERRORS as error:
+        for email in emails:
+            _record_failure(email, error)
+        return 0, len(emails)
+    sent_ids, failed = [], 0
+    try:
+        for email in emails:
+            try:
+                if not connection.send_messages([as_message(email)]):
+                    raise smtplib.SMTPException('Message was not sent')
+            except Exception as error:
+                failed += 1
+                _record_failure(email, error)
+                if isinstance(error, CONNECTION_ERRORS):
+                    connection.close()
+                    try:
+                        connection.open()
+                    except CONNECTION_ERRORS:
+                        # Server gone: leave the rest for the next lease
+                        break
+            else:
+                sent_ids.append(email.pk)
+    finally:
+        try:
+            connection.close()
+        except CONNECTION_ERRORS:
+            pass
+        if sent_ids:
+            OutboundEmail.objects.filter(pk__in=sent_ids, status='sending').update(
+                status='sent', sent_at=timezone.now(), locked_until=None, last_error='',
+            )
+    return len(sent_ids), failed
+
+
+def drain(batch_size=None):
+    """Claim and deliver one batch. Returns (claimed, sent, failed)."""
+    batch = claim_batch(batch_size or settings.OUTBOX_BATCH_SIZE)
+    if not batch:
+        return 0, 0, 0
+    sent, failed = deliver(batch)
+    return len(batch), sent, failed
+
+
+def worker_loop(stop, batch_size=None, poll_interval=2.0, once=False, report=None):
+    """Drain the outbox until ``stop`` (a threading.Event) is set, or until it is empty if ``once``."""
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            claimed, sent, failed = drain(batch_size)
+            if report and claimed:
+                report(threading.current_thread().name, sent, failed)
+            if not claimed:
+                if once:
+                    break
+                stop.wait(poll_interval)
+    finally:
+        db_connection.close()
+
+
+def requeue(queryset):
+    """Put dead-lettered (or any) emails back in the queue with a fresh attempt count."""
+    return queryset.exclude(status='sent').update(
+        status='pending', attempts=0, next_attempt_at=timezone.now(), locked_until=None, claim_token='',
+    )
@@ -0,0 +1,175 @@
+"""Keyset (cursor) pagination for the group list and search pages.
+
+Instead of ``OFFSET n`` plus ``COUNT(*)``, each page is a range scan that
+continues from the (created_at, id) of the last row shown, so page 500 costs
+the same as page 1. Cursors are opaque url-safe tokens. The total shown in
+the templates is approximate: the count is cached for
+PAGINATION_COUNT_CACHE_SECONDS, or read from the planner statistics on
+PostgreSQL for an unfiltered table.
+
+Ranked search results (core.search.SearchResults) are an in-memory list of
+ids with no (created_at, id) order; their cursor is simply a position in
+that list.
+"""
+import base64
+import binascii
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import InvalidPage
+from django.db import connection
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def encode_cursor(direction, *values):
+    raw = json.dumps([direction, *values], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """(direction, values) of a cursor token; raises InvalidPage if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        direction, *values = json.loads(raw)
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidPage('Invalid cursor')
+    if direction not in (NEXT, PREVIOUS):
+        raise InvalidPage('Invalid cursor')
+    return direction, values
+
+
+def approximate_count(queryset):
+    """Row count of ``queryset`` that may be a little stale, but is cheap to ask for repeatedly."""
+    model = queryset.model
+    if connection.vendor == 'postgresql' and not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [model._meta.db_table])
+            row = cursor.fetchone()
+        if row and row[0] >= 0:
+            return row[0]
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    key = 'pagecount:' + hashlib.md5(f'{sql}|{params}'.encode()).hexdigest()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.order_by().count()
+        cache.set(key, count, settings.PAGINATION_COUNT_CACHE_SECONDS)
+    return count
+
+
+class CursorPage:
+    """One page of results; quacks enough like django.core.paginator.Page for the templates."""
+
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Pages over a queryset ordered newest first by (created_at, id)."""
+
+    def __init__(self, object_list, per_page):
+        self.object_list = object_list
+        self.per_page = per_page
+
+    @property
+    def count(self):
+        if hasattr(self.object_list, 'query'):
+            return approximate_count(self.object_list)
+        return len(self.object_list)
+
+    def page(self, cursor=None):
+        if not hasattr(self.object_list, 'query'):
+            return self._position_page(cursor)
+        direction, values = decode_cursor(cursor) if cursor else (NEXT, None)
+        queryset = self.object_list
+        if values:
+            if len(values) != 2:
+                raise InvalidPage('Invalid cursor')
+            created_at, pk = parse_datetime(str(values[0])), values[1]
+            if created_at is None or not isinstance(pk, int):
+                raise InvalidPage('Invalid cursor')
+            # The plain range bound on created_at is what lets the index serve the OR
+            if direction == NEXT:
+                queryset = queryset.filter(Q(created_at__lt=created_at) | Q(pk__lt=pk), created_at__lte=created_at)
+            else:
+                queryset = queryset.filter(Q(created_at__gt=created_at) | Q(pk__gt=pk), created_at__gte=created_at)
+        if direction == NEXT:
+            rows = list(queryset.order_by('-created_at', '-pk')[:self.per_page + 1])
+        else:
+            rows = list(queryset.order_by('created_at', 'pk')[:self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == PREVIOUS:
+            rows.reverse()
+        if not rows:
+            return CursorPage(rows, self)
+
+        # One extra row tells whether there is a page beyond this one in the direction we moved
+        has_next = more if direction == NEXT else True
+        has_previous = more if direction == PREVIOUS else bool(values)
+        first, last = rows[0], rows[-1]
+        return CursorPage(
+            rows, self,
+            next_cursor=encode_cursor(NEXT, last.created_at.isoformat(), last.pk) if has_next else None,
+            previous_cursor=encode_cursor(PREVIOUS, first.created_at.isoformat(), first.pk) if has_previous else None,
+        )
+
+    def _position_page(self, cursor):
+        offset = 0
+        if cursor:
+            _, values = decode_cursor(cursor)
+            if len(values) != 1 or not isinstance(values[0], int) or values[0] < 0:
+                raise InvalidPage('Invalid cursor')
+            offset = values[0]
+        rows = list(self.object_list[offset:offset + self.per_page])
+        end = offset + self.per_page
+        return CursorPage(
+            rows, self,
+            next_cursor=encode_cursor(NEXT, end) if end < len(self.object_list) else None,
+            previous_cursor=encode_cursor(PREVIOUS, max(offset - self.per_page, 0)) if offset else None,
+        )
+
+
+class CursorPaginationMixin:
+    """ListView mixin: paginate with ?cursor=<token> instead of ?page=<n>."""
+    cursor_kwarg = 'cursor'
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = CursorPaginator(queryset, page_size)
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidPage:
+            page = paginator.page()
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Filters to carry over into the cursor links
+        params = self.request.GET.copy()
+        params.pop(self.cursor_kwarg, None)
+        params.pop('page', None)
+        context['page_query'] = params.urlencode()
+        return context
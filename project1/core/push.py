@@ -0,0 +1,270 @@
+"""Server-sent events push channel for new notifications.
+
+``publish()`` is called once new Notification rows are committed. Every
+process keeps a Broker mapping user ids to the asyncio queues of that user's
+open streams. project1/asgi.py wraps the Django application with
+``route_streams()``, which serves the notification_stream URL itself: Django's
+ASGI handler keeps a thread per request in flight, while an idle stream here
+is only a coroutine waiting on its queue, so one process holds thousands.
+
+Without PUSH_REDIS_URL, events only reach clients connected to the process
+that published them (enough for a single ASGI worker). With it, ``publish()``
+sends them to a Redis channel instead, and each process relays the channel
+to its own clients from one listener task.
+
+A client that falls PUSH_QUEUE_SIZE events behind is disconnected; the
+browser reconnects with the Last-Event-ID header and the missed
+notifications are replayed from the database.
+"""
+import asyncio
+import io
+import json
+import logging
+import threading
+from collections import defaultdict
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import aget_user
+from django.core.handlers.asgi import ASGIRequest
+from django.urls import reverse
+
+from . import inbox
+from .models import Notification
+
+try:
+    import redis
+    import redis.asyncio as aioredis
+except ImportError:  # redis is optional; only needed for PUSH_REDIS_URL
+    redis = aioredis = None
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'notifications'
+
+
+def notification_event(notification, unread=None):
+    """JSON-serializable payload of a notification event."""
+    event = {
+        'id': notification.pk,
+        'type': notification.notification_type,
+        'title': notification.title,
+        'message': notification.message,
+        'link': notification.related_link,
+        'created_at': notification.created_at.isoformat(),
+    }
+    if unread is not None:
+        event['unread'] = unread
+    return event
+
+
+def format_event(event):
+    return f'id: {event["id"]}\nevent: notification\ndata: {json.dumps(event)}\n\n'
+
+
+class Subscriber:
+    """The event queue of one open stream; only touched from its event loop."""
+
+    def __init__(self, user_id, loop):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(settings.PUSH_QUEUE_SIZE)
+        self.overflowed = False
+
+    def deliver(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Dropped events are replayed when the client reconnects
+            self.overflowed = True
+
+
+class Broker:
+    """In-process fan-out of events to the subscribers of each user."""
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+        self._listener = None
+
+    def subscribe(self, user_id):
+        """Register a stream of ``user_id``; must be called from the event loop serving it."""
+        loop = asyncio.get_running_loop()
+        subscriber = Subscriber(user_id, loop)
+        with self._lock:
+            self._subscribers[user_id].add(subscriber)
+        if settings.PUSH_REDIS_URL and (self._listener is None or self._listener.done()):
+            self._listener = loop.create_task(self._listen())
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(subscriber.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[subscriber.user_id]
+
+    def connections(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def dispatch(self, user_id, event):
+        """Queue ``event`` for every local stream of ``user_id``; safe to call from any thread."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.deliver, event)
+            except RuntimeError:
+                # Its event loop is closed; the stream is gone
+                self.unsubscribe(subscriber)
+
+    async def _listen(self):
+        """Relay the Redis channel to local subscribers, reconnecting after errors."""
+        if aioredis is None:
+            logger.error('PUSH_REDIS_URL is set but the redis package is not installed')
+            return
+        while True:
+            client = aioredis.from_url(settings.PUSH_REDIS_URL)
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.subscribe(CHANNEL)
+                    async for message in pubsub.listen():
+                        if message['type'] == 'message':
+                            payload = json.loads(message['data'])
+                            self.dispatch(payload['user'], payload['event'])
+            except redis.RedisError:
+                logger.warning('Lost the notification channel; reconnecting', exc_info=True)
+                await asyncio.sleep(settings.PUSH_RETRY_MILLISECONDS / 1000)
+            finally:
+                await client.aclose()
+
+
+broker = Broker()
+
+_redis_client = None
+
+
+def _redis():
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(settings.PUSH_REDIS_URL)
+    return _redis_client
+
+
+def publish(notifications):
+    """Push committed notifications to their recipients' open streams."""
+    counts = inbox.cached_unread_counts({notification.recipient_id for notification in notifications})
+    events = [(notification.recipient_id, notification_event(notification, counts.get(notification.recipient_id)))
+              for notification in notifications]
+    if settings.PUSH_REDIS_URL and redis is not None:
+        try:
+            pipeline = _redis().pipeline(transaction=False)
+            for user_id, event in events:
+                pipeline.publish(CHANNEL, json.dumps({'user': user_id, 'event': event}))
+            pipeline.execute()
+            return
+        except redis.RedisError:
+            logger.warning('Could not publish notifications to Redis; delivering locally', exc_info=True)
+    for user_id, event in events:
+        broker.dispatch(user_id, event)
+
+
+def announce(notifications):
+    """Count committed notifications in their recipients' unread badges, then publish them."""
+    inbox.notifications_created([notification.recipient_id for notification in notifications])
+    publish(notifications)
+
+
+async def stream(user_id, last_event_id=None):
+    """Body of a text/event-stream response: replays notifications after ``last_event_id``, then pushes new ones."""
+    subscriber = broker.subscribe(user_id)
+    try:
+        yield f'retry: {settings.PUSH_RETRY_MILLISECONDS}\n\n'
+        # Subscribed first, so rows committed during the replay are not missed (nor sent twice)
+        replayed = set()
+        if last_event_id is not None:
+            missed = (Notification.objects.filter(recipient_id=user_id, pk__gt=last_event_id)
+                      .order_by('pk')[:settings.PUSH_REPLAY_LIMIT])
+            async for notification in missed:
+                replayed.add(notification.pk)
+                yield format_event(notification_event(notification))
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), settings.PUSH_HEARTBEAT_SECONDS)
+            except TimeoutError:
+                # Keeps proxies from closing the idle connection
+                yield ': keep-alive\n\n'
+                continue
+            if subscriber.overflowed:
+                return
+            if event['id'] not in replayed:
+                yield format_event(event)
+    finally:
+        broker.unsubscribe(subscriber)
+
+
+async def _authenticate(scope):
+    """The user of the session cookie sent with the request (AnonymousUser without one)."""
+    request = ASGIRequest(scope, io.BytesIO())
+    engine = import_module(settings.SESSION_ENGINE)
+    request.session = engine.SessionStore(request.COOKIES.get(settings.SESSION_COOKIE_NAME))
+    return request, await aget_user(request)
+
+
+async def _respond(send, status, body=b''):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'text/plain; charset=utf-8')]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _send_events(events, send):
+    await send({'type': 'http.response.start', 'status': 200, 'headers': [
+        (b'content-type', b'text/event-stream'),
+        (b'cache-control', b'no-cache'),
+        # Stops nginx from buffering the stream
+        (b'x-accel-buffering', b'no'),
+    ]})
+    async for chunk in events:
+        await send({'type': 'http.response.body', 'body': chunk.encode(), 'more_body': True})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+async def _disconnected(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def serve_stream(scope, receive, send):
+    """ASGI app answering a GET of the notification stream with ``stream()`` for the logged-in user."""
+    if scope['method'] != 'GET':
+        await _respond(send, 405)
+        return
+    request, user = await _authenticate(scope)
+    if not user.is_authenticated:
+        await _respond(send, 403)
+        return
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    events = stream(user.pk, int(last_event_id) if last_event_id.isdigit() else None)
+    sending = asyncio.ensure_future(_send_events(events, send))
+    disconnect = asyncio.ensure_future(_disconnected(receive))
+    try:
+        await asyncio.wait({sending, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in (sending, disconnect):
+            task.cancel()
+        await asyncio.gather(sending, disconnect, return_exceptions=True)
+        await events.aclose()
+
+
+def route_streams(application):
+    """Wrap a Django ASGI application so the notification_stream URL is served by ``serve_stream``."""
+    path = reverse('core:notification_stream')
+
+    async def router(scope, receive, send):
+        if scope['type'] == 'http' and scope['path'] == path:
+            await serve_stream(scope, receive, send)
+        else:
+            await application(scope, receive, send)
+    return router
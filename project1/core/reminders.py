@@ -0,0 +1,143 @@
+"""Batched study-session reminders.
+
+One reminder run for a session inserts every member's Notification with a
+single bulk_create and renders the emails from the template compiled once.
+The emails are queued in the outbox (core.outbox) in the same transaction;
+run_mail_worker sends them over shared connections with any EMAIL_BACKEND
+(smtp, locmem, filebased, console).
+
+``dispatch_reminders()`` (the dispatch_reminders command) finds the sessions
+starting within the next N hours through a partial index of the sessions not
+yet reminded. Each session is claimed by setting ``reminded_at`` with a
+conditional UPDATE in the same transaction as its notifications and emails,
+so overlapping runs on any number of nodes remind it exactly once.
+"""
+import datetime
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.db import connection, transaction
+from django.db.models import Q
+from django.template.loader import get_template
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from . import outbox, push
+from .models import Notification, StudySession
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_NAME = 'core/email/session_reminder.html'
+
+
+def absolute_url(path):
+    """``path`` on SITE_URL, for links read outside the site (emails)."""
+    return urljoin(settings.SITE_URL, path)
+
+
+def reminder_notifications(session, members, link):
+    title = f'Upcoming Session: {session.title}'
+    message = f'Your study session "{session.title}" is scheduled for {session.date} at {session.start_time}'
+    return [
+        Notification(recipient=member, notification_type='session_reminder', group=session.group,
+                     title=title, message=message, related_link=link)
+        for member in members
+    ]
+
+
+def reminder_emails(session, members, link):
+    """One EmailMultiAlternatives per member with an email address."""
+    template = get_template(TEMPLATE_NAME)
+    subject = f'Study Session Reminder: {session.title}'
+    messages = []
+    for member in members:
+        if not member.email:
+            continue
+        html_message = template.render({'user': member, 'session': session, 'group': session.group,
+                                        'group_url': link})
+        message = EmailMultiAlternatives(subject, strip_tags(html_message), settings.DEFAULT_FROM_EMAIL,
+                                         [member.email])
+        message.attach_alternative(html_message, 'text/html')
+        messages.append(message)
+    return messages
+
+
+def send_session_reminders(session):
+    """Notify every member of the session's group and queue their emails in the outbox.
+
+    Both are written in one transaction; run_mail_worker delivers the emails.
+    Returns (notifications created, emails queued).
+    """
+    members = list(session.group.members.only('id', 'username', 'email', 'first_name', 'last_name'))
+    link = session.group.get_absolute_url()
+    emails = reminder_emails(session, members, absolute_url(link))
+    with transaction.atomic():
+        notifications = Notification.objects.bulk_create(
+            reminder_notifications(session, members, link), batch_size=500,
+        )
+        queued = outbox.enqueue(emails)
+        transaction.on_commit(lambda: push.announce(notifications))
+    return len(notifications), len(queued)
+
+
+def due_sessions(hours, now=None):
+    """Scheduled, not yet reminded sessions starting between now and ``hours`` from now."""
+    now = timezone.localtime(now)
+    end = now + datetime.timedelta(hours=hours)
+    today, last = now.date(), end.date()
+    if today == last:
+        window = Q(date=today, start_time__gte=now.time(), start_time__lte=end.time())
+    else:
+        window = (Q(date=today, start_time__gte=now.time()) |
+                  Q(date__gt=today, date__lt=last) |
+                  Q(date=last, start_time__lte=end.time()))
+    # The plain date range lets the partial index seek instead of scanning
+    return (StudySession.objects
+            .filter(window, date__gte=today, date__lte=last, status='scheduled', reminded_at__isnull=True)
+            .order_by('date', 'start_time'))
+
+
+def remind_session(session):
+    """Claim and remind one session. Returns the notifications created, or None if another run claimed it."""
+    with transaction.atomic():
+        claimed = StudySession.objects.filter(pk=session.pk, reminded_at__isnull=True).update(
+            reminded_at=timezone.now(),
+        )
+        if not claimed:
+            return None
+        notifications, _ = send_session_reminders(session)
+    return notifications
+
+
+def _remind_group(sessions):
+    try:
+        reminded = notified = 0
+        for session in sessions:
+            try:
+                count = remind_session(session)
+            except Exception:
+                # Rolled back with its claim, so the next run retries it
+                logger.exception('Reminder for session %s failed', session.pk)
+                continue
+            if count is not None:
+                reminded += 1
+                notified += count
+        return reminded, notified
+    finally:
+        connection.close()
+
+
+def dispatch_reminders(hours=24, workers=4):
+    """Remind every due session, one thread per group at a time. Returns (sessions, notifications)."""
+    by_group = defaultdict(list)
+    for session in due_sessions(hours).select_related('group'):
+        by_group[session.group_id].append(session)
+    if not by_group:
+        return 0, 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='reminders') as pool:
+        results = list(pool.map(_remind_group, by_group.values()))
+    return sum(r[0] for r in results), sum(r[1] for r in results)
@@ -0,0 +1,68 @@
+"""Per-user {group_id: role} map for permission checks.
+
+The map is loaded once per request (memoized on the user object) and cached
+across requests under a per-user version key. The GroupMembership signal
+handlers in core.signals bump the version whenever one of the user's
+memberships is created, changed or deleted, so the hot path of a permission
+check runs no queries.
+
+A bump is only seen by other worker processes through a shared cache (Redis
+or file based). With a process-local cache the maps are kept for
+ROLE_LOCAL_CACHE_TIMEOUT seconds instead, so a demoted or removed member
+loses their rights on every worker within seconds.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from . import versions
+from .models import GroupMembership
+
+MANAGER_ROLES = ('admin', 'moderator')
+
+
+def _version_key(user_id):
+    return f'roles:version:{user_id}'
+
+
+def get_version(user_id):
+    return versions.get_version(_version_key(user_id))
+
+
+def bump_version(user_id):
+    """Invalidate the cached role map of a user."""
+    versions.bump_version(_version_key(user_id))
+
+
+def cache_timeout():
+    if versions.is_shared_cache():
+        return getattr(settings, 'ROLE_CACHE_TIMEOUT', 3600)
+    return settings.ROLE_LOCAL_CACHE_TIMEOUT
+
+
+def group_roles(user):
+    """{group_id: role} for every group ``user`` belongs to ({} for anonymous users)."""
+    if not user.is_authenticated:
+        return {}
+    roles = getattr(user, '_group_roles', None)
+    if roles is None:
+        key = f'roles:{user.pk}:v{get_version(user.pk)}'
+        roles = cache.get(key)
+        if roles is None:
+            roles = dict(GroupMembership.objects.filter(user=user).values_list('group_id', 'role'))
+            cache.set(key, roles, cache_timeout())
+        user._group_roles = roles
+    return roles
+
+
+def get_role(user, group_id):
+    """The user's role in the group, or None if they are not a member."""
+    return group_roles(user).get(int(group_id))
+
+
+def is_member(user, group_id):
+    return get_role(user, group_id) is not None
+
+
+def has_role(user, group_id, roles):
+    return get_role(user, group_id) in roles
+
@@ -0,0 +1,72 @@
+"""Daily study-session rollups used by the stats dashboards.
+
+Each SessionDailyRollup row summarises the sessions of one (day, group,
+creator): how many there were and their total minutes.
+The dashboards use these rows for window totals instead of loading every
+StudySession in the selected window.
+"""
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from .models import SessionDailyRollup, StudySession
+
+
+def session_contribution(date, group_id, creator_id, duration_minutes):
+    """Return ((day, group_id, creator_id), minutes) for one session."""
+    return (date, group_id, creator_id), duration_minutes
+
+
+def apply_contribution(contribution, sign):
+    """Add (sign=1) or remove (sign=-1) a session's contribution to its rollup row."""
+    (day, group_id, creator_id), minutes = contribution
+    updates = {
+        'session_count': F('session_count') + sign,
+        'total_minutes': F('total_minutes') + sign * minutes,
+    }
+
+    rows = SessionDailyRollup.objects.filter(day=day, group_id=group_id, creator_id=creator_id)
+    with transaction.atomic():
+        if sign > 0:
+            SessionDailyRollup.objects.get_or_create(day=day, group_id=group_id, creator_id=creator_id)
+            rows.update(**updates)
+        else:
+            rows.update(**updates)
+            rows.filter(session_count__lte=0).delete()
+
+
+def rebuild_rollups(batch_size=1000):
+    """Recompute every rollup row from the StudySession table. Returns the row count."""
+    per_day = (StudySession.objects
+               .values('date', 'group_id', 'created_by_id')
+               .annotate(session_count=Count('id'), total_minutes=Sum('duration_minutes'))
+               .order_by())
+
+    def rows():
+        for row in per_day.iterator(chunk_size=batch_size):
+            yield SessionDailyRollup(
+                day=row['date'], group_id=row['group_id'], creator_id=row['created_by_id'],
+                session_count=row['session_count'], total_minutes=row['total_minutes'] or 0,
+            )
+
+    count = 0
+    with transaction.atomic():
+        SessionDailyRollup.objects.all().delete()
+        batch = []
+        for obj in rows():
+            batch.append(obj)
+            if len(batch) >= batch_size:
+                SessionDailyRollup.objects.bulk_create(batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            SessionDailyRollup.objects.bulk_create(batch)
+            count += len(batch)
+    return count
+
+
+def window_totals(rollups, start_date, end_date):
+    """Total sessions and minutes for rollup rows with start_date <= day <= end_date."""
+    agg = rollups.filter(day__gte=start_date, day__lte=end_date).aggregate(
+        sessions=Sum('session_count'), minutes=Sum('total_minutes'),
+    )
+    return {'sessions': agg['sessions'] or 0, 'minutes': agg['minutes'] or 0}
@@ -0,0 +1,213 @@
+"""Full-text search over study groups.
+
+Groups are indexed by name, subject name and description in a side table:
+an FTS5 virtual table on SQLite, or a weighted tsvector column with a GIN
+index on Postgres (both created by migration 0009). The signal handlers in
+core.signals keep the index in sync when a group or subject is saved or
+deleted; ``manage.py rebuild_search_index`` repopulates it after bulk loads.
+
+``get_backend()`` picks the backend for the current database. If the index
+table is missing (e.g. SQLite built without FTS5, or another vendor) it
+falls back to the old ``icontains`` filter.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import StudyGroup
+
+FTS_TABLE = 'core_studygroup_fts'
+PG_TABLE = 'core_studygroup_search'
+
+# Upper bound on ranked matches returned for one query
+MAX_RESULTS = 1000
+
+TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def query_terms(query):
+    return TERM_RE.findall(query or '')[:10]
+
+
+def _index_rows(group_ids=None, subject_id=None):
+    """(id, name, subject name, description) rows to index."""
+    groups = StudyGroup.objects.order_by('pk')
+    if group_ids is not None:
+        groups = groups.filter(pk__in=group_ids)
+    if subject_id is not None:
+        groups = groups.filter(subject_id=subject_id)
+    return groups.values_list('pk', 'name', 'subject__name', 'description').iterator(chunk_size=2000)
+
+
+class SearchResults:
+    """Ranked group ids that load StudyGroup objects only for the slice being displayed."""
+
+    def __init__(self, ids):
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def count(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        ids = self.ids[index]
+        groups = StudyGroup.objects.select_related('subject').in_bulk(ids)
+        return [groups[pk] for pk in ids if pk in groups]
+
+
+class IcontainsBackend:
+    """Unindexed fallback: substring match on name, description and subject name."""
+    name = 'icontains'
+
+    def search(self, query, subject_id=None, limit=MAX_RESULTS):
+        queryset = StudyGroup.objects.filter(is_active=True).select_related('subject')
+        for term in query_terms(query):
+            queryset = queryset.filter(
+                Q(name__icontains=term) | Q(description__icontains=term) | Q(subject__name__icontains=term)
+            )
+        if subject_id:
+            queryset = queryset.filter(subject_id=subject_id)
+        return queryset.order_by('-created_at')
+
+    def index_groups(self, group_ids=None, subject_id=None):
+        pass
+
+    def remove_group(self, group_id):
+        pass
+
+    def rebuild(self):
+        return 0
+
+
+class SQLiteFTSBackend(IcontainsBackend):
+    """FTS5 table keyed by rowid = group id, ranked with bm25 (name > subject > description)."""
+    name = 'sqlite-fts5'
+
+    def match_expression(self, query):
+        # Every term must match, as a prefix; quoting disables FTS5 query syntax in user input
+        return ' AND '.join(f'"{term}"*' for term in query_terms(query))
+
+    def search(self, query, subject_id=None, limit=MAX_RESULTS):
+        match = self.match_expression(query)
+        if not match:
+            return super().search(query, subject_id, limit)
+        sql = (f'SELECT g.id FROM {FTS_TABLE} f JOIN core_studygroup g ON g.id = f.rowid '
+               f'WHERE {FTS_TABLE} MATCH %s AND g.is_active')
+        params = [match]
+        if subject_id:
+            sql += ' AND g.subject_id = %s'
+            params.append(subject_id)
+        sql += f' ORDER BY bm25({FTS_TABLE}, 10.0, 5.0, 1.0) LIMIT %s'
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return SearchResults([row[0] for row in cursor.fetchall()])
+
+    def index_groups(self, group_ids=None, subject_id=None):
+        with connection.cursor() as cursor:
+            if group_ids is None and subject_id is not None:
+                # Subject renamed: only that column changes
+                cursor.execute(f'UPDATE {FTS_TABLE} SET subject = (SELECT name FROM core_subject WHERE id = %s) '
+                               f'WHERE rowid IN (SELECT id FROM core_studygroup WHERE subject_id = %s)',
+                               [subject_id, subject_id])
+                return
+            for row in _index_rows(group_ids, subject_id):
+                cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [row[0]])
+                cursor.execute(f'INSERT INTO {FTS_TABLE} (rowid, name, subject, description) '
+                               f'VALUES (%s, %s, %s, %s)', list(row))
+
+    def remove_group(self, group_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [group_id])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(f'INSERT INTO {FTS_TABLE} (rowid, name, subject, description) '
+                           f'SELECT g.id, g.name, s.name, g.description FROM core_studygroup g '
+                           f'JOIN core_subject s ON s.id = g.subject_id')
+            cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+            cursor.execute(f'SELECT COUNT(*) FROM {FTS_TABLE}')
+            return cursor.fetchone()[0]
+
+
+PG_DOCUMENT = ("setweight(to_tsvector('simple', coalesce(g.name, '')), 'A') || "
+               "setweight(to_tsvector('simple', coalesce(s.name, '')), 'B') || "
+               "setweight(to_tsvector('simple', coalesce(g.description, '')), 'C')")
+
+
+class PostgresBackend(IcontainsBackend):
+    """tsvector side table with a GIN index, ranked with ts_rank."""
+    name = 'postgres-tsvector'
+
+    def tsquery(self, query):
+        return ' & '.join(f'{term}:*' for term in query_terms(query))
+
+    def search(self, query, subject_id=None, limit=MAX_RESULTS):
+        tsquery = self.tsquery(query)
+        if not tsquery:
+            return super().search(query, subject_id, limit)
+        sql = (f"SELECT g.id FROM {PG_TABLE} d JOIN core_studygroup g ON g.id = d.group_id, "
+               f"to_tsquery('simple', %s) q WHERE d.document @@ q AND g.is_active")
+        params = [tsquery]
+        if subject_id:
+            sql += ' AND g.subject_id = %s'
+            params.append(subject_id)
+        sql += ' ORDER BY ts_rank(d.document, q) DESC, g.id DESC LIMIT %s'
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return SearchResults([row[0] for row in cursor.fetchall()])
+
+    def _upsert(self, where, params):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {PG_TABLE} (group_id, document) '
+                f'SELECT g.id, {PG_DOCUMENT} FROM core_studygroup g JOIN core_subject s ON s.id = g.subject_id '
+                f'WHERE {where} ON CONFLICT (group_id) DO UPDATE SET document = EXCLUDED.document', params)
+            return cursor.rowcount
+
+    def index_groups(self, group_ids=None, subject_id=None):
+        if group_ids is not None:
+            self._upsert('g.id = ANY(%s)', [list(group_ids)])
+        elif subject_id is not None:
+            self._upsert('g.subject_id = %s', [subject_id])
+        else:
+            self._upsert('TRUE', [])
+
+    def remove_group(self, group_id):
+        # Rows also go away with the group (ON DELETE CASCADE)
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {PG_TABLE} WHERE group_id = %s', [group_id])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {PG_TABLE}')
+        return self._upsert('TRUE', [])
+
+
+_backends = {}
+
+
+def get_backend():
+    """Search backend for the default database (detected once per process)."""
+    key = (connection.vendor, connection.settings_dict['NAME'])
+    if key not in _backends:
+        tables = connection.introspection.table_names()
+        if connection.vendor == 'sqlite' and FTS_TABLE in tables:
+            _backends[key] = SQLiteFTSBackend()
+        elif connection.vendor == 'postgresql' and PG_TABLE in tables:
+            _backends[key] = PostgresBackend()
+        else:
+            _backends[key] = IcontainsBackend()
+    return _backends[key]
+
+
+def search_groups(query, subject_id=None):
+    """Active groups matching ``query``, best match first (a queryset or SearchResults)."""
+    return get_backend().search(query, subject_id)
@@ -0,0 +1,209 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .counters import adjust_counter, counter_field
+from .exports import TABLE_EXPORTS, table_for_model
+from .models import (
+    StudyGroup, Subject, StudySession, StudyMaterial, Comment, GroupMembership, ExportTombstone, Notification,
+    SessionDailyRollup,
+)
+from . import autocomplete, push, roles
+from .search import get_backend as search_backend
+from .rollups import apply_contribution, session_contribution
+from .stats import bump_version
+
+
+def _contribution(session):
+    return session_contribution(
+        session.date, session.group_id, session.created_by_id, session.duration_minutes,
+    )
+
+
+def _group_deleted(origin):
+    """Whether a delete cascades from StudyGroup, whose rollups and counters go with it."""
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model is StudyGroup
+
+
+@receiver(pre_save, sender=StudySession)
+def remember_previous_session(sender, instance, raw=False, **kwargs):
+    """Keep the stored values of an edited session so its old rollup can be removed."""
+    instance._rollup_previous = None
+    if raw or instance.pk is None:
+        return
+    previous = (StudySession.objects
+                .filter(pk=instance.pk)
+                .values_list('date', 'group_id', 'created_by_id', 'duration_minutes', 'start_time')
+                .first())
+    if previous:
+        instance._rollup_previous = session_contribution(*previous[:4])
+        # A rescheduled session gets a new reminder
+        if instance.reminded_at and (previous[0], previous[4]) != (instance.date, instance.start_time):
+            instance.reminded_at = None
+
+
+@receiver(post_save, sender=StudySession)
+def update_session_rollup(sender, instance, raw=False, **kwargs):
+    # Fixtures are loaded raw; run rebuild_session_rollups afterwards
+    if raw:
+        return
+    current = _contribution(instance)
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous == current:
+        return
+    if previous:
+        apply_contribution(previous, -1)
+    apply_contribution(current, 1)
+
+
+@receiver(post_delete, sender=StudySession)
+def remove_session_rollup(sender, instance, origin=None, **kwargs):
+    if _group_deleted(origin):
+        return
+    apply_contribution(_contribution(instance), -1)
+
+
+@receiver(post_save, sender=StudySession)
+@receiver(post_delete, sender=StudySession)
+@receiver(post_save, sender=StudyMaterial)
+@receiver(post_delete, sender=StudyMaterial)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=GroupMembership)
+@receiver(post_delete, sender=GroupMembership)
+def invalidate_group_stats(sender, instance, **kwargs):
+    bump_version(instance.group_id)
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous and previous[0][1] != instance.group_id:
+        # A session moved to another group
+        bump_version(previous[0][1])
+
+
+@receiver(post_save, sender=StudySession)
+@receiver(post_save, sender=StudyMaterial)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=GroupMembership)
+def count_group_row(sender, instance, created, raw=False, **kwargs):
+    # Fixtures are loaded raw; run reconcile_group_counters afterwards
+    if raw:
+        return
+    field = counter_field(sender)
+    if created:
+        # core.admission claims the seat itself with a conditional UPDATE
+        if not getattr(instance, '_counted', False):
+            adjust_counter(instance.group_id, field, 1)
+        return
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous and previous[0][1] != instance.group_id:
+        # A session moved to another group
+        adjust_counter(previous[0][1], field, -1)
+        adjust_counter(instance.group_id, field, 1)
+
+
+@receiver(post_delete, sender=StudySession)
+@receiver(post_delete, sender=StudyMaterial)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=GroupMembership)
+def uncount_group_row(sender, instance, origin=None, **kwargs):
+    if _group_deleted(origin):
+        return
+    adjust_counter(instance.group_id, counter_field(sender), -1)
+
+
+@receiver(post_save, sender=GroupMembership)
+@receiver(post_delete, sender=GroupMembership)
+def invalidate_user_roles(sender, instance, **kwargs):
+    roles.bump_version(instance.user_id)
+
+
+@receiver(post_save, sender=StudyGroup)
+def index_group(sender, instance, raw=False, **kwargs):
+    # Fixtures are loaded raw; run rebuild_search_index afterwards
+    if not raw:
+        search_backend().index_groups([instance.pk])
+
+
+@receiver(post_delete, sender=StudyGroup)
+def unindex_group(sender, instance, **kwargs):
+    search_backend().remove_group(instance.pk)
+
+
+@receiver(post_save, sender=Subject)
+def reindex_subject_groups(sender, instance, created, raw=False, **kwargs):
+    if not raw and not created:
+        search_backend().index_groups(subject_id=instance.pk)
+
+
+@receiver(post_save, sender=Notification)
+def announce_notification(sender, instance, created, raw=False, **kwargs):
+    # bulk_create() skips this; callers announce those with push.announce()
+    if created and not raw and not instance.is_read:
+        transaction.on_commit(lambda: push.announce([instance]))
+
+
+def _autocomplete_update(method, *args, **kwargs):
+    # Only an index already built in this process is patched, once the write commits
+    index = autocomplete.current_index()
+    if index is not None:
+        transaction.on_commit(lambda: getattr(index, method)(*args, **kwargs))
+
+
+@receiver(post_save, sender=StudyGroup)
+def autocomplete_group(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _autocomplete_update('put_group', instance.pk, instance.name, instance.subject_id, instance.is_active)
+
+
+@receiver(post_delete, sender=StudyGroup)
+def autocomplete_remove_group(sender, instance, **kwargs):
+    _autocomplete_update('remove', autocomplete.GROUP, instance.pk)
+
+
+@receiver(post_save, sender=Subject)
+def autocomplete_subject(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _autocomplete_update('put_subject', instance.pk, instance.name)
+
+
+@receiver(post_delete, sender=Subject)
+def autocomplete_remove_subject(sender, instance, **kwargs):
+    _autocomplete_update('remove', autocomplete.SUBJECT, instance.pk)
+
+
+@receiver(pre_save, sender=User)
+def remember_previous_username(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Keep the stored username of an edited user; the group charts list members by name."""
+    instance._previous_username = None
+    if raw or instance.pk is None or (update_fields is not None and 'username' not in update_fields):
+        return
+    instance._previous_username = User.objects.filter(pk=instance.pk).values_list('username', flat=True).first()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_global_stats(sender, instance, update_fields=None, **kwargs):
+    # Logins only touch last_login, which the cached charts don't use
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    previous = getattr(instance, '_previous_username', None)
+    if previous is None or previous == instance.username:
+        bump_version()
+        return
+    # Renamed: also the groups whose cached charts may show the old name
+    group_ids = set(GroupMembership.objects.filter(user=instance).values_list('group_id', flat=True))
+    group_ids.update(SessionDailyRollup.objects.filter(creator=instance).values_list('group_id', flat=True).distinct())
+    bump_version(*group_ids)
+
+
+def record_export_tombstone(sender, instance, **kwargs):
+    """Remember deleted rows of exported tables for the next delta export."""
+    ExportTombstone.objects.create(table=table_for_model(sender), object_id=instance.pk)
+
+
+# Connected per exported model: a receiver without a sender would disable the
+# fast-delete path (one DELETE per cascade) for every model in the project
+for _model, _fields in TABLE_EXPORTS.values():
+    post_delete.connect(record_export_tombstone, sender=_model)
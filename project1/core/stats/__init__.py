@@ -0,0 +1,25 @@
+from .cache import bump_version, cached_stats, stats_cache_key
+from .engine import (
+    HAS_NUMPY,
+    HIST_BIN_EDGES,
+    HIST_LABELS,
+    SESSION_FIELDS,
+    compute_series,
+    load_sessions,
+    weeks_between,
+    weeks_ending,
+)
+
+__all__ = [
+    'HAS_NUMPY',
+    'HIST_BIN_EDGES',
+    'HIST_LABELS',
+    'SESSION_FIELDS',
+    'bump_version',
+    'cached_stats',
+    'compute_series',
+    'load_sessions',
+    'stats_cache_key',
+    'weeks_between',
+    'weeks_ending',
+]
@@ -0,0 +1,47 @@
+"""Versioned cache for dashboard results.
+
+Entries are keyed by (scope, group_id, window, preset) plus a version
+counter for the group. Signal handlers bump the counter of a group (and of
+the global "all" scope) whenever its sessions, materials, comments or
+memberships change, or one of its members is renamed, so stale entries are
+never read again and simply expire.
+Works with any Django cache backend (local memory, file based or Redis).
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from core import versions
+
+GLOBAL_SCOPE = 'all'
+
+
+def _version_key(group_id):
+    return f'stats:version:{group_id or GLOBAL_SCOPE}'
+
+
+def get_version(group_id=None):
+    return versions.get_version(_version_key(group_id))
+
+
+def bump_version(*group_ids):
+    """Invalidate cached results for the given groups and for the global scope."""
+    keys = [_version_key(GLOBAL_SCOPE)]
+    keys.extend(_version_key(group_id) for group_id in group_ids if group_id)
+    versions.bump_version(*keys)
+
+
+def stats_cache_key(scope, group_id, start_date, end_date, preset=''):
+    return 'stats:{}:{}:v{}:{}:{}:{}'.format(
+        scope, group_id or GLOBAL_SCOPE, get_version(group_id),
+        start_date.isoformat(), end_date.isoformat(), preset or '',
+    )
+
+
+def cached_stats(scope, group_id, start_date, end_date, preset, compute):
+    """Return the cached result for the key, calling ``compute()`` on a miss."""
+    key = stats_cache_key(scope, group_id, start_date, end_date, preset)
+    result = cache.get(key)
+    if result is None:
+        result = compute()
+        cache.set(key, result, getattr(settings, 'STATS_CACHE_TIMEOUT', 3600))
+    return result
@@ -0,0 +1,152 @@
+"""Shared chart engine for the stats dashboards.
+
+Sessions are pulled once as ``(date, start_time, duration_minutes, creator)``
+tuples and every chart series (weekly buckets, scatter, duration histogram,
+per-creator totals) is computed from them in a single pass. NumPy is used
+when it is installed; otherwise a pure-Python loop produces the same output.
+"""
+import bisect
+import datetime
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+HAS_NUMPY = np is not None
+
+SESSION_FIELDS = ('date', 'start_time', 'duration_minutes', 'created_by__username')
+
+# Duration histogram bins, in minutes; the last bin is open-ended.
+HIST_BIN_EDGES = [0, 30, 60, 90, 120, 180, 240, 360]
+HIST_LABELS = ['0-0.5h', '0.5-1h', '1-1.5h', '1.5-2h', '2-3h', '3-4h', '4-6h', '6h+']
+
+
+def weeks_ending(end_date, count=12):
+    """The ``count`` Monday week starts ending with the week containing end_date."""
+    current_week_start = end_date - datetime.timedelta(days=end_date.weekday())
+    return [current_week_start - datetime.timedelta(weeks=i) for i in range(count - 1, -1, -1)]
+
+
+def weeks_between(start_date, end_date):
+    """Monday week starts covering start_date..end_date (at least one week)."""
+    start_week = start_date - datetime.timedelta(days=start_date.weekday())
+    end_week = end_date - datetime.timedelta(days=end_date.weekday())
+    week_starts = []
+    ws = start_week
+    while ws <= end_week:
+        week_starts.append(ws)
+        ws = ws + datetime.timedelta(weeks=1)
+    return week_starts or [start_week]
+
+
+def load_sessions(sessions_qs):
+    """Fetch the columns the engine needs as a list of tuples (one query)."""
+    return list(sessions_qs.values_list(*SESSION_FIELDS).order_by())
+
+
+def compute_series(rows, week_starts, use_numpy=None):
+    """Compute every chart series for ``rows`` (see SESSION_FIELDS).
+
+    Returns a dict with ``total_sessions``, ``total_minutes``,
+    ``sessions_per_week``, ``hours_per_week``, ``scatter_points``,
+    ``hist_counts`` and ``creators`` (every creator ranked by hours, then
+    sessions, then username).
+    """
+    if use_numpy is None:
+        use_numpy = HAS_NUMPY
+    if use_numpy and rows:
+        return _compute_numpy(rows, week_starts)
+    return _compute_python(rows, week_starts)
+
+
+def _rank_creators(names, sessions, minutes):
+    creators = [
+        {'user': name or 'Unknown', 'sessions': int(count), 'hours': round(float(total) / 60.0, 2)}
+        for name, count, total in zip(names, sessions, minutes)
+    ]
+    creators.sort(key=lambda x: (-x['hours'], -x['sessions'], x['user']))
+    return creators
+
+
+def _compute_python(rows, week_starts):
+    n_weeks = len(week_starts)
+    n_bins = len(HIST_LABELS)
+    edges = HIST_BIN_EDGES
+    first_week = week_starts[0].toordinal()
+    sessions_per_week = [0] * n_weeks
+    minutes_per_week = [0] * n_weeks
+    hist_counts = [0] * n_bins
+    scatter_points = []
+    creator_sessions = {}
+    creator_minutes = {}
+    total_minutes = 0
+
+    for date, start_time, minutes, creator in rows:
+        total_minutes += minutes
+        creator_sessions[creator] = creator_sessions.get(creator, 0) + 1
+        creator_minutes[creator] = creator_minutes.get(creator, 0) + minutes
+        idx = (date.toordinal() - first_week) // 7
+        if 0 <= idx < n_weeks:
+            sessions_per_week[idx] += 1
+            minutes_per_week[idx] += minutes
+        if minutes > 0:
+            hist_counts[bisect.bisect_right(edges, minutes) - 1] += 1
+            scatter_points.append({
+                'x': round(start_time.hour + start_time.minute / 60.0, 2),
+                'y': round(minutes / 60.0, 2),
+            })
+
+    names = list(creator_sessions)
+    return {
+        'total_sessions': len(rows),
+        'total_minutes': total_minutes,
+        'sessions_per_week': sessions_per_week,
+        'hours_per_week': [round(m / 60.0, 2) for m in minutes_per_week],
+        'scatter_points': scatter_points,
+        'hist_counts': hist_counts,
+        'creators': _rank_creators(
+            names,
+            [creator_sessions[n] for n in names],
+            [creator_minutes[n] for n in names],
+        ),
+    }
+
+
+def _compute_numpy(rows, week_starts):
+    n_weeks = len(week_starts)
+    n_bins = len(HIST_LABELS)
+    n = len(rows)
+
+    days = np.fromiter((r[0].toordinal() for r in rows), dtype=np.int64, count=n)
+    start_hours = np.fromiter((r[1].hour + r[1].minute / 60.0 for r in rows), dtype=np.float64, count=n)
+    minutes = np.fromiter((r[2] for r in rows), dtype=np.int64, count=n)
+
+    # Weekly buckets
+    week_idx = (days - week_starts[0].toordinal()) // 7
+    in_range = (week_idx >= 0) & (week_idx < n_weeks)
+    sessions_per_week = np.bincount(week_idx[in_range], minlength=n_weeks)
+    minutes_per_week = np.bincount(week_idx[in_range], weights=minutes[in_range], minlength=n_weeks)
+
+    # Histogram and scatter only consider sessions with a positive duration
+    positive = minutes > 0
+    bins = np.digitize(minutes[positive], HIST_BIN_EDGES) - 1
+    hist_counts = np.bincount(bins, minlength=n_bins)
+    xs = np.round(start_hours[positive], 2).tolist()
+    ys = np.round(minutes[positive] / 60.0, 2).tolist()
+
+    # Per-creator totals
+    creator_codes = {}
+    codes = np.fromiter((creator_codes.setdefault(r[3], len(creator_codes)) for r in rows), dtype=np.int64, count=n)
+    creator_sessions = np.bincount(codes, minlength=len(creator_codes))
+    creator_minutes = np.bincount(codes, weights=minutes, minlength=len(creator_codes))
+
+    return {
+        'total_sessions': n,
+        'total_minutes': int(minutes.sum()),
+        'sessions_per_week': sessions_per_week.tolist(),
+        'hours_per_week': [round(m / 60.0, 2) for m in minutes_per_week.tolist()],
+        'scatter_points': [{'x': x, 'y': y} for x, y in zip(xs, ys)],
+        'hist_counts': hist_counts.tolist(),
+        'creators': _rank_creators(list(creator_codes), creator_sessions.tolist(), creator_minutes.tolist()),
+    }
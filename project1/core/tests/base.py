@@ -0,0 +1,19 @@
+import io
+from contextlib import redirect_stdout
+
+from django.test import TestCase
+
+from benchmarks import datasets
+
+
+class BenchmarkDataTestCase(TestCase):
+    """TestCase over a small benchmark dataset, with its benchmark user and group as ``user`` and ``group``."""
+
+    # Sessions in the seeded dataset; the checks run against it must hold at any size
+    sessions = 500
+
+    @classmethod
+    def setUpTestData(cls):
+        with redirect_stdout(io.StringIO()):
+            datasets.fill(cls.sessions, text_pool=50)
+        cls.user, cls.group = datasets.benchmark_subjects()
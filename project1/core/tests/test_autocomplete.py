@@ -0,0 +1,55 @@
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core import autocomplete
+
+
+class IndexRefreshTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(autocomplete, '_index', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def stale_index(self):
+        index = autocomplete.PrefixIndex()
+        index.built_at = time.monotonic() - 10 * 60 * 60
+        autocomplete._index = index
+        return index
+
+    def wait_for_refresh(self):
+        for thread in threading.enumerate():
+            if thread.name == 'autocomplete-refresh':
+                thread.join()
+
+    def test_builds_a_missing_index_at_once(self):
+        fresh = autocomplete.PrefixIndex()
+        with mock.patch.object(autocomplete, 'build_index', return_value=fresh):
+            self.assertIs(autocomplete.get_index(), fresh)
+
+    def test_stale_index_is_served_while_rebuilt_in_the_background(self):
+        stale = self.stale_index()
+        fresh = autocomplete.PrefixIndex()
+        built = threading.Event()
+
+        def build_index():
+            built.wait()
+            return fresh
+
+        with mock.patch.object(autocomplete, 'build_index', side_effect=build_index) as build:
+            self.assertIs(autocomplete.get_index(), stale)
+            self.assertIs(autocomplete.get_index(), stale)
+            built.set()
+            self.wait_for_refresh()
+            self.assertIs(autocomplete.get_index(), fresh)
+        self.assertEqual(build.call_count, 1)
+
+    def test_failed_refresh_keeps_the_stale_index(self):
+        stale = self.stale_index()
+        with mock.patch.object(autocomplete, 'build_index', side_effect=RuntimeError), \
+                self.assertLogs('core.autocomplete', 'ERROR'):
+            autocomplete.get_index()
+            self.wait_for_refresh()
+        self.assertIs(autocomplete._index, stale)
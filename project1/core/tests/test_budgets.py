@@ -0,0 +1,29 @@
+from django.db import connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from benchmarks import budgets
+
+from .base import BenchmarkDataTestCase
+
+
+@override_settings(**budgets.STEADY_STATE_SETTINGS)
+class QueryBudgetTests(BenchmarkDataTestCase):
+    """Every core URL stays within its query budget in benchmarks.budgets.BUDGETS."""
+
+    def test_urls_within_query_budgets(self):
+        budgets.warm_up(self.user)
+        self.client.force_login(self.user)
+        objects = budgets.url_kwargs(self.user, self.group)
+        self.addCleanup(budgets.remove_export_file, objects)
+        for name, url, method, data, budget in budgets.budget_requests(objects):
+            with self.subTest(name=name, url=url):
+                self.assertIsNotNone(budget, f'No query budget for {name}')
+                with transaction.atomic():
+                    with CaptureQueriesContext(connection) as queries:
+                        response = budgets.fetch(self.client, method, url, data)
+                    transaction.set_rollback(True)
+                sql = '\n'.join(query['sql'] for query in queries.captured_queries)
+                self.assertTrue(200 <= response.status_code < 400,
+                                f'{method.upper()} {url} answered {response.status_code}')
+                self.assertLessEqual(len(queries), budget, f'{method.upper()} {url} ran:\n{sql}')
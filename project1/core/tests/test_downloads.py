@@ -0,0 +1,94 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from core import downloads
+from core.downloads import SnapshotBusy, database_snapshot, sqlite_backup
+
+
+class WritesBetweenSteps:
+    """Source connection whose backup inserts a row (without waiting for locks) after each of its first steps."""
+
+    def __init__(self, connection, path, writes):
+        self.connection = connection
+        self.path = path
+        self.writes = writes
+
+    def backup(self, target, pages, progress, sleep):
+        def step(status, remaining, total):
+            if self.writes and remaining:
+                writer = sqlite3.connect(self.path, timeout=0)
+                with writer:
+                    writer.execute('INSERT INTO t (x) VALUES (randomblob(1000))')
+                writer.close()
+                self.writes -= 1
+            progress(status, remaining, total)
+        self.connection.backup(target, pages=pages, progress=step, sleep=sleep)
+
+    def close(self):
+        self.connection.close()
+
+
+class SqliteBackupTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.source = os.path.join(self.dir, 'source.sqlite3')
+        self.dest = os.path.join(self.dir, 'dest.sqlite3')
+        with sqlite3.connect(self.source) as connection:
+            connection.execute('CREATE TABLE t (id INTEGER PRIMARY KEY, x BLOB)')
+            connection.executemany('INSERT INTO t (x) VALUES (randomblob(1000))', [()] * 500)
+        connection.close()
+
+    def backup_with_writes(self, writes, **kwargs):
+        connect = sqlite3.connect
+
+        def fake_connect(database, *args, **kw):
+            connection = connect(database, *args, **kw)
+            return WritesBetweenSteps(connection, self.source, writes) if kw.get('uri') else connection
+
+        with mock.patch.object(downloads.sqlite3, 'connect', fake_connect):
+            sqlite_backup(self.source, self.dest, pages=16, sleep=0, **kwargs)
+
+    def count(self, path):
+        connection = sqlite3.connect(path)
+        try:
+            return connection.execute('SELECT COUNT(*) FROM t').fetchone()[0]
+        finally:
+            connection.close()
+
+    def test_writers_get_in_between_steps(self):
+        # A write during a step would fail at once with "database is locked"
+        self.backup_with_writes(3)
+        self.assertEqual(self.count(self.source), 503)
+        self.assertEqual(self.count(self.dest), 503)
+
+    def test_gives_up_on_a_database_that_keeps_changing(self):
+        with self.assertRaises(SnapshotBusy):
+            self.backup_with_writes(100, max_restarts=3)
+
+
+class DatabaseSnapshotTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.enterContext(override_settings(DOWNLOAD_CACHE_DIR=self.dir))
+        self.enterContext(mock.patch.object(downloads, 'sqlite_backup', side_effect=SnapshotBusy))
+
+    def test_busy_database_serves_the_previous_snapshot(self):
+        previous = os.path.join(self.dir, 'db-snapshot.sqlite3.gz')
+        with open(previous, 'wb') as f:
+            f.write(b'previous')
+        os.utime(previous, (0, 0))
+        with self.assertLogs('core.downloads', 'WARNING'):
+            self.assertEqual(database_snapshot('db.sqlite3', max_age_minutes=1), previous)
+        self.assertEqual(os.listdir(self.dir), ['db-snapshot.sqlite3.gz'])
+
+    def test_busy_database_without_a_snapshot(self):
+        with self.assertRaises(SnapshotBusy):
+            database_snapshot('db.sqlite3', max_age_minutes=1)
+        self.assertEqual(os.listdir(self.dir), [])
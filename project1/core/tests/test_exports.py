@@ -0,0 +1,34 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from core.models import ExportJob, GroupMembership, StudyGroup, Subject
+
+
+class ExportJobCreateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('member', password='secret')
+        subject = Subject.objects.create(name='Mathematics', description='')
+        cls.group = StudyGroup.objects.create(name='Calculus', description='', subject=subject, created_by=cls.user)
+        GroupMembership.objects.create(user=cls.user, group=cls.group, role='admin')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_window_from_post_body(self):
+        response = self.client.post(reverse('core:export_job_create'), {
+            'kind': 'sessions', 'group': self.group.pk, 'from': '2020-01-01', 'to': '2020-03-31',
+        })
+        self.assertEqual(response.status_code, 202)
+        job = ExportJob.objects.get(pk=response.json()['id'])
+        self.assertEqual(job.params['start'], '2020-01-01')
+        self.assertEqual(job.params['end'], '2020-03-31')
+
+    def test_post_body_overrides_query_string(self):
+        url = reverse('core:export_job_create') + '?from=2019-01-01&to=2020-06-30'
+        response = self.client.post(url, {'kind': 'sessions', 'group': self.group.pk, 'from': '2020-01-01'})
+        self.assertEqual(response.status_code, 202)
+        job = ExportJob.objects.get(pk=response.json()['id'])
+        self.assertEqual(job.params['start'], '2020-01-01')
+        self.assertEqual(job.params['end'], '2020-06-30')
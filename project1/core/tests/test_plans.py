@@ -0,0 +1,12 @@
+from benchmarks import plans
+
+from .base import BenchmarkDataTestCase
+
+
+class QueryPlanTests(BenchmarkDataTestCase):
+    """The hot querysets in benchmarks.plans are served by an index, not a full table scan."""
+
+    def test_hot_queries_use_an_index(self):
+        for name, queryset in plans.hot_queries(self.user, self.group):
+            with self.subTest(name=name):
+                plans.assert_indexed(queryset)
@@ -0,0 +1,37 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.models import GroupMembership, Notification, OutboundEmail, StudyGroup, StudySession, Subject
+from core.reminders import send_session_reminders
+
+
+@override_settings(SITE_URL='https://study.example.com')
+class SessionReminderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('owner', email='owner@example.com')
+        subject = Subject.objects.create(name='Physics', description='')
+        cls.group = StudyGroup.objects.create(name='Lab prep', description='', subject=subject, created_by=owner)
+        GroupMembership.objects.create(user=owner, group=cls.group, role='admin')
+        GroupMembership.objects.create(user=User.objects.create_user('member', email='member@example.com'),
+                                       group=cls.group)
+        GroupMembership.objects.create(user=User.objects.create_user('no_email'), group=cls.group)
+        cls.session = StudySession.objects.create(
+            group=cls.group, title='Optics', description='', date=timezone.localdate() + datetime.timedelta(days=1),
+            start_time=datetime.time(18), end_time=datetime.time(20), location='Lab', created_by=owner,
+        )
+
+    def test_notifies_members_and_queues_emails(self):
+        self.assertEqual(send_session_reminders(self.session), (3, 2))
+        self.assertEqual(Notification.objects.filter(group=self.group, notification_type='session_reminder').count(), 3)
+        self.assertEqual(sorted(email.to[0] for email in OutboundEmail.objects.all()),
+                         ['member@example.com', 'owner@example.com'])
+
+    def test_email_links_are_absolute(self):
+        send_session_reminders(self.session)
+        url = f'https://study.example.com{self.group.get_absolute_url()}'
+        for email in OutboundEmail.objects.all():
+            self.assertIn(f'href="{url}"', email.html_body)
@@ -0,0 +1,48 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import GroupMembership, StudyGroup, StudySession, Subject
+from core.stats.cache import get_version
+
+
+class StatsVersionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('ada')
+        owner = User.objects.create_user('owner')
+        subject = Subject.objects.create(name='Mathematics', description='')
+        cls.member_of = StudyGroup.objects.create(name='Algebra', description='', subject=subject, created_by=owner)
+        cls.created_in = StudyGroup.objects.create(name='Geometry', description='', subject=subject, created_by=owner)
+        cls.other = StudyGroup.objects.create(name='Topology', description='', subject=subject, created_by=owner)
+        GroupMembership.objects.create(user=cls.user, group=cls.member_of)
+        # A session creator who has since left the group still appears in its top members
+        StudySession.objects.create(
+            group=cls.created_in, title='Proofs', description='', date=timezone.localdate(),
+            start_time=datetime.time(10), end_time=datetime.time(11), location='Room 1', created_by=cls.user,
+        )
+
+    def versions(self):
+        return {group: get_version(group.pk) for group in (self.member_of, self.created_in, self.other)}
+
+    def test_rename_invalidates_the_user_groups(self):
+        before = self.versions()
+        self.user.username = 'ada.lovelace'
+        self.user.save()
+        after = self.versions()
+        self.assertNotEqual(after[self.member_of], before[self.member_of])
+        self.assertNotEqual(after[self.created_in], before[self.created_in])
+        self.assertEqual(after[self.other], before[self.other])
+
+    def test_other_edits_keep_group_versions(self):
+        before = self.versions()
+        self.user.first_name = 'Ada'
+        self.user.save()
+        self.assertEqual(self.versions(), before)
+
+    def test_login_runs_no_version_query(self):
+        self.user.last_login = timezone.now()
+        with self.assertNumQueries(1):
+            self.user.save(update_fields=['last_login'])
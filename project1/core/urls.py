@@ -10,6 +10,9 @@ urlpatterns = [
     path('stats/', views.stats, name='stats'),
     path('stats/export/', views.stats_export, name='stats_export'),
     path('my-stats/', views.my_stats, name='my_stats'),
+    path('exports/jobs/', views.export_job_create, name='export_job_create'),
+    path('exports/jobs/<int:pk>/', views.export_job_status, name='export_job_status'),
+    path('exports/jobs/<int:pk>/download/', views.export_job_download, name='export_job_download'),
     path('register/', views.register, name='register'),
     path('profile/', views.profile, name='profile'),
         path('profile/edit/', views.profile_edit, name='profile_edit'),
@@ -17,6 +20,7 @@ urlpatterns = [
     # Study Groups
     path('groups/', views.StudyGroupListView.as_view(), name='group_list'),
     path('groups/search/', views.StudyGroupSearchView.as_view(), name='group_search'),
+    path('groups/autocomplete/', views.group_autocomplete, name='group_autocomplete'),
     path('groups/<int:pk>/', views.StudyGroupDetailView.as_view(), name='group_detail'),
     path('groups/<int:group_id>/stats/export/', views.group_stats_export, name='group_stats_export'),
     path('groups/create/', views.StudyGroupCreateView.as_view(), name='group_create'),
@@ -40,6 +44,12 @@ urlpatterns = [
     path('materials/<int:pk>/edit/', views.StudyMaterialUpdateView.as_view(), name='material_edit'),
     path('materials/<int:pk>/delete/', views.StudyMaterialDeleteView.as_view(), name='material_delete'),
     
+    # Notifications
+    path('notifications/', views.NotificationListView.as_view(), name='notification_list'),
+    path('notifications/<int:pk>/read/', views.notification_read, name='notification_read'),
+    path('notifications/mark-all-read/', views.notification_mark_all_read, name='notification_mark_all_read'),
+    path('notifications/stream/', views.notification_stream, name='notification_stream'),
+
     # Member Management
     path('groups/<int:group_id>/members/<int:membership_id>/change-role/', views.change_member_role, name='change_member_role'),
     path('groups/<int:group_id>/members/<int:membership_id>/remove/', views.remove_member, name='remove_member'),
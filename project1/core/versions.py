@@ -0,0 +1,39 @@
+"""Version counters for versioned cache keys.
+
+A cached entry embeds the current version of its namespace in its key, so
+bumping the version makes every older entry unreachable; those simply expire.
+Used by the dashboard cache (core.stats.cache) and the role maps (core.roles).
+"""
+import time
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def _fresh_version():
+    # Time based so a counter lost to eviction never reuses an old version
+    return int(time.time() * 1000)
+
+
+def get_version(key):
+    """Current version stored under ``key``, created on first use."""
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _fresh_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(*keys):
+    """Invalidate every entry versioned by one of ``keys``."""
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _fresh_version(), None)
+
+
+def is_shared_cache():
+    """Whether a version bump in this process is seen by the other worker processes."""
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], (LocMemCache, DummyCache))
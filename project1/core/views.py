@@ -3,21 +3,35 @@ from django.views.generic import ListView, DetailView, CreateView, UpdateView, D
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth import login, authenticate
-from django.db.models import Q, Count
+from django.db.models import Count, Prefetch, Sum
 from django.contrib.auth.models import User
 from django.utils import timezone
+from django.utils.http import url_has_allowed_host_and_scheme
 import datetime
 import json
-import csv
-from .models import StudyGroup, Subject, StudySession, StudyMaterial, GroupMembership, Profile, Comment
+import os
+from .models import StudyGroup, Subject, StudySession, StudyMaterial, GroupMembership, Profile, Comment, SessionDailyRollup, ExportJob, Notification
+from .rollups import window_totals
+from . import admission, autocomplete, inbox, roles
+from .exports import (
+    TABLE_EXPORTS, TOP_MEMBER_COLUMNS, TOP_MEMBER_TYPES, format_session_row, request_export,
+    session_columns, session_records, session_types, tabular_response, top_member_records,
+)
+from .downloads import ranged_file_response
+from .pagination import CursorPaginationMixin
+from .search import search_groups
+from .stats import HIST_LABELS, cached_stats, compute_series, load_sessions, weeks_between, weeks_ending
 from django.urls import reverse_lazy, reverse
 from django.contrib import messages
 from .forms import UserRegistrationForm, StudyGroupForm, StudySessionForm, StudyMaterialForm, ProfileEditForm
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse, Http404
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import require_GET, require_POST
+from django.conf import settings
 
 def home(request):
     subjects = Subject.objects.all()
-    recent_groups = StudyGroup.objects.filter(is_active=True).order_by('-created_at')[:6]
+    recent_groups = StudyGroup.objects.filter(is_active=True).select_related('subject').order_by('-created_at')[:6]
     return render(request, 'core/home.html', {
         'subjects': subjects,
         'recent_groups': recent_groups
@@ -39,14 +53,84 @@ def get_started_view(request):
     # Simple landing page, could redirect to register or show info
     return render(request, 'core/get_started.html')
 
-class StudyGroupListView(ListView):
+
+PRESET_WEEKS = {'4w': 4, '8w': 8, '12w': 12, '26w': 26}
+
+
+def _date_window(request, default_weeks=12, params=None):
+    """Resolve the (start_date, end_date, preset) window from ?preset= or ?from=/&to=.
+
+    ``params`` is the QueryDict to read instead of request.GET (e.g. a POST body).
+    """
+    if params is None:
+        params = request.GET
+    def parse_date(s):
+        try:
+            return datetime.date.fromisoformat(s)
+        except Exception:
+            return None
+
+    end_date = timezone.localdate()
+    start_date = end_date - datetime.timedelta(weeks=default_weeks)
+    preset = params.get('preset')
+    if preset in PRESET_WEEKS:
+        start_date = end_date - datetime.timedelta(weeks=PRESET_WEEKS[preset])
+    else:
+        pd = parse_date(params.get('from') or '')
+        if pd:
+            start_date = pd
+        pd = parse_date(params.get('to') or '')
+        if pd:
+            end_date = pd
+    if start_date > end_date:
+        start_date, end_date = end_date, start_date
+    return start_date, end_date, preset
+
+
+def _group_stats(group, start_date, end_date):
+    """Totals, chart JSON and top 5 members for a group's detail page.
+
+    Totals and top members come from the daily rollups, like the other
+    dashboards; the weekly, scatter and histogram charts from the sessions
+    themselves (the scatter plots every one of them).
+    """
+    totals = window_totals(group.session_rollups, start_date, end_date)
+    top_members = (group.session_rollups
+                   .filter(day__gte=start_date, day__lte=end_date)
+                   .values('creator__username')
+                   .annotate(sessions=Sum('session_count'), minutes=Sum('total_minutes'))
+                   .order_by('-minutes', '-sessions', 'creator__username')[:5])
+    sessions_qs = group.studysession_set.filter(date__gte=start_date, date__lte=end_date)
+    week_starts = weeks_between(start_date, end_date)
+    series = compute_series(load_sessions(sessions_qs), week_starts)
+    return {
+        'group_total_hours': round(totals['minutes'] / 60.0, 2),
+        'group_total_sessions': totals['sessions'],
+        'group_charts_json': json.dumps({
+            'week_labels': [ws.strftime('%d %b') for ws in week_starts],
+            'sessions_per_week': series['sessions_per_week'],
+            'hours_per_week': series['hours_per_week'],
+            # scatter and histogram for group range
+            'scatter_points': series['scatter_points'],
+            'hist_labels': HIST_LABELS,
+            'hist_counts': series['hist_counts'],
+        }),
+        # Top 5 members by hours, then sessions, in range
+        'group_top_members': [
+            {'user': row['creator__username'], 'sessions': row['sessions'], 'hours': round(row['minutes'] / 60.0, 2)}
+            for row in top_members
+        ],
+    }
+
+
+class StudyGroupListView(CursorPaginationMixin, ListView):
     model = StudyGroup
     template_name = 'core/group_list.html'
     context_object_name = 'groups'
     paginate_by = 12
 
     def get_queryset(self):
-        queryset = StudyGroup.objects.filter(is_active=True)
+        queryset = StudyGroup.objects.filter(is_active=True).select_related('subject', 'created_by')
         subject = self.request.GET.get('subject')
         if subject:
             queryset = queryset.filter(subject__id=subject)
@@ -61,6 +145,7 @@ class StudyGroupDetailView(DetailView):
     model = StudyGroup
     template_name = 'core/group_detail.html'
     context_object_name = 'group'
+    queryset = StudyGroup.objects.select_related('subject', 'created_by')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -68,54 +153,24 @@ class StudyGroupDetailView(DetailView):
         context['user_role'] = None
         
         if self.request.user.is_authenticated:
-            context['is_member'] = self.object.members.filter(id=self.request.user.id).exists()
-            if context['is_member']:
-                membership = GroupMembership.objects.get(
-                    user=self.request.user, 
-                    group=self.object
-                )
-                context['user_role'] = membership.role
+            context['user_role'] = roles.get_role(self.request.user, self.object.pk)
+            context['is_member'] = context['user_role'] is not None
+            if not context['is_member']:
+                context['waitlist_position'] = admission.waitlist_position(self.object, self.request.user)
         
         context['upcoming_sessions'] = self.object.studysession_set.filter(
             status='scheduled'
         ).order_by('date', 'start_time')[:5]
-        context['recent_materials'] = self.object.studymaterial_set.order_by('-created_at')[:5]
-        context['comments'] = self.object.comments.filter(parent__isnull=True).select_related('author').prefetch_related('replies')
-
-        # Group-level stats
-        import datetime, json
-
-        # Date filter window from query params (defaults to last 12 weeks)
-        today = timezone.localdate()
-        default_end = today
-        default_start = default_end - datetime.timedelta(weeks=12)
-
-        q_from = self.request.GET.get('from')
-        q_to = self.request.GET.get('to')
-        start_date = default_start
-        end_date = default_end
-        def parse_date(s):
-            try:
-                return datetime.date.fromisoformat(s)
-            except Exception:
-                return None
-        preset = self.request.GET.get('preset')
-        presets_weeks = {'4w': 4, '8w': 8, '12w': 12, '26w': 26}
-        if preset in presets_weeks:
-            end_date = default_end
-            start_date = end_date - datetime.timedelta(weeks=presets_weeks[preset])
+        context['recent_materials'] = self.object.studymaterial_set.select_related('uploaded_by').order_by('-created_at')[:5]
+        context['comments'] = self.object.comments.filter(parent__isnull=True).select_related('author').prefetch_related(
+            Prefetch('replies', queryset=Comment.objects.select_related('author'))
+        )
+        context['memberships'] = self.object.groupmembership_set.select_related('user')
+
+        # Group-level stats (date window from query params, defaults to last 12 weeks)
+        start_date, end_date, preset = _date_window(self.request)
+        if preset in PRESET_WEEKS:
             context['group_filter_preset'] = preset
-        else:
-            if q_from:
-                pd = parse_date(q_from)
-                if pd:
-                    start_date = pd
-            if q_to:
-                pd = parse_date(q_to)
-                if pd:
-                    end_date = pd
-        if start_date > end_date:
-            start_date, end_date = end_date, start_date
 
         # Cap range to a maximum of ~26 weeks for charting
         max_weeks = 26
@@ -126,256 +181,42 @@ class StudyGroupDetailView(DetailView):
         context['group_filter_start'] = start_date.isoformat()
         context['group_filter_end'] = end_date.isoformat()
 
-        sessions_qs = self.object.studysession_set.filter(date__gte=start_date, date__lte=end_date).only('date', 'start_time', 'end_time', 'created_by')
-        # Totals
-        total_seconds = 0
-        for s in sessions_qs:
-            if s.start_time and s.end_time:
-                start_dt = datetime.datetime.combine(s.date, s.start_time)
-                end_dt = datetime.datetime.combine(s.date, s.end_time)
-                delta = end_dt - start_dt
-                if delta.total_seconds() > 0:
-                    total_seconds += delta.total_seconds()
-        group_total_hours = round(total_seconds / 3600, 2)
-        context['group_total_hours'] = group_total_hours
-        context['group_total_sessions'] = sessions_qs.count()
-        context['group_total_materials'] = self.object.studymaterial_set.count()
-        context['group_total_comments'] = self.object.comments.count()
-
-        # Weekly buckets (last 12 weeks for this group)
-        # Determine aligned week buckets from start_date..end_date
-        # Align to Mondays
-        start_week = start_date - datetime.timedelta(days=start_date.weekday())
-        end_week = end_date - datetime.timedelta(days=end_date.weekday())
-        week_starts = []
-        ws = start_week
-        while ws <= end_week:
-            week_starts.append(ws)
-            ws = ws + datetime.timedelta(weeks=1)
-        # Ensure at least one bucket exists
-        if not week_starts:
-            week_starts = [start_week]
-        week_labels = [ws.strftime('%d %b') for ws in week_starts]
-        sessions_per_week = [0] * len(week_starts)
-        hours_per_week = [0.0] * len(week_starts)
-
-        start_range = week_starts[0]
-        end_range = week_starts[-1] + datetime.timedelta(days=7)
-        bucket_qs = sessions_qs.filter(date__gte=start_range, date__lt=end_range).only('date','start_time','end_time')
-        # Map week_start to index for O(1) lookup
-        week_index = {ws: idx for idx, ws in enumerate(week_starts)}
-        for s in bucket_qs:
-            s_week_start = s.date - datetime.timedelta(days=s.date.weekday())
-            idx = week_index.get(s_week_start)
-            if idx is None:
-                continue
-            sessions_per_week[idx] += 1
-            if s.start_time and s.end_time:
-                start_dt = datetime.datetime.combine(s.date, s.start_time)
-                end_dt = datetime.datetime.combine(s.date, s.end_time)
-                delta = end_dt - start_dt
-                if delta.total_seconds() > 0:
-                    hours_per_week[idx] += round(delta.total_seconds() / 3600, 2)
-
-        context['group_charts_json'] = json.dumps({
-            'week_labels': week_labels,
-            'sessions_per_week': sessions_per_week,
-            'hours_per_week': [round(h, 2) for h in hours_per_week],
-                # scatter and histogram for group range
-                'scatter_points': [
-                    {
-                        'x': round(s.start_time.hour + (s.start_time.minute / 60.0), 2),
-                        'y': round((datetime.datetime.combine(s.date, s.end_time) - datetime.datetime.combine(s.date, s.start_time)).total_seconds() / 3600.0, 2)
-                    }
-                    for s in sessions_qs
-                    if s.start_time and s.end_time and (datetime.datetime.combine(s.date, s.end_time) - datetime.datetime.combine(s.date, s.start_time)).total_seconds() > 0
-                ],
-                'hist_labels': ['0-0.5h', '0.5-1h', '1-1.5h', '1.5-2h', '2-3h', '3-4h', '4-6h', '6h+'],
-                'hist_counts': (lambda _bins: (
-                    (lambda counts: [counts[i] for i in range(len(counts))])(
-                        (lambda counts: (
-                            [
-                                (
-                                    (counts.__setitem__(i, counts[i] + 1)) or counts[i]
-                                ) if (_bins[i] <= (
-                                    (datetime.datetime.combine(s.date, s.end_time) - datetime.datetime.combine(s.date, s.start_time)).total_seconds() / 3600.0
-                                ) < _bins[i+1]) else counts[i]
-                                for s in sessions_qs
-                                for i in range(len(_bins)-1)
-                                if s.start_time and s.end_time and (datetime.datetime.combine(s.date, s.end_time) - datetime.datetime.combine(s.date, s.start_time)).total_seconds() > 0
-                            ] and counts
-                        ))([0]*(len(_bins)-1))
-                    )
-                ))([0, 0.5, 1, 1.5, 2, 3, 4, 6, 1e9])
-        })
-
-        # Top 5 members by sessions and hours in range
-        # Sessions per creator
-        creator_counts = (sessions_qs
-                          .values('created_by__username')
-                          .annotate(count=Count('id'))
-                          .order_by('-count'))
-        # Hours per creator (computed in Python due to separate time fields)
-        hours_by_user = {}
-        for s in sessions_qs:
-            if s.start_time and s.end_time:
-                start_dt = datetime.datetime.combine(s.date, s.start_time)
-                end_dt = datetime.datetime.combine(s.date, s.end_time)
-                secs = max((end_dt - start_dt).total_seconds(), 0)
-                key = getattr(s.created_by, 'username', 'Unknown')
-                hours_by_user[key] = hours_by_user.get(key, 0.0) + secs / 3600.0
-
-        # Merge counts and hours
-        merged = {}
-        for row in creator_counts:
-            user = row['created_by__username'] or 'Unknown'
-            merged[user] = {'user': user, 'sessions': row['count'], 'hours': 0.0}
-        for user, hrs in hours_by_user.items():
-            merged.setdefault(user, {'user': user, 'sessions': 0, 'hours': 0.0})
-            merged[user]['hours'] = round(hrs, 2)
-
-        top_members = sorted(merged.values(), key=lambda x: (-x['hours'], -x['sessions'], x['user']))[:5]
-        context['group_top_members'] = top_members
+        group_stats = cached_stats('group', self.object.pk, start_date, end_date, preset,
+                                   lambda: _group_stats(self.object, start_date, end_date))
+        context.update(group_stats)
+        context['group_total_materials'] = self.object.material_count
+        context['group_total_comments'] = self.object.comment_count
         return context
 
 @login_required
 def group_stats_export(request, group_id):
-    """Export group sessions for the selected date range as CSV."""
+    """Export group sessions for the selected date range as CSV (streamed) or Parquet (?format=parquet)."""
     group = get_object_or_404(StudyGroup, pk=group_id)
     # Only members can export
-    if not group.members.filter(id=request.user.id).exists():
+    if not roles.is_member(request.user, group.pk):
         return HttpResponse('Forbidden', status=403)
 
-    today = timezone.localdate()
-    default_end = today
-    default_start = default_end - datetime.timedelta(weeks=12)
-
-    q_from = request.GET.get('from')
-    q_to = request.GET.get('to')
-    preset = request.GET.get('preset')
-
-    start_date = default_start
-    end_date = default_end
-
-    def parse_date(s):
-        try:
-            return datetime.date.fromisoformat(s)
-        except Exception:
-            return None
+    start_date, end_date, preset = _date_window(request)
+    sessions_qs = group.studysession_set.filter(date__gte=start_date, date__lte=end_date)
 
-    presets_weeks = {'4w': 4, '8w': 8, '12w': 12, '26w': 26}
-    if preset in presets_weeks:
-        end_date = default_end
-        start_date = end_date - datetime.timedelta(weeks=presets_weeks[preset])
-    else:
-        if q_from:
-            pd = parse_date(q_from)
-            if pd:
-                start_date = pd
-        if q_to:
-            pd = parse_date(q_to)
-            if pd:
-                end_date = pd
-        if start_date > end_date:
-            start_date, end_date = end_date, start_date
-
-    sessions_qs = group.studysession_set.filter(date__gte=start_date, date__lte=end_date).order_by('date', 'start_time')
-
-    response = HttpResponse(content_type='text/csv')
-    filename = f"group_{group_id}_sessions_{start_date.isoformat()}_to_{end_date.isoformat()}.csv"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    writer = csv.writer(response)
-    writer.writerow(['date', 'start_time', 'end_time', 'duration_hours', 'title', 'created_by', 'is_online', 'location', 'meeting_link', 'status'])
-
-    for s in sessions_qs:
-        duration_hours = ''
-        if s.start_time and s.end_time:
-            start_dt = datetime.datetime.combine(s.date, s.start_time)
-            end_dt = datetime.datetime.combine(s.date, s.end_time)
-            secs = max((end_dt - start_dt).total_seconds(), 0)
-            duration_hours = round(secs / 3600.0, 2)
-        writer.writerow([
-            s.date.isoformat(),
-            s.start_time.isoformat() if s.start_time else '',
-            s.end_time.isoformat() if s.end_time else '',
-            duration_hours,
-            s.title,
-            getattr(s.created_by, 'username', ''),
-            'yes' if s.is_online else 'no',
-            s.location,
-            s.meeting_link or '',
-            s.status,
-        ])
-
-    return response
+    filename = f"group_{group_id}_sessions_{start_date.isoformat()}_to_{end_date.isoformat()}"
+    return tabular_response(request, session_columns(include_group=False), session_types(include_group=False),
+                            session_records(sessions_qs, include_group=False), filename,
+                            csv_format=format_session_row)
 
 
 @login_required
 def group_top_members_export(request, group_id):
     """Export Top members (by hours, then sessions) for a group within date range."""
     group = get_object_or_404(StudyGroup, pk=group_id)
-    if not group.members.filter(id=request.user.id).exists():
+    if not roles.is_member(request.user, group.pk):
         return HttpResponse('Forbidden', status=403)
 
-    today = timezone.localdate()
-    default_end = today
-    default_start = default_end - datetime.timedelta(weeks=12)
-
-    q_from = request.GET.get('from')
-    q_to = request.GET.get('to')
-    preset = request.GET.get('preset')
-
-    start_date = default_start
-    end_date = default_end
-
-    def parse_date(s):
-        try:
-            return datetime.date.fromisoformat(s)
-        except Exception:
-            return None
+    start_date, end_date, preset = _date_window(request)
+    sessions_qs = group.studysession_set.filter(date__gte=start_date, date__lte=end_date)
 
-    presets_weeks = {'4w': 4, '8w': 8, '12w': 12, '26w': 26}
-    if preset in presets_weeks:
-        end_date = default_end
-        start_date = end_date - datetime.timedelta(weeks=presets_weeks[preset])
-    else:
-        if q_from:
-            pd = parse_date(q_from)
-            if pd:
-                start_date = pd
-        if q_to:
-            pd = parse_date(q_to)
-            if pd:
-                end_date = pd
-        if start_date > end_date:
-            start_date, end_date = end_date, start_date
-
-    sessions_qs = group.studysession_set.filter(date__gte=start_date, date__lte=end_date).only('date','start_time','end_time','created_by')
-
-    # Aggregate hours and session counts by creator
-    from collections import defaultdict
-    counts = defaultdict(int)
-    hours = defaultdict(float)
-    for s in sessions_qs:
-        username = getattr(s.created_by, 'username', 'Unknown')
-        counts[username] += 1
-        if s.start_time and s.end_time:
-            sd = datetime.datetime.combine(s.date, s.start_time)
-            ed = datetime.datetime.combine(s.date, s.end_time)
-            secs = max((ed - sd).total_seconds(), 0)
-            hours[username] += secs / 3600.0
-
-    rows = [{ 'user': u, 'sessions': counts[u], 'hours': round(hours[u], 2) } for u in set(list(counts.keys()) + list(hours.keys()))]
-    rows.sort(key=lambda x: (-x['hours'], -x['sessions'], x['user']))
-
-    response = HttpResponse(content_type='text/csv')
-    filename = f"group_{group_id}_top_members_{start_date.isoformat()}_to_{end_date.isoformat()}.csv"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    writer = csv.writer(response)
-    writer.writerow(['user', 'sessions', 'hours'])
-    for r in rows:
-        writer.writerow([r['user'], r['sessions'], r['hours']])
-    return response
+    filename = f"group_{group_id}_top_members_{start_date.isoformat()}_to_{end_date.isoformat()}"
+    return tabular_response(request, TOP_MEMBER_COLUMNS, TOP_MEMBER_TYPES, top_member_records(sessions_qs), filename)
 
 class StudyGroupCreateView(LoginRequiredMixin, CreateView):
     model = StudyGroup
@@ -401,16 +242,17 @@ class StudyGroupUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
     template_name = 'core/group_form.html'
 
     def test_func(self):
-        group = self.get_object()
-        return GroupMembership.objects.filter(
-            user=self.request.user, 
-            group=group, 
-            role='admin'
-        ).exists()
+        if roles.has_role(self.request.user, self.kwargs['pk'], ['admin']):
+            return True
+        get_object_or_404(StudyGroup, pk=self.kwargs['pk'])
+        return False
 
     def form_valid(self, form):
         messages.success(self.request, 'Study group updated successfully!')
-        return super().form_valid(form)
+        response = super().form_valid(form)
+        # A larger max_members frees seats for the waitlist
+        admission.promote_waitlist(self.object)
+        return response
     
     def get_success_url(self):
         return reverse('core:group_detail', kwargs={'pk': self.object.pk})
@@ -418,25 +260,28 @@ class StudyGroupUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
 @login_required
 def join_group(request, pk):
     group = get_object_or_404(StudyGroup, pk=pk)
-    if group.members.count() >= group.max_members:
-        messages.error(request, 'This group is already full.')
-        return redirect('core:group_detail', pk=pk)
-    
-    if not group.members.filter(id=request.user.id).exists():
-        GroupMembership.objects.create(
-            user=request.user,
-            group=group,
-            role='member'
-        )
+    status = admission.join(group, request.user)
+    if status == admission.JOINED:
         messages.success(request, 'You have successfully joined the group!')
+    elif status == admission.WAITLISTED:
+        position = admission.waitlist_position(group, request.user)
+        messages.info(request, f'This group is full. You are #{position} on the waitlist and will be added when a seat opens.')
+    elif status == admission.ALREADY_WAITLISTED:
+        messages.info(request, 'You are already on the waitlist for this group.')
     return redirect('core:group_detail', pk=pk)
 
 @login_required
 def leave_group(request, pk):
     group = get_object_or_404(StudyGroup, pk=pk)
-    membership = get_object_or_404(GroupMembership, user=request.user, group=group)
+    membership = GroupMembership.objects.filter(user=request.user, group=group).first()
+    if membership is None:
+        if not admission.leave_waitlist(group, request.user):
+            raise Http404('Not a member of this group')
+        messages.success(request, 'You have left the waitlist.')
+        return redirect('core:group_detail', pk=pk)
     if membership.role != 'admin' or group.groupmembership_set.filter(role='admin').count() > 1:
         membership.delete()
+        admission.promote_waitlist(group)
         messages.success(request, 'You have left the group.')
     else:
         messages.error(request, 'As the only admin, you cannot leave the group. Please assign another admin first.')
@@ -503,171 +348,101 @@ def stats(request):
         current_group = None
 
     # Date window
-    today = timezone.localdate()
-    default_end = today
-    default_start = default_end - datetime.timedelta(weeks=12)
-    q_from = request.GET.get('from')
-    q_to = request.GET.get('to')
-    preset = request.GET.get('preset')
-
-    def parse_date(s):
-        try:
-            return datetime.date.fromisoformat(s)
-        except Exception:
-            return None
-
-    start_date = default_start
-    end_date = default_end
-    presets_weeks = {'4w': 4, '8w': 8, '12w': 12, '26w': 26}
-    if preset in presets_weeks:
-        end_date = default_end
-        start_date = end_date - datetime.timedelta(weeks=presets_weeks[preset])
-    else:
-        if q_from:
-            pd = parse_date(q_from)
-            if pd:
-                start_date = pd
-        if q_to:
-            pd = parse_date(q_to)
-            if pd:
-                end_date = pd
-    if start_date > end_date:
-        start_date, end_date = end_date, start_date
+    start_date, end_date, preset = _date_window(request)
 
     # Base querysets (optionally by group)
     session_base = StudySession.objects.all()
-    material_base = StudyMaterial.objects.all()
-    comment_base = Comment.objects.all()
+    rollups = SessionDailyRollup.objects.all()
     if current_group:
         session_base = session_base.filter(group=current_group)
-        material_base = material_base.filter(group=current_group)
-        comment_base = comment_base.filter(group=current_group)
+        rollups = rollups.filter(group=current_group)
 
-    # Totals (respect group; sessions/materials/comments further restricted as needed)
+    # Totals (respect group), read from the denormalized group counters
     if current_group:
-        total_users = current_group.members.count()
+        total_users = current_group.member_count
         total_groups = 1
+        total_sessions = current_group.session_count
+        total_materials = current_group.material_count
+        total_comments = current_group.comment_count
     else:
         total_users = User.objects.count()
-        total_groups = StudyGroup.objects.count()
-    total_sessions = session_base.count()
-    total_materials = material_base.count()
-    total_comments = comment_base.count()
+        totals = StudyGroup.objects.aggregate(
+            groups=Count('id'), sessions=Sum('session_count'),
+            materials=Sum('material_count'), comments=Sum('comment_count'),
+        )
+        total_groups = totals['groups']
+        total_sessions = totals['sessions'] or 0
+        total_materials = totals['materials'] or 0
+        total_comments = totals['comments'] or 0
 
     # Total study hours in selected window (sum of durations)
-    sessions = session_base.filter(date__gte=start_date, date__lte=end_date).only('date', 'start_time', 'end_time')
-    total_seconds = 0
-    for s in sessions:
-        if s.start_time and s.end_time:
-            start_dt = datetime.datetime.combine(s.date, s.start_time)
-            end_dt = datetime.datetime.combine(s.date, s.end_time)
-            delta = end_dt - start_dt
-            if delta.total_seconds() > 0:
-                total_seconds += delta.total_seconds()
-    total_study_hours = round(total_seconds / 3600, 2)
-
-    # Time window helpers
-    # Weekly buckets based on selected end_date (ending week)
-    week_starts = []
-    current_week_start = end_date - datetime.timedelta(days=end_date.weekday())
-    for i in range(11, -1, -1):
-        week_starts.append(current_week_start - datetime.timedelta(weeks=i))
-
-    week_labels = [ws.strftime('%d %b') for ws in week_starts]
-    sessions_per_week = [0] * len(week_starts)
-    hours_per_week = [0.0] * len(week_starts)
-
-    start_range = week_starts[0]
-    end_range = week_starts[-1] + datetime.timedelta(days=7)
-    qs = session_base.filter(date__gte=start_range, date__lt=end_range).only('date', 'start_time', 'end_time')
-    for s in qs:
-        # find index of week bucket
-        # compute the Monday of that session's week
-        s_week_start = s.date - datetime.timedelta(days=s.date.weekday())
-        if s_week_start in week_starts:
-            idx = week_starts.index(s_week_start)
-            sessions_per_week[idx] += 1
-            if s.start_time and s.end_time:
-                start_dt = datetime.datetime.combine(s.date, s.start_time)
-                end_dt = datetime.datetime.combine(s.date, s.end_time)
-                delta = end_dt - start_dt
-                if delta.total_seconds() > 0:
-                    hours_per_week[idx] += round(delta.total_seconds() / 3600, 2)
-
-    # Scatter: start hour vs duration (hrs) for sessions in range
-    scatter_points = []
-    # Histogram: durations distribution (hrs)
-    bin_edges = [0, 0.5, 1, 1.5, 2, 3, 4, 6, 1e9]  # last bin is open-ended
-    hist_labels = ['0-0.5h', '0.5-1h', '1-1.5h', '1.5-2h', '2-3h', '3-4h', '4-6h', '6h+']
-    hist_counts = [0] * (len(bin_edges) - 1)
-
-    for s in qs:
-        if s.start_time and s.end_time:
-            start_dt = datetime.datetime.combine(s.date, s.start_time)
-            end_dt = datetime.datetime.combine(s.date, s.end_time)
-            secs = (end_dt - start_dt).total_seconds()
-            if secs > 0:
-                hours = round(secs / 3600.0, 2)
-                # scatter x as decimal start hour
-                x_hour = s.start_time.hour + (s.start_time.minute / 60.0)
-                scatter_points.append({'x': round(x_hour, 2), 'y': hours})
-                # histogram binning
-                for i in range(len(bin_edges) - 1):
-                    if bin_edges[i] <= hours < bin_edges[i + 1]:
-                        hist_counts[i] += 1
-                        break
-
-    # New users/members per month (last 6 months)
-    months = []
-    month_labels = []
-    today_month_start = end_date.replace(day=1)
-    for i in range(5, -1, -1):
-        # Compute month start by subtracting i months
-        year = today_month_start.year
-        month = today_month_start.month - i
-        while month <= 0:
-            month += 12
-            year -= 1
-        month_start = datetime.date(year, month, 1)
-        months.append(month_start)
-        month_labels.append(month_start.strftime('%b %Y'))
-    # month end helper
-    def next_month(d: datetime.date) -> datetime.date:
-        if d.month == 12:
-            return datetime.date(d.year + 1, 1, 1)
-        return datetime.date(d.year, d.month + 1, 1)
-
-    users_per_month = []
-    month_series_label = 'Usuarios'
-    if current_group:
-        month_series_label = 'Miembros'
-        for m in months:
-            nm = next_month(m)
-            count = GroupMembership.objects.filter(group=current_group, joined_at__date__gte=m, joined_at__date__lt=nm).count()
-            users_per_month.append(count)
-    else:
-        for m in months:
-            nm = next_month(m)
-            count = User.objects.filter(date_joined__date__gte=m, date_joined__date__lt=nm).count()
-            users_per_month.append(count)
+    total_study_hours = round(window_totals(rollups, start_date, end_date)['minutes'] / 60.0, 2)
 
     # Active users last 30 days (by last_login)
     last_30 = end_date - datetime.timedelta(days=30)
     if current_group:
-        active_users_30d = User.objects.filter(last_login__date__gte=last_30, studygroup__id=current_group.id).distinct().count()
+        active_users_30d = User.objects.filter(last_login__date__gte=last_30, study_groups__id=current_group.id).distinct().count()
     else:
         active_users_30d = User.objects.filter(last_login__date__gte=last_30).count()
 
-    charts = {
-        'week_labels': week_labels,
-        'sessions_per_week': sessions_per_week,
-        'hours_per_week': [round(h, 2) for h in hours_per_week],
-        'month_labels': month_labels,
-        'users_per_month': users_per_month,
-        'scatter_points': scatter_points,
-        'hist_labels': hist_labels,
-        'hist_counts': hist_counts,
-    }
+    month_series_label = 'Miembros' if current_group else 'Usuarios'
+
+    # Chart series are cached until the group's (or any, for the global view) data changes
+    def build_charts():
+        # Weekly buckets, scatter and duration histogram for the 12 weeks ending at end_date
+        week_starts = weeks_ending(end_date)
+        week_labels = [ws.strftime('%d %b') for ws in week_starts]
+        end_range = week_starts[-1] + datetime.timedelta(days=7)
+        series = compute_series(
+            load_sessions(session_base.filter(date__gte=week_starts[0], date__lt=end_range)),
+            week_starts,
+        )
+
+        # New users/members per month (last 6 months)
+        months = []
+        month_labels = []
+        today_month_start = end_date.replace(day=1)
+        for i in range(5, -1, -1):
+            # Compute month start by subtracting i months
+            year = today_month_start.year
+            month = today_month_start.month - i
+            while month <= 0:
+                month += 12
+                year -= 1
+            month_start = datetime.date(year, month, 1)
+            months.append(month_start)
+            month_labels.append(month_start.strftime('%b %Y'))
+        # month end helper
+        def next_month(d: datetime.date) -> datetime.date:
+            if d.month == 12:
+                return datetime.date(d.year + 1, 1, 1)
+            return datetime.date(d.year, d.month + 1, 1)
+
+        users_per_month = []
+        if current_group:
+            for m in months:
+                nm = next_month(m)
+                count = GroupMembership.objects.filter(group=current_group, joined_at__date__gte=m, joined_at__date__lt=nm).count()
+                users_per_month.append(count)
+        else:
+            for m in months:
+                nm = next_month(m)
+                count = User.objects.filter(date_joined__date__gte=m, date_joined__date__lt=nm).count()
+                users_per_month.append(count)
+
+        return json.dumps({
+            'week_labels': week_labels,
+            'sessions_per_week': series['sessions_per_week'],
+            'hours_per_week': series['hours_per_week'],
+            'month_labels': month_labels,
+            'users_per_month': users_per_month,
+            'scatter_points': series['scatter_points'],
+            'hist_labels': HIST_LABELS,
+            'hist_counts': series['hist_counts'],
+        })
+
+    charts_json = cached_stats('stats', current_group.id if current_group else None,
+                               start_date, end_date, preset, build_charts)
 
     context = {
         'total_users': total_users,
@@ -677,7 +452,7 @@ def stats(request):
         'total_comments': total_comments,
         'total_study_hours': total_study_hours,
         'active_users_30d': active_users_30d,
-        'charts_json': json.dumps(charts),
+        'charts_json': charts_json,
         'groups': StudyGroup.objects.order_by('name').only('id', 'name'),
         'current_group': current_group,
         'filter_start': start_date.isoformat(),
@@ -698,121 +473,46 @@ def my_stats(request):
     user = request.user
     
     # Date window (defaults to last 12 weeks)
-    today = timezone.localdate()
-    default_end = today
-    default_start = default_end - datetime.timedelta(weeks=12)
-    
-    q_from = request.GET.get('from')
-    q_to = request.GET.get('to')
-    preset = request.GET.get('preset')
-    
-    def parse_date(s):
-        try:
-            return datetime.date.fromisoformat(s)
-        except Exception:
-            return None
-    
-    start_date = default_start
-    end_date = default_end
-    presets_weeks = {'4w': 4, '8w': 8, '12w': 12, '26w': 26}
-    if preset in presets_weeks:
-        end_date = default_end
-        start_date = end_date - datetime.timedelta(weeks=presets_weeks[preset])
-    else:
-        if q_from:
-            pd = parse_date(q_from)
-            if pd:
-                start_date = pd
-        if q_to:
-            pd = parse_date(q_to)
-            if pd:
-                end_date = pd
-    if start_date > end_date:
-        start_date, end_date = end_date, start_date
-    
+    start_date, end_date, preset = _date_window(request)
+
     # Get user's groups
     user_groups = StudyGroup.objects.filter(members=user)
-    
+
     # Sessions created by this user
     my_sessions = StudySession.objects.filter(created_by=user)
     total_my_sessions = my_sessions.count()
-    
-    # Sessions in user's groups (not just created by user)
-    group_sessions = StudySession.objects.filter(group__in=user_groups)
-    
+    rollups = SessionDailyRollup.objects.filter(creator=user)
+
     # Total study hours for user's own sessions in date range
-    sessions_range = my_sessions.filter(date__gte=start_date, date__lte=end_date).only('date', 'start_time', 'end_time')
-    total_seconds = 0
-    for s in sessions_range:
-        if s.start_time and s.end_time:
-            start_dt = datetime.datetime.combine(s.date, s.start_time)
-            end_dt = datetime.datetime.combine(s.date, s.end_time)
-            delta = end_dt - start_dt
-            if delta.total_seconds() > 0:
-                total_seconds += delta.total_seconds()
-    my_study_hours = round(total_seconds / 3600, 2)
-    
-    # Weekly data for user's sessions
-    week_starts = []
-    current_week_start = end_date - datetime.timedelta(days=end_date.weekday())
-    for i in range(11, -1, -1):
-        week_starts.append(current_week_start - datetime.timedelta(weeks=i))
-    
+    my_study_hours = round(window_totals(rollups, start_date, end_date)['minutes'] / 60.0, 2)
+
+    # Weekly data, scatter and histogram for user's sessions
+    week_starts = weeks_ending(end_date)
     week_labels = [ws.strftime('%d %b') for ws in week_starts]
-    my_sessions_per_week = [0] * len(week_starts)
-    my_hours_per_week = [0.0] * len(week_starts)
-    
-    start_range = week_starts[0]
     end_range = week_starts[-1] + datetime.timedelta(days=7)
-    qs = my_sessions.filter(date__gte=start_range, date__lt=end_range).only('date', 'start_time', 'end_time')
-    
-    for s in qs:
-        s_week_start = s.date - datetime.timedelta(days=s.date.weekday())
-        if s_week_start in week_starts:
-            idx = week_starts.index(s_week_start)
-            my_sessions_per_week[idx] += 1
-            if s.start_time and s.end_time:
-                start_dt = datetime.datetime.combine(s.date, s.start_time)
-                end_dt = datetime.datetime.combine(s.date, s.end_time)
-                delta = end_dt - start_dt
-                if delta.total_seconds() > 0:
-                    my_hours_per_week[idx] += round(delta.total_seconds() / 3600, 2)
-    
-    # Scatter and histogram for user's sessions
-    scatter_points = []
-    bin_edges = [0, 0.5, 1, 1.5, 2, 3, 4, 6, 1e9]
-    hist_labels = ['0-0.5h', '0.5-1h', '1-1.5h', '1.5-2h', '2-3h', '3-4h', '4-6h', '6h+']
-    hist_counts = [0] * (len(bin_edges) - 1)
-    
-    for s in qs:
-        if s.start_time and s.end_time:
-            start_dt = datetime.datetime.combine(s.date, s.start_time)
-            end_dt = datetime.datetime.combine(s.date, s.end_time)
-            secs = (end_dt - start_dt).total_seconds()
-            if secs > 0:
-                hours = round(secs / 3600.0, 2)
-                x_hour = s.start_time.hour + (s.start_time.minute / 60.0)
-                scatter_points.append({'x': round(x_hour, 2), 'y': hours})
-                for i in range(len(bin_edges) - 1):
-                    if bin_edges[i] <= hours < bin_edges[i + 1]:
-                        hist_counts[i] += 1
-                        break
-    
+    series = compute_series(
+        load_sessions(my_sessions.filter(date__gte=week_starts[0], date__lt=end_range)),
+        week_starts,
+    )
+
     # Group breakdown (sessions per group)
-    group_breakdown = []
-    for grp in user_groups:
-        count = my_sessions.filter(group=grp).count()
-        if count > 0:
-            group_breakdown.append({'group': grp.name, 'sessions': count})
-    group_breakdown.sort(key=lambda x: -x['sessions'])
-    
+    group_breakdown = [
+        {'group': row['group__name'], 'sessions': row['sessions']}
+        for row in (rollups
+                    .filter(group__in=user_groups)
+                    .values('group_id', 'group__name')
+                    .annotate(sessions=Sum('session_count'))
+                    .filter(sessions__gt=0)
+                    .order_by('-sessions'))
+    ]
+
     charts = {
         'week_labels': week_labels,
-        'sessions_per_week': my_sessions_per_week,
-        'hours_per_week': [round(h, 2) for h in my_hours_per_week],
-        'scatter_points': scatter_points,
-        'hist_labels': hist_labels,
-        'hist_counts': hist_counts,
+        'sessions_per_week': series['sessions_per_week'],
+        'hours_per_week': series['hours_per_week'],
+        'scatter_points': series['scatter_points'],
+        'hist_labels': HIST_LABELS,
+        'hist_counts': series['hist_counts'],
         'group_labels': [g['group'] for g in group_breakdown],
         'group_sessions': [g['sessions'] for g in group_breakdown],
     }
@@ -841,74 +541,17 @@ def stats_export(request):
     except (StudyGroup.DoesNotExist, ValueError):
         current_group = None
 
-    today = timezone.localdate()
-    default_end = today
-    default_start = default_end - datetime.timedelta(weeks=12)
-
-    q_from = request.GET.get('from')
-    q_to = request.GET.get('to')
-    preset = request.GET.get('preset')
-
-    def parse_date(s):
-        try:
-            return datetime.date.fromisoformat(s)
-        except Exception:
-            return None
-
-    start_date = default_start
-    end_date = default_end
-    presets_weeks = {'4w': 4, '8w': 8, '12w': 12, '26w': 26}
-    if preset in presets_weeks:
-        end_date = default_end
-        start_date = end_date - datetime.timedelta(weeks=presets_weeks[preset])
-    else:
-        if q_from:
-            pd = parse_date(q_from)
-            if pd:
-                start_date = pd
-        if q_to:
-            pd = parse_date(q_to)
-            if pd:
-                end_date = pd
-    if start_date > end_date:
-        start_date, end_date = end_date, start_date
+    start_date, end_date, preset = _date_window(request)
 
     session_base = StudySession.objects.all()
     if current_group:
         session_base = session_base.filter(group=current_group)
-    sessions_qs = session_base.filter(date__gte=start_date, date__lte=end_date).order_by('date', 'start_time')
+    sessions_qs = session_base.filter(date__gte=start_date, date__lte=end_date)
 
-    response = HttpResponse(content_type='text/csv')
     base = f"global" if not current_group else f"group_{current_group.id}"
-    filename = f"{base}_sessions_{start_date.isoformat()}_to_{end_date.isoformat()}.csv"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-
-    import csv as _csv
-    writer = _csv.writer(response)
-    writer.writerow(['date', 'start_time', 'end_time', 'duration_hours', 'title', 'created_by', 'group', 'is_online', 'location', 'meeting_link', 'status'])
-
-    for s in sessions_qs:
-        duration_hours = ''
-        if s.start_time and s.end_time:
-            start_dt = datetime.datetime.combine(s.date, s.start_time)
-            end_dt = datetime.datetime.combine(s.date, s.end_time)
-            secs = max((end_dt - start_dt).total_seconds(), 0)
-            duration_hours = round(secs / 3600.0, 2)
-        writer.writerow([
-            s.date.isoformat(),
-            s.start_time.isoformat() if s.start_time else '',
-            s.end_time.isoformat() if s.end_time else '',
-            duration_hours,
-            s.title,
-            getattr(s.created_by, 'username', ''),
-            getattr(s.group, 'name', ''),
-            'yes' if s.is_online else 'no',
-            s.location,
-            s.meeting_link or '',
-            s.status,
-        ])
-
-    return response
+    filename = f"{base}_sessions_{start_date.isoformat()}_to_{end_date.isoformat()}"
+    return tabular_response(request, session_columns(), session_types(), session_records(sessions_qs), filename,
+                            csv_format=format_session_row)
 
 
 @user_passes_test(lambda u: u.is_authenticated and u.is_superuser, login_url='login')
@@ -922,66 +565,97 @@ def stats_top_members_export(request):
     except (StudyGroup.DoesNotExist, ValueError):
         return HttpResponse('Invalid group', status=400)
 
-    today = timezone.localdate()
-    default_end = today
-    default_start = default_end - datetime.timedelta(weeks=12)
-
-    q_from = request.GET.get('from')
-    q_to = request.GET.get('to')
-    preset = request.GET.get('preset')
+    start_date, end_date, preset = _date_window(request)
+    sessions_qs = group.studysession_set.filter(date__gte=start_date, date__lte=end_date)
+
+    filename = f"group_{group.id}_top_members_{start_date.isoformat()}_to_{end_date.isoformat()}"
+    return tabular_response(request, TOP_MEMBER_COLUMNS, TOP_MEMBER_TYPES, top_member_records(sessions_qs), filename)
+
+def _export_job_json(job):
+    return {
+        'id': job.pk,
+        'kind': job.kind,
+        'params': job.params,
+        'status': job.status,
+        'row_count': job.row_count,
+        'error': job.error,
+        'created_at': job.created_at.isoformat(),
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'status_url': reverse('core:export_job_status', args=[job.pk]),
+        'download_url': reverse('core:export_job_download', args=[job.pk]) if job.status == 'done' else None,
+    }
 
-    start_date = default_start
-    end_date = default_end
 
-    def parse_date(s):
-        try:
-            return datetime.date.fromisoformat(s)
-        except Exception:
-            return None
+@login_required
+@require_POST
+def export_job_create(request):
+    """Queue a background export (or reuse an equivalent one) and return its status as JSON.
 
-    presets_weeks = {'4w': 4, '8w': 8, '12w': 12, '26w': 26}
-    if preset in presets_weeks:
-        end_date = default_end
-        start_date = end_date - datetime.timedelta(weeks=presets_weeks[preset])
+    Group exports are open to group members; global and table exports are ADMIN ONLY.
+    """
+    kind = request.POST.get('kind')
+    if kind == 'table':
+        table = request.POST.get('table')
+        if table not in TABLE_EXPORTS:
+            return JsonResponse({'error': 'Invalid table'}, status=400)
+        params = {'table': table}
+    elif kind in ('sessions', 'top_members'):
+        # The window and group may come in the POST body or in the query string; the body wins
+        query = request.GET.copy()
+        query.update(request.POST)
+        start_date, end_date, preset = _date_window(request, params=query)
+        group_id = query.get('group')
+        if group_id:
+            try:
+                group = StudyGroup.objects.get(pk=int(group_id))
+            except (StudyGroup.DoesNotExist, ValueError):
+                return JsonResponse({'error': 'Invalid group'}, status=400)
+            group_id = group.pk
+        elif kind == 'top_members':
+            return JsonResponse({'error': 'Group parameter required'}, status=400)
+        params = {'group_id': group_id, 'start': start_date.isoformat(), 'end': end_date.isoformat()}
     else:
-        if q_from:
-            pd = parse_date(q_from)
-            if pd:
-                start_date = pd
-        if q_to:
-            pd = parse_date(q_to)
-            if pd:
-                end_date = pd
-        if start_date > end_date:
-            start_date, end_date = end_date, start_date
-
-    sessions_qs = group.studysession_set.filter(date__gte=start_date, date__lte=end_date).only('date','start_time','end_time','created_by')
-
-    from collections import defaultdict
-    counts = defaultdict(int)
-    hours = defaultdict(float)
-    for s in sessions_qs:
-        username = getattr(s.created_by, 'username', 'Unknown')
-        counts[username] += 1
-        if s.start_time and s.end_time:
-            sd = datetime.datetime.combine(s.date, s.start_time)
-            ed = datetime.datetime.combine(s.date, s.end_time)
-            secs = max((ed - sd).total_seconds(), 0)
-            hours[username] += secs / 3600.0
-
-    rows = [{ 'user': u, 'sessions': counts[u], 'hours': round(hours[u], 2) } for u in set(list(counts.keys()) + list(hours.keys()))]
-    rows.sort(key=lambda x: (-x['hours'], -x['sessions'], x['user']))
-
-    response = HttpResponse(content_type='text/csv')
-    filename = f"group_{group.id}_top_members_{start_date.isoformat()}_to_{end_date.isoformat()}.csv"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    writer = csv.writer(response)
-    writer.writerow(['user', 'sessions', 'hours'])
-    for r in rows:
-        writer.writerow([r['user'], r['sessions'], r['hours']])
-    return response
-
-class StudyGroupSearchView(ListView):
+        return JsonResponse({'error': 'Invalid export kind'}, status=400)
+
+    group_id = params.get('group_id')
+    allowed = request.user.is_superuser or (
+        group_id and roles.is_member(request.user, group_id)
+    )
+    if not allowed:
+        return JsonResponse({'error': 'Forbidden'}, status=403)
+
+    job, created = request_export(kind, params, user=request.user)
+    return JsonResponse(_export_job_json(job), status=202 if created else 200)
+
+
+def _get_export_job(request, pk):
+    job = get_object_or_404(ExportJob, pk=pk)
+    if not request.user.is_superuser and job.requested_by_id != request.user.id:
+        raise Http404('Export not found')
+    return job
+
+
+@login_required
+def export_job_status(request, pk):
+    """Poll a background export job."""
+    return JsonResponse(_export_job_json(_get_export_job(request, pk)))
+
+
+@login_required
+def export_job_download(request, pk):
+    """Download a finished export (gzip-compressed CSV) with Range support."""
+    job = _get_export_job(request, pk)
+    if job.status != 'done' or not job.file:
+        raise Http404('Export not ready')
+    try:
+        path = job.file.path
+    except (ValueError, NotImplementedError):
+        raise Http404('Export file not found')
+    if not os.path.exists(path):
+        raise Http404('Export file not found')
+    return ranged_file_response(request, path, os.path.basename(job.file.name), content_type='application/gzip')
+
+class StudyGroupSearchView(CursorPaginationMixin, ListView):
     model = StudyGroup
     template_name = 'core/search_results.html'
     context_object_name = 'groups'
@@ -990,20 +664,11 @@ class StudyGroupSearchView(ListView):
     def get_queryset(self):
         query = self.request.GET.get('q', '')
         subject = self.request.GET.get('subject', '')
-        
-        queryset = StudyGroup.objects.filter(is_active=True)
-        
-        if query:
-            queryset = queryset.filter(
-                Q(name__icontains=query) |
-                Q(description__icontains=query) |
-                Q(subject__name__icontains=query)
-            )
-        
-        if subject:
-            queryset = queryset.filter(subject_id=subject)
-            
-        return queryset.order_by('-created_at')
+        if subject and not subject.isdigit():
+            subject = ''
+
+        # Ranked full-text search (FTS5 / tsvector), newest first without a query
+        return search_groups(query, subject or None)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -1012,6 +677,28 @@ class StudyGroupSearchView(ListView):
         context['current_subject'] = self.request.GET.get('subject', '')
         return context
 
+AUTOCOMPLETE_MAX_RESULTS = 20
+
+
+@require_GET
+@cache_control(public=True, max_age=settings.AUTOCOMPLETE_CACHE_SECONDS)
+def group_autocomplete(request):
+    """Typeahead suggestions: groups and subjects whose name has a word starting with ``q``."""
+    query = request.GET.get('q', '').strip()[:100]
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), AUTOCOMPLETE_MAX_RESULTS)
+    except ValueError:
+        limit = 10
+    results = []
+    for kind, pk, item in autocomplete.suggest(query, limit):
+        if kind == autocomplete.GROUP:
+            url = reverse('core:group_detail', args=[pk])
+        else:
+            url = f"{reverse('core:group_search')}?subject={pk}"
+        results.append({'type': kind, 'id': pk, 'label': item['label'],
+                         'subject': item.get('subject', ''), 'url': url})
+    return JsonResponse({'query': query, 'results': results})
+
 # Comment views
 @login_required
 def add_comment(request, group_id):
@@ -1069,12 +756,10 @@ class StudySessionCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateView
     template_name = 'core/session_form.html'
 
     def test_func(self):
-        group = get_object_or_404(StudyGroup, pk=self.kwargs['group_id'])
-        return GroupMembership.objects.filter(
-            user=self.request.user,
-            group=group,
-            role__in=['admin', 'moderator']
-        ).exists()
+        if roles.has_role(self.request.user, self.kwargs['group_id'], roles.MANAGER_ROLES):
+            return True
+        get_object_or_404(StudyGroup, pk=self.kwargs['group_id'])
+        return False
 
     def form_valid(self, form):
         form.instance.group_id = self.kwargs['group_id']
@@ -1097,12 +782,8 @@ class StudySessionUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView
 
     def test_func(self):
         session = self.get_object()
-        return (session.created_by == self.request.user or 
-                GroupMembership.objects.filter(
-                    user=self.request.user,
-                    group=session.group,
-                    role__in=['admin', 'moderator']
-                ).exists())
+        return (session.created_by_id == self.request.user.id or
+                roles.has_role(self.request.user, session.group_id, roles.MANAGER_ROLES))
 
     def form_valid(self, form):
         messages.success(self.request, 'Study session updated successfully!')
@@ -1122,12 +803,8 @@ class StudySessionDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView
 
     def test_func(self):
         session = self.get_object()
-        return (session.created_by == self.request.user or 
-                GroupMembership.objects.filter(
-                    user=self.request.user,
-                    group=session.group,
-                    role='admin'
-                ).exists())
+        return (session.created_by_id == self.request.user.id or
+                roles.has_role(self.request.user, session.group_id, ['admin']))
 
     def get_success_url(self):
         messages.success(self.request, 'Study session deleted successfully!')
@@ -1140,11 +817,10 @@ class StudyMaterialCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateVie
     template_name = 'core/material_form.html'
 
     def test_func(self):
-        group = get_object_or_404(StudyGroup, pk=self.kwargs['group_id'])
-        return GroupMembership.objects.filter(
-            user=self.request.user,
-            group=group
-        ).exists()
+        if roles.is_member(self.request.user, self.kwargs['group_id']):
+            return True
+        get_object_or_404(StudyGroup, pk=self.kwargs['group_id'])
+        return False
 
     def form_valid(self, form):
         form.instance.group_id = self.kwargs['group_id']
@@ -1167,12 +843,8 @@ class StudyMaterialUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateVie
 
     def test_func(self):
         material = self.get_object()
-        return (material.uploaded_by == self.request.user or 
-                GroupMembership.objects.filter(
-                    user=self.request.user,
-                    group=material.group,
-                    role__in=['admin', 'moderator']
-                ).exists())
+        return (material.uploaded_by_id == self.request.user.id or
+                roles.has_role(self.request.user, material.group_id, roles.MANAGER_ROLES))
 
     def form_valid(self, form):
         messages.success(self.request, 'Study material updated successfully!')
@@ -1192,12 +864,8 @@ class StudyMaterialDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteVie
 
     def test_func(self):
         material = self.get_object()
-        return (material.uploaded_by == self.request.user or 
-                GroupMembership.objects.filter(
-                    user=self.request.user,
-                    group=material.group,
-                    role='admin'
-                ).exists())
+        return (material.uploaded_by_id == self.request.user.id or
+                roles.has_role(self.request.user, material.group_id, ['admin']))
 
     def get_success_url(self):
         messages.success(self.request, 'Study material deleted successfully!')
@@ -1210,7 +878,7 @@ def change_member_role(request, group_id, membership_id):
     membership = get_object_or_404(GroupMembership, pk=membership_id, group=group)
     
     # Check if user is admin
-    if not GroupMembership.objects.filter(user=request.user, group=group, role='admin').exists():
+    if not roles.has_role(request.user, group.pk, ['admin']):
         messages.error(request, 'Only group admins can change member roles.')
         return redirect('core:group_detail', pk=group_id)
     
@@ -1238,7 +906,7 @@ def remove_member(request, group_id, membership_id):
     membership = get_object_or_404(GroupMembership, pk=membership_id, group=group)
     
     # Check if user is admin
-    if not GroupMembership.objects.filter(user=request.user, group=group, role='admin').exists():
+    if not roles.has_role(request.user, group.pk, ['admin']):
         messages.error(request, 'Only group admins can remove members.')
         return redirect('core:group_detail', pk=group_id)
     
@@ -1252,6 +920,47 @@ def remove_member(request, group_id, membership_id):
     if request.method == 'POST':
         username = membership.user.username
         membership.delete()
+        admission.promote_waitlist(group)
         messages.success(request, f'{username} has been removed from the group.')
     
-    return redirect('core:group_detail', pk=group_id)
\ No newline at end of file
+    return redirect('core:group_detail', pk=group_id)
+
+
+# Notifications
+class NotificationListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
+    model = Notification
+    template_name = 'core/notification_list.html'
+    context_object_name = 'notifications'
+    paginate_by = 20
+
+    def get_queryset(self):
+        return Notification.objects.filter(recipient=self.request.user).select_related('group')
+
+
+@login_required
+@require_POST
+def notification_read(request, pk):
+    notification = inbox.mark_read(request.user, pk)
+    if notification is None:
+        raise Http404
+    link = notification.related_link
+    if link and url_has_allowed_host_and_scheme(link, allowed_hosts={request.get_host()}):
+        return redirect(link)
+    return redirect('core:notification_list')
+
+
+@login_required
+@require_POST
+def notification_mark_all_read(request):
+    count = inbox.mark_all_read(request.user)
+    messages.success(request, f'{count} notifications marked as read.')
+    return redirect('core:notification_list')
+
+
+@require_GET
+def notification_stream(request):
+    """Reached only when the stream is not served by core.push (see project1/asgi.py), e.g. under WSGI.
+
+    204 tells EventSource not to reconnect; the badge then updates on page loads.
+    """
+    return HttpResponse(status=204)
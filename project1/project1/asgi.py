@@ -13,4 +13,13 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project1.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Notification streams are served outside Django's request handler (see core.push)
+from core import autocomplete  # noqa: E402 (needs the app registry)
+from core.push import route_streams  # noqa: E402
+
+application = route_streams(django_application)
+
+# Build the typeahead index before the first request
+autocomplete.warm_up()
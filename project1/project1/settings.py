@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -62,6 +63,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'core.context_processors.notifications',
             ],
         },
     },
@@ -76,11 +78,79 @@ WSGI_APPLICATION = 'project1.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        # DATABASE_PATH points the app at another SQLite file (e.g. the benchmark datasets)
+        'NAME': os.environ.get('DATABASE_PATH', BASE_DIR / 'db.sqlite3'),
+        'OPTIONS': {
+            # Take the write lock when a transaction starts, so concurrent writers
+            # wait (up to timeout seconds) instead of failing with "database is locked"
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
 
+# Cache
+# Local memory by default. Set REDIS_URL (e.g. redis://127.0.0.1:6379/1) to share
+# the cache between workers, or CACHE_DIR to use a file based cache.
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+elif os.environ.get('CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ['CACHE_DIR'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'project1',
+        }
+    }
+
+# Seconds a cached dashboard result is kept (it is invalidated earlier on changes)
+STATS_CACHE_TIMEOUT = 60 * 60
+
+# Seconds a user's cached {group_id: role} map is kept (invalidated on membership changes).
+# Invalidations only reach other worker processes through a shared cache (REDIS_URL or
+# CACHE_DIR); with the local memory cache the shorter ROLE_LOCAL_CACHE_TIMEOUT applies.
+ROLE_CACHE_TIMEOUT = 60 * 60
+ROLE_LOCAL_CACHE_TIMEOUT = 5
+
+# Seconds browsers may reuse a typeahead response, and the maximum age of each
+# process's in-memory autocomplete index (picks up writes from other processes)
+AUTOCOMPLETE_CACHE_SECONDS = 60
+AUTOCOMPLETE_INDEX_MAX_AGE = 5 * 60
+
+# Seconds the (approximate) result count shown by the cursor-paginated lists is cached
+PAGINATION_COUNT_CACHE_SECONDS = 60
+
+# Seconds a user's cached unread-notification count is kept (updated on create/read, recounted after).
+# Updates only reach other worker processes through a shared cache (REDIS_URL or CACHE_DIR);
+# with the local memory cache the shorter NOTIFICATION_COUNT_LOCAL_CACHE_TIMEOUT applies.
+NOTIFICATION_COUNT_CACHE_TIMEOUT = 10 * 60
+NOTIFICATION_COUNT_LOCAL_CACHE_TIMEOUT = 5
+
+# Server-sent events for new notifications (core.push; needs an ASGI server).
+# Seconds between keep-alive comments, the reconnection delay sent to browsers,
+# events buffered per connection before a slow client is dropped (it reconnects
+# and replays what it missed), and the most notifications replayed at once.
+# PUSH_REDIS_URL fans events out between worker processes; it defaults to REDIS_URL.
+PUSH_HEARTBEAT_SECONDS = 15
+PUSH_RETRY_MILLISECONDS = 5000
+PUSH_QUEUE_SIZE = 100
+PUSH_REPLAY_LIMIT = 100
+PUSH_REDIS_URL = os.environ.get('PUSH_REDIS_URL', os.environ.get('REDIS_URL', ''))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -125,18 +195,45 @@ MEDIA_ROOT = BASE_DIR / 'media'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Email settings
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
-EMAIL_HOST = 'smtp.gmail.com'
-EMAIL_PORT = 587
-EMAIL_USE_TLS = True
-EMAIL_HOST_USER = 'your.email@gmail.com'  # Replace with your Gmail address
-EMAIL_HOST_PASSWORD = 'your-app-password'  # Replace with your App Password
+# e.g. django.core.mail.backends.filebased.EmailBackend with EMAIL_FILE_PATH to write messages to disk
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+EMAIL_FILE_PATH = os.environ.get('EMAIL_FILE_PATH', BASE_DIR / 'var' / 'mail')
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'smtp.gmail.com')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 587))
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', '1') == '1'
+EMAIL_TIMEOUT = 30
+# SMTP AUTH is only attempted when both are set (e.g. a Gmail address and its App Password)
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL = 'Study Groups <your.email@gmail.com>'  # Replace with your Gmail address
+# Scheme and host that links in emails point to (an email has no request to build them from)
+SITE_URL = os.environ.get('SITE_URL', 'http://127.0.0.1:8000')
+
+# Outbox delivery (core.outbox, run_mail_worker): emails per claimed batch, worker threads,
+# seconds a claim is held, and retry backoff (base * 2**(attempt - 1), capped) before dead-lettering
+OUTBOX_BATCH_SIZE = 50
+OUTBOX_WORKER_THREADS = 4
+OUTBOX_LEASE_SECONDS = 5 * 60
+OUTBOX_RETRY_BASE_SECONDS = 30
+OUTBOX_RETRY_MAX_SECONDS = 60 * 60
+OUTBOX_MAX_ATTEMPTS = 6
 
 # File upload settings
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Prebuilt archives served by the admin download views (kept outside MEDIA_ROOT)
+DOWNLOAD_CACHE_DIR = Path(os.environ.get('DOWNLOAD_CACHE_DIR', BASE_DIR / 'var' / 'downloads'))
+
+# Background export artifacts (ExportJob, run_export_worker); kept outside MEDIA_ROOT and
+# served only to their owner. A worker holds its job for EXPORT_JOB_LEASE_SECONDS at a time,
+# renewing the lease while it runs; a crashed worker's job is reclaimed once it expires.
+EXPORT_JOB_DIR = Path(os.environ.get('EXPORT_JOB_DIR', BASE_DIR / 'var' / 'exports'))
+EXPORT_JOB_LEASE_SECONDS = 5 * 60
+
+# Minutes a database snapshot is reused before the admin download takes a new one
+DB_SNAPSHOT_CACHE_MINUTES = int(os.environ.get('DB_SNAPSHOT_CACHE_MINUTES', 10))
+
 # Maximum file upload size (5MB)
 MAX_UPLOAD_SIZE = 5242880
 
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project1.settings')
 
 application = get_wsgi_application()
+
+# Build the typeahead index before the first request (see core.autocomplete)
+from core import autocomplete  # noqa: E402 (needs the app registry)
+
+autocomplete.warm_up()
@@ -4,6 +4,7 @@ from pathlib import Path
 import random
 import argparse
 import csv
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta, time
 
 # Ensure project root is on sys.path
@@ -15,10 +16,16 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project1.settings')
 django.setup()
 
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
 from django.db import transaction
 from django.utils import timezone
 from faker import Faker
 from core.models import Profile, Subject, StudyGroup, GroupMembership, StudySession, StudyMaterial, Comment
+from core.exports import TABLE_EXPORTS, table_rows, model_column_types, write_parquet, export_deltas
+from core.counters import reconcile_counters
+from core.rollups import rebuild_rollups
+from core.search import get_backend as search_backend
+from core.stats import bump_version
 
 User = get_user_model()
 fake = Faker()
@@ -155,57 +162,200 @@ def create_comments(n, groups, users):
     return comments
 
 
+# --- Bulk mode (--scale) -----------------------------------------------------
+# Rows are built in memory and inserted with bulk_create. bulk_create skips
+# save() and signals, so derived fields are filled in here and the rollups,
+# group counters and search index are rebuilt at the end.
+
+MAJORS = ['Mathematics', 'Physics', 'Programming', 'Chemistry', 'Biology', 'History', 'Economics']
+
+
+def _fake_texts(args):
+    """Worker: (seed, count) -> dict of Faker text lists."""
+    seed, count = args
+    worker_fake = Faker()
+    worker_fake.seed_instance(seed)
+    return {
+        'word': [worker_fake.word() for _ in range(count)],
+        'short': [worker_fake.sentence(nb_words=4) for _ in range(count)],
+        'sentence': [worker_fake.sentence(nb_words=12) for _ in range(count)],
+        'long': [worker_fake.sentence(nb_words=20) for _ in range(count)],
+        'paragraph': [worker_fake.paragraph(nb_sentences=3) for _ in range(count)],
+        'url': [worker_fake.url() for _ in range(count)],
+        'city': [worker_fake.city() for _ in range(count)],
+    }
+
+
+def build_text_pool(size, workers=0):
+    """Faker text sampled by the bulk generators, optionally built in a process pool."""
+    if workers <= 1:
+        return _fake_texts((random.randrange(2**32), size))
+    per_worker = -(-size // workers)
+    jobs = [(random.randrange(2**32), per_worker) for _ in range(workers)]
+    pool = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for texts in executor.map(_fake_texts, jobs):
+            for key, values in texts.items():
+                pool.setdefault(key, []).extend(values)
+    return pool
+
+
+def _bulk_insert(model, objects, batch_size):
+    """bulk_create ``objects`` (any iterable) in batches; returns the created primary keys."""
+    pks = []
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            pks.extend(o.pk for o in model.objects.bulk_create(batch, batch_size=batch_size))
+            batch = []
+    if batch:
+        pks.extend(o.pk for o in model.objects.bulk_create(batch, batch_size=batch_size))
+    return pks
+
+
+def bulk_users(n, text, batch_size):
+    password = make_password('password')  # hashed once, shared by every generated user
+    offset = User.objects.count()
+    names = [f'load{offset + i + 1:07d}' for i in range(n)]
+    user_ids = _bulk_insert(User, (
+        User(username=name, email=f'{name}@example.com', password=password) for name in names
+    ), batch_size)
+    _bulk_insert(Profile, (
+        Profile(user_id=user_id, major=random.choice(MAJORS), bio=random.choice(text['sentence']),
+                interests=', '.join(random.sample(text['word'], 5)))
+        for user_id in user_ids
+    ), batch_size)
+    return user_ids
+
+
+def bulk_groups(n, user_ids, text, batch_size):
+    """Create groups plus their creator-admin memberships. Returns {group_id: (creator_id, max_members)}."""
+    subject_ids = list(Subject.objects.values_list('id', flat=True))
+    specs = [(random.choice(user_ids), random.randint(5, 25)) for _ in range(n)]
+    group_ids = _bulk_insert(StudyGroup, (
+        StudyGroup(name=f'{random.choice(text["word"]).capitalize()} Study Group {i + 1}',
+                   description=random.choice(text['paragraph']), subject_id=random.choice(subject_ids),
+                   created_by_id=creator_id, max_members=max_members, is_active=True)
+        for i, (creator_id, max_members) in enumerate(specs)
+    ), batch_size)
+    groups = dict(zip(group_ids, specs))
+    _bulk_insert(GroupMembership, (
+        GroupMembership(user_id=creator_id, group_id=group_id, role='admin')
+        for group_id, (creator_id, max_members) in groups.items()
+    ), batch_size)
+    return groups
+
+
+def bulk_memberships(target_count, user_ids, groups, batch_size):
+    """Add random memberships, tracking membership and capacity in local dicts (no queries per attempt)."""
+    members = {group_id: {creator_id} for group_id, (creator_id, max_members) in groups.items()}
+    group_ids = list(groups)
+    new = []
+    attempts = 0
+    while len(new) < target_count and attempts < target_count * 10:
+        attempts += 1
+        user_id = random.choice(user_ids)
+        group_id = random.choice(group_ids)
+        group_members = members[group_id]
+        if user_id in group_members or len(group_members) >= groups[group_id][1]:
+            continue
+        group_members.add(user_id)
+        new.append(GroupMembership(user_id=user_id, group_id=group_id,
+                                   role=random.choice(['member', 'member', 'moderator'])))
+    _bulk_insert(GroupMembership, new, batch_size)
+    return len(new)
+
+
+def bulk_sessions(n, groups, text, batch_size):
+    group_ids = list(groups)
+    today = timezone.now().date()
+    start_date = today - timedelta(days=60)
+
+    def sessions():
+        for i in range(n):
+            group_id = random.choice(group_ids)
+            date = start_date + timedelta(days=random.randint(0, 90))
+            start_hour = random.randint(8, 20)
+            start_time = time(start_hour, random.choice([0, 15, 30, 45]))
+            end_time = time((start_hour + int(random.choice([1, 1.5, 2, 2.5, 3]))) % 24, 0)
+            is_online = random.random() < 1 / 3
+            yield StudySession(
+                group_id=group_id, title=f'{random.choice(text["word"]).capitalize()} Session {i + 1}',
+                description=random.choice(text['long']), date=date, start_time=start_time, end_time=end_time,
+                duration_minutes=StudySession.compute_duration_minutes(start_time, end_time),
+                location='Online' if is_online else random.choice(text['city']), is_online=is_online,
+                meeting_link=random.choice(text['url']) if is_online else '',
+                status='scheduled' if date >= today else 'completed', created_by_id=groups[group_id][0],
+            )
+
+    return len(_bulk_insert(StudySession, sessions(), batch_size))
+
+
+def bulk_materials(n, groups, user_ids, text, batch_size):
+    group_ids = list(groups)
+    return len(_bulk_insert(StudyMaterial, (
+        StudyMaterial(group_id=random.choice(group_ids), uploaded_by_id=random.choice(user_ids),
+                      title=random.choice(text['short']), description=random.choice(text['sentence']),
+                      link=random.choice(text['url']) if random.random() < 0.7 else '')
+        for _ in range(n)
+    ), batch_size))
+
+
+def bulk_comments(n, groups, user_ids, text, batch_size):
+    """Top-level comments first, then replies to them (about 20%, as in create_comments)."""
+    group_ids = list(groups)
+    replies = sum(1 for _ in range(n) if random.random() < 0.2) if n > 1 else 0
+    parent_groups = [random.choice(group_ids) for _ in range(n - replies)]
+    parent_ids = _bulk_insert(Comment, (
+        Comment(group_id=group_id, author_id=random.choice(user_ids), content=random.choice(text['long']))
+        for group_id in parent_groups
+    ), batch_size)
+    parents = list(zip(parent_ids, parent_groups))
+    reply_ids = _bulk_insert(Comment, (
+        Comment(group_id=group_id, parent_id=parent_id, author_id=random.choice(user_ids),
+                content=random.choice(text['long']))
+        for parent_id, group_id in (random.choice(parents) for _ in range(replies))
+    ), batch_size)
+    return len(parent_ids) + len(reply_ids)
+
+
+def generate_scaled(args):
+    """Bulk generator used by --scale; fast enough for millions of sessions."""
+    text = build_text_pool(args.text_pool, args.workers)
+    print(f'Built a pool of {args.text_pool} Faker texts')
+    with transaction.atomic():
+        user_ids = bulk_users(args.users, text, args.batch_size)
+        print(f'Created {len(user_ids)} users')
+        groups = bulk_groups(args.groups, user_ids, text, args.batch_size)
+        print(f'Created {len(groups)} groups')
+        print(f'Created {bulk_memberships(args.memberships, user_ids, groups, args.batch_size)} additional memberships')
+        print(f'Created {bulk_sessions(args.sessions, groups, text, args.batch_size)} sessions')
+        print(f'Created {bulk_materials(args.materials, groups, user_ids, text, args.batch_size)} materials')
+        print(f'Created {bulk_comments(args.comments, groups, user_ids, text, args.batch_size)} comments')
+        # bulk_create bypasses the signals that keep these up to date
+        print(f'Rebuilt {rebuild_rollups(batch_size=args.batch_size)} session rollups')
+        print(f'Reconciled counters on {reconcile_counters()} groups')
+        print(f'Indexed {search_backend().rebuild()} groups for search')
+    bump_version()
+
+
 def export_csvs(export_dir):
     os.makedirs(export_dir, exist_ok=True)
-    # Users
-    users_qs = User.objects.all().values('id','username','email','first_name','last_name','is_staff','is_superuser','is_active','date_joined')
-    with open(os.path.join(export_dir,'users.csv'),'w',newline='',encoding='utf-8') as f:
-        w = csv.writer(f)
-        w.writerow(users_qs[0].keys() if users_qs else [])
-        for row in users_qs:
-            w.writerow(row.values())
-    # Profiles
-    prof_qs = Profile.objects.all().values('id','user_id','major','bio','interests','created_at')
-    with open(os.path.join(export_dir,'profiles.csv'),'w',newline='',encoding='utf-8') as f:
-        w = csv.writer(f)
-        w.writerow(prof_qs[0].keys() if prof_qs else [])
-        for row in prof_qs:
-            w.writerow(row.values())
-    # Groups
-    grp_qs = StudyGroup.objects.all().values('id','name','description','subject_id','created_by_id','max_members','is_active','created_at')
-    with open(os.path.join(export_dir,'groups.csv'),'w',newline='',encoding='utf-8') as f:
-        w = csv.writer(f)
-        w.writerow(grp_qs[0].keys() if grp_qs else [])
-        for row in grp_qs:
-            w.writerow(row.values())
-    # Memberships
-    mem_qs = GroupMembership.objects.all().values('id','user_id','group_id','role','joined_at')
-    with open(os.path.join(export_dir,'memberships.csv'),'w',newline='',encoding='utf-8') as f:
-        w = csv.writer(f)
-        w.writerow(mem_qs[0].keys() if mem_qs else [])
-        for row in mem_qs:
-            w.writerow(row.values())
-    # Sessions
-    ses_qs = StudySession.objects.all().values('id','group_id','title','description','date','start_time','end_time','location','is_online','meeting_link','status','created_by_id','created_at')
-    with open(os.path.join(export_dir,'sessions.csv'),'w',newline='',encoding='utf-8') as f:
-        w = csv.writer(f)
-        w.writerow(ses_qs[0].keys() if ses_qs else [])
-        for row in ses_qs:
-            w.writerow(row.values())
-    # Materials
-    mat_qs = StudyMaterial.objects.all().values('id','group_id','title','description','file','link','uploaded_by_id','created_at')
-    with open(os.path.join(export_dir,'materials.csv'),'w',newline='',encoding='utf-8') as f:
-        w = csv.writer(f)
-        w.writerow(mat_qs[0].keys() if mat_qs else [])
-        for row in mat_qs:
-            w.writerow(row.values())
-    # Comments
-    com_qs = Comment.objects.all().values('id','group_id','author_id','content','parent_id','created_at')
-    with open(os.path.join(export_dir,'comments.csv'),'w',newline='',encoding='utf-8') as f:
-        w = csv.writer(f)
-        w.writerow(com_qs[0].keys() if com_qs else [])
-        for row in com_qs:
-            w.writerow(row.values())
+    for table, (model, fields) in TABLE_EXPORTS.items():
+        with open(os.path.join(export_dir, f'{table}.csv'), 'w', newline='', encoding='utf-8') as f:
+            w = csv.writer(f)
+            w.writerow(fields)
+            for row in table_rows(table):
+                w.writerow(row)
+
+
+def export_parquet(export_dir):
+    """Write each table as a typed, snappy-compressed Parquet file (requires pyarrow)."""
+    os.makedirs(export_dir, exist_ok=True)
+    for table, (model, fields) in TABLE_EXPORTS.items():
+        write_parquet(os.path.join(export_dir, f'{table}.parquet'), fields,
+                      model_column_types(model, fields), table_rows(table))
 
 
 if __name__ == '__main__':
@@ -217,26 +367,52 @@ if __name__ == '__main__':
     parser.add_argument('--materials', type=int, default=150)
     parser.add_argument('--comments', type=int, default=300)
     parser.add_argument('--export-dir', type=str, default=str(PROJECT_ROOT / 'exports'))
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv',
+                        help='Export file format (parquet requires pyarrow)')
+    parser.add_argument('--delta', action='store_true',
+                        help='Only export rows changed or deleted since the previous --delta run')
+    parser.add_argument('--scale', action='store_true',
+                        help='Bulk mode for load testing: always adds new users and inserts rows with bulk_create')
+    parser.add_argument('--batch-size', type=int, default=5000, help='bulk_create batch size (--scale)')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Processes used to generate Faker text (--scale; 0 = in process)')
+    parser.add_argument('--text-pool', type=int, default=2000,
+                        help='Distinct Faker texts sampled for the bulk rows (--scale)')
+    parser.add_argument('--no-export', action='store_true', help='Skip the export step')
     args = parser.parse_args()
 
     start = datetime.now()
     print('Generating sample data — this can take some time...')
-    with transaction.atomic():
-        users = create_users(args.users)
-        print(f'Created/updated {len(users)} users')
-        groups = create_groups(args.groups, users)
-        print(f'Created {len(groups)} groups')
-        created_members = add_memberships(args.memberships, users, groups)
-        print(f'Created {created_members} additional memberships')
-        sessions = create_sessions(args.sessions, groups)
-        print(f'Created {len(sessions)} sessions')
-        materials = create_materials(args.materials, groups, users)
-        print(f'Created {len(materials)} materials')
-        comments = create_comments(args.comments, groups, users)
-        print(f'Created {len(comments)} comments')
-
-    print('Exporting CSVs to', args.export_dir)
-    export_csvs(args.export_dir)
+    if args.scale:
+        generate_scaled(args)
+    else:
+        with transaction.atomic():
+            users = create_users(args.users)
+            print(f'Created/updated {len(users)} users')
+            groups = create_groups(args.groups, users)
+            print(f'Created {len(groups)} groups')
+            created_members = add_memberships(args.memberships, users, groups)
+            print(f'Created {created_members} additional memberships')
+            sessions = create_sessions(args.sessions, groups)
+            print(f'Created {len(sessions)} sessions')
+            materials = create_materials(args.materials, groups, users)
+            print(f'Created {len(materials)} materials')
+            comments = create_comments(args.comments, groups, users)
+            print(f'Created {len(comments)} comments')
+
+    if args.no_export:
+        print('Skipping exports')
+    elif args.delta:
+        print('Exporting deltas to', args.export_dir)
+        for table, (changed, deleted) in export_deltas(args.export_dir, args.format).items():
+            print(f'  {table}: {changed} changed, {deleted} deleted')
+    elif args.format == 'parquet':
+        print('Exporting Parquet files to', args.export_dir)
+        export_parquet(args.export_dir)
+    else:
+        print('Exporting CSVs to', args.export_dir)
+        export_csvs(args.export_dir)
     end = datetime.now()
     print('Done — elapsed', end - start)
-    print('Exports saved in', args.export_dir)
+    if not args.no_export:
+        print('Exports saved in', args.export_dir)